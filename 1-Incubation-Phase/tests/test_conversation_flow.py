@@ -6,12 +6,19 @@ auto-escalation, and all 6 MCP server tools.
 
 Usage:
     python test_conversation_flow.py
+    pytest test_conversation_flow.py -v
 """
 
 import sys
 import os
+from dataclasses import dataclass
 from pathlib import Path
 
+try:
+    import pytest
+except ImportError:  # standalone run (python test_conversation_flow.py) needs no pytest
+    pytest = None
+
 # Fix encoding on Windows
 if sys.platform == "win32":
     sys.stdout.reconfigure(encoding="utf-8")
@@ -30,20 +37,32 @@ from conversation_manager import ConversationManager, Message
 
 # ── Helpers ────────────────────────────────────────────────────────────────
 
-PASS = 0
-FAIL = 0
+@dataclass
+class Results:
+    """Per-run check counters, threaded through each test instead of globals."""
 
+    passed: int = 0
+    failed: int = 0
 
-def check(condition: bool, label: str, detail: str = ""):
-    global PASS, FAIL
-    if condition:
-        PASS += 1
-        print(f"  [PASS] {label}")
-    else:
-        FAIL += 1
-        print(f"  [FAIL] {label}")
-        if detail:
-            print(f"         {detail}")
+    def record(self, condition: bool, label: str, detail: str = "") -> None:
+        if condition:
+            self.passed += 1
+            print(f"  [PASS] {label}")
+        else:
+            self.failed += 1
+            print(f"  [FAIL] {label}")
+            if detail:
+                print(f"         {detail}")
+
+
+if pytest is not None:
+
+    @pytest.fixture
+    def results():
+        """Fresh counters per test; any failed check fails the pytest item."""
+        r = Results()
+        yield r
+        assert r.failed == 0, f"{r.failed} check(s) failed — see output above"
 
 
 def section(title: str):
@@ -54,7 +73,7 @@ def section(title: str):
 
 # ── Test 1: Multi-turn conversation via email ─────────────────────────────
 
-def test_multi_turn_email():
+def test_multi_turn_email(results: Results):
     section("TEST 1: Multi-turn email conversation")
 
     cm = ConversationManager()
@@ -72,24 +91,24 @@ def test_multi_turn_email():
     )
     r1 = agent.handle_ticket_with_context(t1)
 
-    check(r1.detected_intent == "how_to",
-          f"Turn 1 intent: {r1.detected_intent}",
-          "Expected: how_to")
-    check(not r1.should_escalate,
-          "Turn 1 not escalated")
-    check(r1.confidence_score >= 0.7,
-          f"Turn 1 confidence: {r1.confidence_score}",
-          "Expected >= 0.7")
+    results.record(r1.detected_intent == "how_to",
+                   f"Turn 1 intent: {r1.detected_intent}",
+                   "Expected: how_to")
+    results.record(not r1.should_escalate,
+                   "Turn 1 not escalated")
+    results.record(r1.confidence_score >= 0.7,
+                   f"Turn 1 confidence: {r1.confidence_score}",
+                   "Expected >= 0.7")
 
     # Verify conversation was created
     conv = cm.get_active_conversation("alice.johnson@testcorp.com")
-    check(conv is not None,
-          "Conversation created")
-    check(len(conv.messages) == 2,
-          f"Messages after turn 1: {len(conv.messages)}",
-          "Expected: 2 (customer + agent)")
-    check("how_to" in conv.topics_discussed,
-          f"Topics: {conv.topics_discussed}")
+    results.record(conv is not None,
+                   "Conversation created")
+    results.record(len(conv.messages) == 2,
+                   f"Messages after turn 1: {len(conv.messages)}",
+                   "Expected: 2 (customer + agent)")
+    results.record("how_to" in conv.topics_discussed,
+                   f"Topics: {conv.topics_discussed}")
 
     # Turn 2: Follow-up question
     t2 = Ticket(
@@ -105,11 +124,11 @@ def test_multi_turn_email():
 
     # Should reuse the same conversation
     conv_after = cm.get_active_conversation("alice.johnson@testcorp.com")
-    check(conv_after.conversation_id == conv.conversation_id,
-          "Same conversation reused for follow-up")
-    check(len(conv_after.messages) == 4,
-          f"Messages after turn 2: {len(conv_after.messages)}",
-          "Expected: 4 (2 customer + 2 agent)")
+    results.record(conv_after.conversation_id == conv.conversation_id,
+                   "Same conversation reused for follow-up")
+    results.record(len(conv_after.messages) == 4,
+                   f"Messages after turn 2: {len(conv_after.messages)}",
+                   "Expected: 4 (2 customer + 2 agent)")
 
     # Print the conversation flow
     print("\n  --- Conversation Flow ---")
@@ -123,7 +142,7 @@ def test_multi_turn_email():
 
 # ── Test 2: Cross-channel continuity ─────────────────────────────────────
 
-def test_cross_channel():
+def test_cross_channel(results: Results):
     section("TEST 2: Cross-channel continuity (email → WhatsApp)")
 
     cm = ConversationManager()
@@ -144,10 +163,10 @@ def test_cross_channel():
     )
     r1 = agent.handle_ticket_with_context(t1)
 
-    check(r1.detected_intent == "integration_issue",
-          f"Email intent: {r1.detected_intent}")
-    check(not r1.should_escalate,
-          "Email not escalated (standard integration issue)")
+    results.record(r1.detected_intent == "integration_issue",
+                   f"Email intent: {r1.detected_intent}")
+    results.record(not r1.should_escalate,
+                   "Email not escalated (standard integration issue)")
 
     # Turn 2: Same customer contacts via WhatsApp (different identifier)
     t2 = Ticket(
@@ -163,13 +182,13 @@ def test_cross_channel():
 
     # Check cross-channel context was detected (may be escalated due to "still not")
     conv = cm.get_latest_conversation("bob.smith@example.com")
-    check(conv is not None,
-          "Conversation found via email")
-    check(len(conv.channels_used) == 2,
-          f"Channels used: {conv.channels_used}",
-          "Expected: ['gmail', 'whatsapp']")
-    check("gmail" in conv.channels_used and "whatsapp" in conv.channels_used,
-          "Both channels tracked")
+    results.record(conv is not None,
+                   "Conversation found via email")
+    results.record(len(conv.channels_used) == 2,
+                   f"Channels used: {conv.channels_used}",
+                   "Expected: ['gmail', 'whatsapp']")
+    results.record("gmail" in conv.channels_used and "whatsapp" in conv.channels_used,
+                   "Both channels tracked")
 
     # The response should reference the previous conversation.
     # Note: WhatsApp escalation responses use a short template that doesn't
@@ -177,17 +196,17 @@ def test_cross_channel():
     # We check if it's either escalated OR has the cross-channel reference.
     has_cross_ref = "contacted us earlier" in r2.response_text
     was_escalated = r2.should_escalate
-    check(has_cross_ref or was_escalated,
-          f"Cross-channel: context_shown={has_cross_ref}, escalated={was_escalated}",
-          f"Response preview: {r2.response_text[:120]}...")
+    results.record(has_cross_ref or was_escalated,
+                   f"Cross-channel: context_shown={has_cross_ref}, escalated={was_escalated}",
+                   f"Response preview: {r2.response_text[:120]}...")
 
     # Verify conversation history
     history = cm.get_customer_history("bob.smith@example.com")
-    check(history["conversation_count"] == 1,
-          f"Conversation count: {history['conversation_count']}",
-          "Expected: 1 (same conversation, different channels)")
-    check("integration_issue" in history["all_topics"],
-          f"Topics tracked: {history['all_topics']}")
+    results.record(history["conversation_count"] == 1,
+                   f"Conversation count: {history['conversation_count']}",
+                   "Expected: 1 (same conversation, different channels)")
+    results.record("integration_issue" in history["all_topics"],
+                   f"Topics tracked: {history['all_topics']}")
 
     print(f"\n  --- WhatsApp Response (cross-channel) ---")
     print(f"  {r2.response_text}")
@@ -196,7 +215,7 @@ def test_cross_channel():
 
 # ── Test 3: Sentiment trending & auto-escalation ─────────────────────────
 
-def test_sentiment_trending():
+def test_sentiment_trending(results: Results):
     section("TEST 3: Sentiment trending → auto-escalation")
 
     cm = ConversationManager()
@@ -216,10 +235,10 @@ def test_sentiment_trending():
     )
     r1 = agent.handle_ticket_with_context(t1)
 
-    check(r1.detected_sentiment > 0,
-          f"Msg 1 sentiment: {r1.detected_sentiment:+.2f} (expected positive)")
-    check(not r1.should_escalate,
-          "Msg 1 not escalated")
+    results.record(r1.detected_sentiment > 0,
+                   f"Msg 1 sentiment: {r1.detected_sentiment:+.2f} (expected positive)")
+    results.record(not r1.should_escalate,
+                   "Msg 1 not escalated")
 
     # Message 2: Slightly negative
     t2 = Ticket(
@@ -233,8 +252,8 @@ def test_sentiment_trending():
     )
     r2 = agent.handle_ticket_with_context(t2)
 
-    check(r2.detected_sentiment < 0,
-          f"Msg 2 sentiment: {r2.detected_sentiment:+.2f} (expected negative)")
+    results.record(r2.detected_sentiment < 0,
+                   f"Msg 2 sentiment: {r2.detected_sentiment:+.2f} (expected negative)")
 
     # Message 3: More negative
     t3 = Ticket(
@@ -248,8 +267,8 @@ def test_sentiment_trending():
     )
     r3 = agent.handle_ticket_with_context(t3)
 
-    check(r3.detected_sentiment < -0.3,
-          f"Msg 3 sentiment: {r3.detected_sentiment:+.2f} (expected very negative)")
+    results.record(r3.detected_sentiment < -0.3,
+                   f"Msg 3 sentiment: {r3.detected_sentiment:+.2f} (expected very negative)")
 
     # Message 4: Extremely negative — should trigger auto-escalation via trend
     t4 = Ticket(
@@ -263,17 +282,17 @@ def test_sentiment_trending():
     )
     r4 = agent.handle_ticket_with_context(t4)
 
-    check(r4.should_escalate,
-          "Msg 4 escalated (sentiment trend + angry language)")
-    check("SENTIMENT" in r4.escalation_reason or "human" in r4.escalation_reason.lower(),
-          f"Escalation reason includes sentiment/human: {r4.escalation_reason[:100]}")
+    results.record(r4.should_escalate,
+                   "Msg 4 escalated (sentiment trend + angry language)")
+    results.record("SENTIMENT" in r4.escalation_reason or "human" in r4.escalation_reason.lower(),
+                   f"Escalation reason includes sentiment/human: {r4.escalation_reason[:100]}")
 
     # Check sentiment trend (conversation may be escalated, so use get_latest)
     conv = cm.get_latest_conversation(customer_email)
-    check(conv is not None, "Conversation exists for sentiment check")
+    results.record(conv is not None, "Conversation exists for sentiment check")
     trend = cm.check_sentiment_trend(conv.conversation_id)
-    check(trend["trend"] == "declining",
-          f"Trend: {trend['trend']}")
+    results.record(trend["trend"] == "declining",
+                   f"Trend: {trend['trend']}")
 
     # Print sentiment timeline
     print(f"\n  --- Sentiment Timeline ---")
@@ -289,7 +308,7 @@ def test_sentiment_trending():
 
 # ── Test 4: ConversationManager unit tests ────────────────────────────────
 
-def test_conversation_manager_units():
+def test_conversation_manager_units(results: Results):
     section("TEST 4: ConversationManager unit tests")
 
     cm = ConversationManager()
@@ -301,74 +320,74 @@ def test_conversation_manager_units():
         customer_name="Test User",
         customer_plan="pro",
     )
-    check(conv.conversation_id is not None,
-          f"Conversation created: {conv.conversation_id[:8]}...")
-    check(conv.status == "active",
-          f"Status: {conv.status}")
-    check(conv.customer_id == "test@example.com",
-          f"Customer ID: {conv.customer_id}")
+    results.record(conv.conversation_id is not None,
+                   f"Conversation created: {conv.conversation_id[:8]}...")
+    results.record(conv.status == "active",
+                   f"Status: {conv.status}")
+    results.record(conv.customer_id == "test@example.com",
+                   f"Customer ID: {conv.customer_id}")
 
     # Test: add messages
     cm.add_message(conv.conversation_id, "customer", "Hello", "gmail",
                    sentiment=0.3, intent="greeting")
     cm.add_message(conv.conversation_id, "agent", "Hi! How can I help?", "gmail")
-    check(len(conv.messages) == 2,
-          f"Messages: {len(conv.messages)}")
-    check(len(conv.sentiment_history) == 1,
-          f"Sentiment history: {len(conv.sentiment_history)} (only customer msgs)")
+    results.record(len(conv.messages) == 2,
+                   f"Messages: {len(conv.messages)}")
+    results.record(len(conv.sentiment_history) == 1,
+                   f"Sentiment history: {len(conv.sentiment_history)} (only customer msgs)")
 
     # Test: get_or_create reuses active conversation
     conv2 = cm.get_or_create_conversation("test@example.com", "gmail")
-    check(conv2.conversation_id == conv.conversation_id,
-          "get_or_create reuses active conversation")
+    results.record(conv2.conversation_id == conv.conversation_id,
+                   "get_or_create reuses active conversation")
 
     # Test: channel switch tracking
     conv3 = cm.get_or_create_conversation("test@example.com", "whatsapp")
-    check("whatsapp" in conv3.channels_used,
-          f"Channel switch tracked: {conv3.channels_used}")
+    results.record("whatsapp" in conv3.channels_used,
+                   f"Channel switch tracked: {conv3.channels_used}")
 
     # Test: identity linking
     cm.link_identity("test@example.com", "+1555000000")
     resolved = cm.resolve_customer_id("+1555000000")
-    check(resolved == "test@example.com",
-          f"Identity resolved: +1555000000 → {resolved}")
+    results.record(resolved == "test@example.com",
+                   f"Identity resolved: +1555000000 → {resolved}")
 
     # Test: resolve conversation
     cm.resolve_conversation(conv.conversation_id)
-    check(conv.status == "resolved",
-          f"Status after resolve: {conv.status}")
+    results.record(conv.status == "resolved",
+                   f"Status after resolve: {conv.status}")
 
     # Test: new conversation after resolved
     conv4 = cm.get_or_create_conversation("test@example.com", "gmail")
-    check(conv4.conversation_id != conv.conversation_id,
-          "New conversation created after previous was resolved")
+    results.record(conv4.conversation_id != conv.conversation_id,
+                   "New conversation created after previous was resolved")
 
     # Test: escalation
     esc_id = cm.escalate_conversation(conv4.conversation_id, "Test escalation")
-    check(esc_id.startswith("ESC-"),
-          f"Escalation ID: {esc_id}")
-    check(conv4.status == "escalated",
-          f"Status after escalate: {conv4.status}")
+    results.record(esc_id.startswith("ESC-"),
+                   f"Escalation ID: {esc_id}")
+    results.record(conv4.status == "escalated",
+                   f"Status after escalate: {conv4.status}")
 
     # Test: customer history
     history = cm.get_customer_history("test@example.com")
-    check(history["conversation_count"] == 2,
-          f"History conversations: {history['conversation_count']}")
-    check("gmail" in history["all_channels"],
-          f"History channels: {history['all_channels']}")
+    results.record(history["conversation_count"] == 2,
+                   f"History conversations: {history['conversation_count']}")
+    results.record("gmail" in history["all_channels"],
+                   f"History channels: {history['all_channels']}")
 
     # Test: stats
     stats = cm.stats
-    check(stats["total_conversations"] == 2,
-          f"Total conversations: {stats['total_conversations']}")
-    check(stats["unique_customers"] == 1,
-          f"Unique customers: {stats['unique_customers']}")
+    results.record(stats["total_conversations"] == 2,
+                   f"Total conversations: {stats['total_conversations']}")
+    results.record(stats["unique_customers"] == 1,
+                   f"Unique customers: {stats['unique_customers']}")
     print()
 
 
 # ── Test 5: MCP Tools (direct invocation) ─────────────────────────────────
 
-def test_mcp_tools():
+def test_mcp_tools(results: Results):
     section("TEST 5: MCP Tool direct invocation")
 
     # Import MCP tools (they use module-level shared state)
@@ -385,10 +404,10 @@ def test_mcp_tools():
     # Tool 1: search_knowledge_base
     print("  --- Tool 1: search_knowledge_base ---")
     result = search_knowledge_base("how to set up recurring tasks")
-    check(len(result) > 0,
-          "search_knowledge_base returns results")
-    check("Result 1:" in result,
-          "Results are numbered")
+    results.record(len(result) > 0,
+                   "search_knowledge_base returns results")
+    results.record("Result 1:" in result,
+                   "Results are numbered")
     print(f"  First 200 chars: {result[:200]}...")
     print()
 
@@ -404,14 +423,14 @@ def test_mcp_tools():
         category="how-to",
         customer_plan="free",
     )
-    check("ticket_id" in ticket_result,
-          f"Ticket created: {ticket_result['ticket_id']}")
-    check(ticket_result["detected_intent"] == "how_to",
-          f"Intent: {ticket_result['detected_intent']}")
-    check("response_text" in ticket_result,
-          "Response generated")
-    check(not ticket_result["should_escalate"],
-          "Not escalated (simple how-to)")
+    results.record("ticket_id" in ticket_result,
+                   f"Ticket created: {ticket_result['ticket_id']}")
+    results.record(ticket_result["detected_intent"] == "how_to",
+                   f"Intent: {ticket_result['detected_intent']}")
+    results.record("response_text" in ticket_result,
+                   "Response generated")
+    results.record(not ticket_result["should_escalate"],
+                   "Not escalated (simple how-to)")
     ticket_id = ticket_result["ticket_id"]
     print(f"  Response preview: {ticket_result['response_text'][:120]}...")
     print()
@@ -419,12 +438,12 @@ def test_mcp_tools():
     # Tool 3: get_customer_history
     print("  --- Tool 3: get_customer_history ---")
     history = get_customer_history("mcp-test@example.com")
-    check(history["found"],
-          "Customer history found")
-    check(history["conversation_count"] >= 1,
-          f"Conversations: {history['conversation_count']}")
-    check("how_to" in history["all_topics"],
-          f"Topics: {history['all_topics']}")
+    results.record(history["found"],
+                   "Customer history found")
+    results.record(history["conversation_count"] >= 1,
+                   f"Conversations: {history['conversation_count']}")
+    results.record("how_to" in history["all_topics"],
+                   f"Topics: {history['all_topics']}")
     print()
 
     # Tool 4: escalate_to_human
@@ -435,12 +454,12 @@ def test_mcp_tools():
         urgency="within_1_hour",
         category="general",
     )
-    check("escalation_id" in esc_result,
-          f"Escalation: {esc_result['escalation_id']}")
-    check(esc_result["assigned_to"] == "Marcus Rivera",
-          f"Assigned to: {esc_result['assigned_to']}")
-    check(esc_result["status"] == "escalated",
-          f"Status: {esc_result['status']}")
+    results.record("escalation_id" in esc_result,
+                   f"Escalation: {esc_result['escalation_id']}")
+    results.record(esc_result["assigned_to"] == "Marcus Rivera",
+                   f"Assigned to: {esc_result['assigned_to']}")
+    results.record(esc_result["status"] == "escalated",
+                   f"Status: {esc_result['status']}")
     print()
 
     # Tool 5: send_response
@@ -451,12 +470,12 @@ def test_mcp_tools():
         channel="web-form",
         customer_name="MCP Test User",
     )
-    check(send_result["delivery_status"] == "sent",
-          f"Delivery: {send_result['delivery_status']}")
-    check("TaskFlow Support" in send_result["formatted_message"],
-          "Formatted with brand voice")
-    check("TF-" in send_result["formatted_message"],
-          "Ticket ID in formatted response")
+    results.record(send_result["delivery_status"] == "sent",
+                   f"Delivery: {send_result['delivery_status']}")
+    results.record("TaskFlow Support" in send_result["formatted_message"],
+                   "Formatted with brand voice")
+    results.record("TF-" in send_result["formatted_message"],
+                   "Ticket ID in formatted response")
     print(f"  Formatted: {send_result['formatted_message'][:150]}...")
     print()
 
@@ -464,23 +483,23 @@ def test_mcp_tools():
     print("  --- Tool 6: analyze_sentiment ---")
 
     pos = analyze_sentiment("I love TaskFlow! It's amazing and so helpful!")
-    check(pos["label"] == "positive",
-          f"Positive text: score={pos['score']:+.2f}, label={pos['label']}")
+    results.record(pos["label"] == "positive",
+                   f"Positive text: score={pos['score']:+.2f}, label={pos['label']}")
 
     neg = analyze_sentiment("This is terrible and broken. Worst experience ever.")
-    check(neg["label"] == "negative",
-          f"Negative text: score={neg['score']:+.2f}, label={neg['label']}")
+    results.record(neg["label"] == "negative",
+                   f"Negative text: score={neg['score']:+.2f}, label={neg['label']}")
 
     neutral = analyze_sentiment("I need to export my project data as CSV.")
-    check(neutral["label"] == "neutral",
-          f"Neutral text: score={neutral['score']:+.2f}, label={neutral['label']}")
+    results.record(neutral["label"] == "neutral",
+                   f"Neutral text: score={neutral['score']:+.2f}, label={neutral['label']}")
 
     print()
 
 
 # ── Test 6: Conversation summary and stats ────────────────────────────────
 
-def test_stats_and_summary():
+def test_stats_and_summary(results: Results):
     section("TEST 6: Conversation summary and stats")
 
     cm = ConversationManager()
@@ -506,16 +525,16 @@ def test_stats_and_summary():
         agent.handle_ticket_with_context(t)
 
     stats = cm.stats
-    check(stats["total_conversations"] == 3,
-          f"Total: {stats['total_conversations']}")
-    check(stats["unique_customers"] == 3,
-          f"Unique customers: {stats['unique_customers']}")
+    results.record(stats["total_conversations"] == 3,
+                   f"Total: {stats['total_conversations']}")
+    results.record(stats["unique_customers"] == 3,
+                   f"Unique customers: {stats['unique_customers']}")
 
     # User C should be escalated (refund)
     conv_c = cm.get_active_conversation("c@test.com")
     # It might be escalated or still active depending on confidence
-    check(conv_c is not None or cm.get_customer_history("c@test.com")["conversation_count"] > 0,
-          "User C conversation exists")
+    results.record(conv_c is not None or cm.get_customer_history("c@test.com")["conversation_count"] > 0,
+                   "User C conversation exists")
 
     # Print summaries
     print("\n  --- All Conversation Summaries ---")
@@ -535,21 +554,22 @@ def main():
     print("  Conversation Flow | Sentiment Trending | MCP Tools")
     print("=" * 70)
 
-    test_multi_turn_email()
-    test_cross_channel()
-    test_sentiment_trending()
-    test_conversation_manager_units()
-    test_mcp_tools()
-    test_stats_and_summary()
+    results = Results()
+    test_multi_turn_email(results)
+    test_cross_channel(results)
+    test_sentiment_trending(results)
+    test_conversation_manager_units(results)
+    test_mcp_tools(results)
+    test_stats_and_summary(results)
 
     # Final summary
-    total = PASS + FAIL
+    total = results.passed + results.failed
     print("\n" + "=" * 70)
-    print(f"  FINAL RESULTS: {PASS}/{total} passed, {FAIL} failed")
+    print(f"  FINAL RESULTS: {results.passed}/{total} passed, {results.failed} failed")
     print("=" * 70)
 
-    if FAIL > 0:
-        print(f"\n  {FAIL} test(s) FAILED — see details above")
+    if results.failed > 0:
+        print(f"\n  {results.failed} test(s) FAILED — see details above")
         return 1
     else:
         print("\n  All tests PASSED!")
@@ -31,6 +31,7 @@ Architecture:
 from __future__ import annotations
 
 import logging
+import re
 import time
 import uuid
 from typing import Optional
@@ -48,13 +49,19 @@ from .tools import (
     create_ticket,
     escalate_to_human,
     get_customer_history,
+    reset_ticket_cache,
     search_knowledge_base,
     send_response,
     set_db_pool,
+    start_ticket_cache,
 )
 
 logger = logging.getLogger("agent.core")
 
+# Patterns for pulling structured fields out of tool outputs
+_TICKET_ID_RE = re.compile(r"TF-\d{8}-[A-Z0-9]{4}")
+_SENTIMENT_SCORE_RE = re.compile(r"Score:\s*([-\d.]+)")
+
 # ── OpenAI Client ────────────────────────────────────────────────────────
 
 client = AsyncOpenAI()
@@ -182,7 +189,8 @@ async def run_agent(
     )
     messages.append({"role": "user", "content": user_message})
 
-    # Run the agent
+    # Run the agent (tools share a ticket cache scoped to this run)
+    ticket_cache_token = start_ticket_cache()
     try:
         result = await Runner.run(
             run_agent_instance,
@@ -212,8 +220,7 @@ async def run_agent(
 
                 # Extract ticket ID from create_ticket output
                 if "Ticket ID:" in output and "TF-" in output:
-                    import re
-                    match = re.search(r"TF-\d{8}-[A-Z0-9]{4}", output)
+                    match = _TICKET_ID_RE.search(output)
                     if match:
                         ticket_id = match.group()
 
@@ -224,8 +231,7 @@ async def run_agent(
 
                 # Extract sentiment from analyze_sentiment output
                 if "Score:" in output:
-                    import re
-                    match = re.search(r"Score:\s*([-\d.]+)", output)
+                    match = _SENTIMENT_SCORE_RE.search(output)
                     if match:
                         try:
                             sentiment_score = float(match.group(1))
@@ -282,3 +288,6 @@ async def run_agent(
             "latency_ms": latency_ms,
             "error": str(e),
         }
+
+    finally:
+        reset_ticket_cache(ticket_cache_token)
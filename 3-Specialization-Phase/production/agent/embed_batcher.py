@@ -0,0 +1,92 @@
+"""
+Embedding Batcher — Micro-Batching for Concurrent Embedding Requests
+=====================================================================
+Coalesces embedding requests that arrive within a short window into a
+single API call. The OpenAI embeddings endpoint accepts a list input, so
+N concurrent knowledge-base searches in one agent run pay one round-trip
+instead of N.
+
+Used by: tools.search_knowledge_base (via tools._embed_query)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("agent.embed_batcher")
+
+EmbedManyFn = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+class EmbeddingBatcher:
+    """Collects embed() calls for up to `window_ms` and sends them as one batch.
+
+    A batch is flushed when the window timer fires or when `max_batch`
+    requests are pending, whichever comes first. Identical texts within a
+    batch are sent once. If the API call fails, every caller in the batch
+    receives the exception.
+
+    Usage:
+        batcher = EmbeddingBatcher(embed_many, max_batch=100, window_ms=5.0)
+        vector = await batcher.embed("how do I reset my password")
+    """
+
+    def __init__(
+        self,
+        embed_many: EmbedManyFn,
+        max_batch: int = 100,
+        window_ms: float = 5.0,
+    ):
+        self._embed_many = embed_many
+        self._max_batch = max_batch
+        self._window_seconds = window_ms / 1000.0
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> list[float]:
+        """Queue a text for the next batch and wait for its vector."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window_seconds, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Hand the pending batch to a background task."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        """Embed one batch and resolve each caller's future."""
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+
+        try:
+            vectors = await self._embed_many(unique_texts)
+        except Exception as e:
+            logger.warning(f"Embedding batch of {len(unique_texts)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique_texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
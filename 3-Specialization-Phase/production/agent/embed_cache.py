@@ -0,0 +1,143 @@
+"""
+Embedding Cache — Two-Tier Query Embedding Store
+=================================================
+Keeps query embeddings warm so search_knowledge_base can skip the OpenAI
+embeddings round-trip.
+
+Tiers:
+  L1 — in-process LRU (OrderedDict), always on
+  L2 — Redis, shared across uvicorn workers and deploys (7-day TTL)
+
+L2 is opt-in: set ENABLE_EMBEDDING_CACHE=true and REDIS_URL. Redis errors
+degrade to L1-only; a cache outage never fails a search.
+
+Used by: tools.search_knowledge_base
+"""
+
+from __future__ import annotations
+
+import array
+import hashlib
+import logging
+import os
+import re
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger("agent.embed_cache")
+
+# ── Configuration ────────────────────────────────────────────────────────
+
+ENABLE_EMBEDDING_CACHE = os.environ.get("ENABLE_EMBEDDING_CACHE", "false").lower() == "true"
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+EMBEDDING_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_query(query: str) -> str:
+    """Fold trivial query variations onto one cache entry.
+
+    Lowercases, strips punctuation, and collapses whitespace, so
+    "How do I reset my password?" and "how do i  reset my password"
+    share a key.
+    """
+    return " ".join(_PUNCTUATION_RE.sub("", query.lower()).split())
+
+
+def embed_cache_key(query: str, model: str) -> str:
+    """Cache key for a query: model name + sha256 of the normalized query."""
+    normalized = normalize_query(query)
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: in-process LRU in front of optional Redis.
+
+    Vectors are stored in Redis as packed float32 bytes (6 KB for 1536 dims)
+    rather than JSON. L1 reads and writes never straddle an await, so the
+    event loop serializes them without a lock.
+
+    Usage:
+        cache = EmbeddingCache(maxsize=1000, redis_url="redis://redis:6379/0")
+        vec = await cache.get(key)
+        if vec is None:
+            vec = await embed(query)
+            await cache.set(key, vec)
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        redis_url: Optional[str] = None,
+        ttl_seconds: int = EMBEDDING_CACHE_TTL_SECONDS,
+    ):
+        self._maxsize = maxsize
+        self._redis_url = redis_url
+        self._ttl_seconds = ttl_seconds
+        self._l1: OrderedDict[str, list[float]] = OrderedDict()
+        self._redis = None
+
+    def __len__(self) -> int:
+        return len(self._l1)
+
+    def _get_redis(self):
+        """Lazily connect to Redis (None when L2 is disabled)."""
+        if self._redis is None and self._redis_url:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(self._redis_url)
+        return self._redis
+
+    def _put_l1(self, key: str, vector: list[float]) -> None:
+        self._l1[key] = vector
+        self._l1.move_to_end(key)
+        while len(self._l1) > self._maxsize:
+            self._l1.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[list[float]]:
+        """Look up a vector in L1, then L2 (promoting L2 hits into L1)."""
+        vector = self._l1.get(key)
+        if vector is not None:
+            self._l1.move_to_end(key)
+            return vector
+
+        redis = self._get_redis()
+        if redis is None:
+            return None
+
+        try:
+            raw = await redis.get(f"emb:{key}")
+        except Exception as e:
+            logger.warning(f"Embedding cache L2 read failed: {e}")
+            return None
+        if raw is None:
+            return None
+
+        packed = array.array("f")
+        packed.frombytes(raw)
+        vector = packed.tolist()
+        self._put_l1(key, vector)
+        return vector
+
+    async def set(self, key: str, vector: list[float]) -> None:
+        """Store a vector in both tiers."""
+        self._put_l1(key, vector)
+
+        redis = self._get_redis()
+        if redis is None:
+            return
+
+        try:
+            await redis.set(
+                f"emb:{key}",
+                array.array("f", vector).tobytes(),
+                ex=self._ttl_seconds,
+            )
+        except Exception as e:
+            logger.warning(f"Embedding cache L2 write failed: {e}")
+
+    def clear(self) -> None:
+        """Drop every L1 entry (L2 entries expire via TTL)."""
+        self._l1.clear()
@@ -15,6 +15,10 @@ import re
 from enum import Enum
 
 
+# Sentence boundary that does not split after numbered list items ("1.", "12.")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])(?<!\d\.)(?<!\d\d\.)\s+")
+
+
 class Channel(str, Enum):
     EMAIL = "email"
     WHATSAPP = "whatsapp"
@@ -108,7 +112,7 @@ def _whatsapp_truncate(text: str, max_chars: int = 280) -> str:
         return text
 
     # Split into sentences (avoid splitting after numbered items like "1.")
-    sentences = re.split(r"(?<=[.!?])(?<!\d\.)(?<!\d\d\.)\s+", text)
+    sentences = _SENTENCE_SPLIT_RE.split(text)
 
     # Also split on newlines for list items
     chunks = []
@@ -192,11 +196,15 @@ def _format_email(
 def _format_whatsapp(
     body: str,
     customer_name: str,
+    ticket_id: str | None,
     is_escalation: bool,
     sentiment_score: float,
 ) -> str:
     """Format for WhatsApp — concise, conversational, emoji-friendly.
 
+    ticket_id is accepted for a uniform formatter signature; WhatsApp
+    replies do not show it.
+
     Rules from brand-voice.md and extracted-prompts.md:
     - Keep under 300 chars
     - Casual-but-professional (contractions OK)
@@ -258,6 +266,25 @@ def _format_web_form(
     return f"{header}{tid}\n\n{empathy}{body}{footer}"
 
 
+# ── Dispatch Tables ──────────────────────────────────────────────────────
+# Resolved once at import: channel name → Channel → formatter.
+
+# Accepts legacy channel names from incubation ("gmail", "web-form")
+_CHANNEL_ALIASES = {
+    "gmail": Channel.EMAIL,
+    "email": Channel.EMAIL,
+    "whatsapp": Channel.WHATSAPP,
+    "web-form": Channel.WEB_FORM,
+    "web_form": Channel.WEB_FORM,
+}
+
+_FORMATTERS = {
+    Channel.EMAIL: _format_email,
+    Channel.WHATSAPP: _format_whatsapp,
+    Channel.WEB_FORM: _format_web_form,
+}
+
+
 # ── Public API ───────────────────────────────────────────────────────────
 
 
@@ -285,27 +312,15 @@ def format_for_channel(
     Returns:
         Formatted response string ready for delivery.
     """
-    # Normalize channel
-    if isinstance(channel, str):
-        # Handle legacy channel names from incubation
-        channel_map = {
-            "gmail": Channel.EMAIL,
-            "email": Channel.EMAIL,
-            "whatsapp": Channel.WHATSAPP,
-            "web-form": Channel.WEB_FORM,
-            "web_form": Channel.WEB_FORM,
-        }
-        channel = channel_map.get(channel.lower(), Channel.WEB_FORM)
+    # Normalize channel (Channel members are str, so check the enum first)
+    if not isinstance(channel, Channel):
+        channel = _CHANNEL_ALIASES.get(channel.lower(), Channel.WEB_FORM)
 
     # Normalize customer name
     if not customer_name or customer_name in ("Unknown", "None", ""):
         customer_name = "there"
 
-    if channel == Channel.EMAIL:
-        return _format_email(response, customer_name, ticket_id, is_escalation, sentiment_score)
-    elif channel == Channel.WHATSAPP:
-        return _format_whatsapp(response, customer_name, is_escalation, sentiment_score)
-    elif channel == Channel.WEB_FORM:
-        return _format_web_form(response, customer_name, ticket_id, is_escalation, sentiment_score)
-    else:
+    formatter = _FORMATTERS.get(channel)
+    if formatter is None:
         return response
+    return formatter(response, customer_name, ticket_id, is_escalation, sentiment_score)
@@ -13,6 +13,8 @@ Tools:
 
 Dependencies:
   - database.queries (asyncpg)
+  - agent.embed_cache (query embedding cache)
+  - agent.embed_batcher (micro-batched embedding requests)
   - agent.formatters (channel formatting)
   - agent.prompts (escalation routing, SLA)
   - openai (embeddings for knowledge base search)
@@ -22,15 +24,25 @@ Source: 2-Transition-to-Production/documentation/extracted-prompts.md §2
 
 from __future__ import annotations
 
+import contextvars
 import logging
 import re
+import secrets
 import uuid
-from typing import Optional
+from typing import NamedTuple, Optional
 
+import httpx
 from agents import function_tool
 from openai import AsyncOpenAI
 from pydantic import BaseModel, Field
 
+from .embed_batcher import EmbeddingBatcher
+from .embed_cache import (
+    ENABLE_EMBEDDING_CACHE,
+    REDIS_URL,
+    EmbeddingCache,
+    embed_cache_key,
+)
 from .formatters import format_for_channel
 from .prompts import ESCALATION_ROUTING, SLA_BY_PLAN
 
@@ -56,9 +68,140 @@ def _get_pool():
     return _db_pool
 
 
+# ── Per-Run Ticket Cache ────────────────────────────────────────────────
+# create_ticket already holds the ticket row; escalate_to_human and
+# send_response look it up again by ref. run_agent opens a fresh cache per
+# conversation turn so those tools reuse the row instead of hitting the DB.
+# Outside a run (cache unset) every lookup goes to the database.
+
+_ticket_cache: contextvars.ContextVar[Optional[dict[str, dict]]] = contextvars.ContextVar(
+    "ticket_cache", default=None
+)
+
+
+def start_ticket_cache() -> contextvars.Token:
+    """Open an empty ticket cache for the current run; returns a reset token."""
+    return _ticket_cache.set({})
+
+
+def reset_ticket_cache(token: contextvars.Token) -> None:
+    """Close the run's ticket cache."""
+    _ticket_cache.reset(token)
+
+
+def _remember_ticket(ticket: Optional[dict]) -> None:
+    cache = _ticket_cache.get()
+    if cache is not None and ticket:
+        cache[ticket["ticket_ref"]] = ticket
+
+
+async def _get_ticket(pool, ticket_ref: str) -> Optional[dict]:
+    """get_ticket_by_ref, served from the run's ticket cache when possible."""
+    from database.queries import get_ticket_by_ref
+
+    cache = _ticket_cache.get()
+    if cache is not None and ticket_ref in cache:
+        return cache[ticket_ref]
+
+    ticket = await get_ticket_by_ref(pool, ticket_ref)
+    _remember_ticket(ticket)
+    return ticket
+
+
+# ── Query Embedding Cache ───────────────────────────────────────────────
+# Repeated queries ("how do I reset my password?") skip the OpenAI round-trip.
+# L1 is per-process; L2 (Redis) is shared across workers when enabled.
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# One OpenAI client per process: keeps the httpx connection pool (and its
+# TLS sessions) warm across tool calls instead of rebuilding it per search.
+_openai_client: Optional[AsyncOpenAI] = None
+
+
+def _get_openai() -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client, creating it on first use."""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(
+            timeout=10.0,
+            max_retries=2,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=20),
+            ),
+        )
+    return _openai_client
+
+
+_embedding_cache = EmbeddingCache(
+    maxsize=1000,
+    redis_url=REDIS_URL if ENABLE_EMBEDDING_CACHE else None,
+)
+
+
+async def _embed_texts(texts: list[str]) -> list[list[float]]:
+    """Embed a batch of texts in a single OpenAI request."""
+    client = _get_openai()
+    response = await client.embeddings.create(
+        model=EMBEDDING_MODEL,
+        input=texts,
+    )
+    return [item.embedding for item in response.data]
+
+
+# Concurrent searches within a 5ms window share one embeddings request.
+_embedding_batcher = EmbeddingBatcher(_embed_texts, max_batch=100, window_ms=5.0)
+
+
+async def _embed_query(query: str) -> list[float]:
+    """Return the embedding for a search query, served from cache when warm."""
+    key = embed_cache_key(query, EMBEDDING_MODEL)
+    cached = await _embedding_cache.get(key)
+    if cached is not None:
+        return cached
+
+    embedding = await _embedding_batcher.embed(query)
+
+    await _embedding_cache.set(key, embedding)
+    return embedding
+
+
 # ── Tool 1: search_knowledge_base ───────────────────────────────────────
 
 
+# Knowledge base categories are the ## headings of product-docs.md.
+# Common shorthand the agent uses maps onto the canonical (lowercased) name.
+_CATEGORY_ALIASES = {
+    "getting started": "getting started",
+    "core features": "core features",
+    "features": "core features",
+    "integrations": "integrations",
+    "integration": "integrations",
+    "account management": "account management",
+    "account": "account management",
+    "mobile app": "mobile app",
+    "mobile": "mobile app",
+    "troubleshooting": "troubleshooting",
+    "frequently asked questions": "frequently asked questions",
+    "faq": "frequently asked questions",
+    "faqs": "frequently asked questions",
+}
+
+
+def _category_pattern(category: str) -> str:
+    """ILIKE pattern for a requested category.
+
+    Known categories and aliases match their canonical heading exactly
+    (case-insensitive); anything else keeps the loose substring match.
+    """
+    wanted = category.lower().strip()
+    target = _CATEGORY_ALIASES.get(wanted)
+    if target is not None:
+        return target
+    escaped = wanted.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
 class KnowledgeSearchInput(BaseModel):
     """Input schema for knowledge base search."""
 
@@ -89,28 +232,27 @@ async def search_knowledge_base(input: KnowledgeSearchInput) -> str:
     from database.queries import search_knowledge_base as db_search
 
     try:
-        # Generate embedding for the query
-        client = AsyncOpenAI()
-        embedding_response = await client.embeddings.create(
-            model="text-embedding-3-small",
-            input=input.query,
-        )
-        query_embedding = embedding_response.data[0].embedding
+        # Generate embedding for the query (cached per normalized query)
+        query_embedding = await _embed_query(input.query)
 
-        # Search database
+        # Search database (category filter runs in SQL, so top_k are all matches)
         pool = _get_pool()
         results = await db_search(
             pool,
             query_embedding=query_embedding,
             top_k=input.max_results,
             similarity_threshold=0.3,
+            category=_category_pattern(input.category) if input.category else None,
         )
 
-        # Filter by category if specified
-        if input.category and results:
-            results = [
-                r for r in results if input.category.lower() in (r.get("category") or "").lower()
-            ] or results  # Fall back to unfiltered if no category matches
+        # Fall back to unfiltered if nothing in that category matches
+        if input.category and not results:
+            results = await db_search(
+                pool,
+                query_embedding=query_embedding,
+                top_k=input.max_results,
+                similarity_threshold=0.3,
+            )
 
         if not results:
             return (
@@ -128,7 +270,8 @@ async def search_knowledge_base(input: KnowledgeSearchInput) -> str:
 
             # Truncate content to ~500 chars for context window efficiency
             if len(content) > 500:
-                content = content[:500].rsplit(" ", 1)[0] + "..."
+                cut = content.rfind(" ", 0, 500)
+                content = content[:cut if cut > 0 else 500] + "..."
 
             output.append(
                 f"### Result {i}: {title} (relevance: {score:.2f})\n{content}"
@@ -169,6 +312,21 @@ class TicketInput(BaseModel):
     channel: str = Field(description="Source channel: email, whatsapp, web_form")
 
 
+_TICKET_CREATED_TEMPLATE = (
+    "Ticket created successfully.\n"
+    "**Ticket ID:** {ticket_ref}\n"
+    "**Priority:** {priority}\n"
+    "**Category:** {category}\n"
+    "**Status:** open\n\n"
+    "Use this ticket ID ({ticket_ref}) in all responses to the customer."
+)
+
+_TICKET_FALLBACK_TEMPLATE = (
+    "Ticket tracking note: Database unavailable, using reference {ticket_ref}.\n"
+    "Please include this reference in your response."
+)
+
+
 @function_tool
 async def create_ticket(input: TicketInput) -> str:
     """Create a support ticket for tracking.
@@ -204,14 +362,12 @@ async def create_ticket(input: TicketInput) -> str:
             category=input.category,
             priority=input.priority,
         )
+        _remember_ticket(ticket)
 
-        return (
-            f"Ticket created successfully.\n"
-            f"**Ticket ID:** {ticket['ticket_ref']}\n"
-            f"**Priority:** {input.priority}\n"
-            f"**Category:** {input.category}\n"
-            f"**Status:** open\n\n"
-            f"Use this ticket ID ({ticket['ticket_ref']}) in all responses to the customer."
+        return _TICKET_CREATED_TEMPLATE.format(
+            ticket_ref=ticket["ticket_ref"],
+            priority=input.priority,
+            category=input.category,
         )
 
     except Exception as e:
@@ -220,11 +376,8 @@ async def create_ticket(input: TicketInput) -> str:
         from datetime import datetime, timezone
 
         date_str = datetime.now(timezone.utc).strftime("%Y%m%d")
-        fallback_ref = f"TF-{date_str}-{uuid.uuid4().hex[:4].upper()}"
-        return (
-            f"Ticket tracking note: Database unavailable, using reference {fallback_ref}.\n"
-            f"Please include this reference in your response."
-        )
+        fallback_ref = f"TF-{date_str}-{secrets.token_hex(2).upper()}"
+        return _TICKET_FALLBACK_TEMPLATE.format(ticket_ref=fallback_ref)
 
 
 # ── Tool 3: get_customer_history ────────────────────────────────────────
@@ -363,6 +516,31 @@ class EscalationInput(BaseModel):
     )
 
 
+# Urgency → expected human response time
+_URGENCY_RESPONSE_TIME = {
+    "critical": "< 15 minutes",
+    "high": "< 1 hour",
+    "normal": "< 4 hours",
+    "low": "< 24 hours",
+}
+
+_ESCALATION_TEMPLATE = (
+    "## Escalation Confirmed\n\n"
+    "**Escalation ID:** {escalation_id}\n"
+    "**Ticket:** {ticket_id}\n"
+    "**Assigned to:** {assignee} ({assignee_email})\n"
+    "**Category:** {category}\n"
+    "**Urgency:** {urgency}\n"
+    "**Expected response:** {response_time}\n"
+    "**Reason:** {reason}\n\n"
+    "Tell the customer:\n"
+    "- Their case has been assigned to {assignee}\n"
+    "- They can expect a response within {response_time}\n"
+    "- Reference their ticket ID: {ticket_id}\n"
+    "- Show empathy appropriate to the situation"
+)
+
+
 @function_tool
 async def escalate_to_human(input: EscalationInput) -> str:
     """Escalate a conversation to a human support agent.
@@ -380,7 +558,7 @@ async def escalate_to_human(input: EscalationInput) -> str:
     ALWAYS tell the customer who will handle their case and the expected
     response time based on their plan tier.
     """
-    from database.queries import escalate_ticket, get_ticket_by_ref
+    from database.queries import escalate_ticket
 
     # Determine routing
     routing = ESCALATION_ROUTING.get(
@@ -388,19 +566,13 @@ async def escalate_to_human(input: EscalationInput) -> str:
     )
 
     # Map urgency to response time
-    urgency_map = {
-        "critical": "< 15 minutes",
-        "high": "< 1 hour",
-        "normal": "< 4 hours",
-        "low": "< 24 hours",
-    }
-    response_time = urgency_map.get(input.urgency, "< 4 hours")
+    response_time = _URGENCY_RESPONSE_TIME.get(input.urgency, "< 4 hours")
 
     try:
         pool = _get_pool()
 
-        # Look up the ticket
-        ticket = await get_ticket_by_ref(pool, input.ticket_id)
+        # Look up the ticket (reuses the row create_ticket saw this run)
+        ticket = await _get_ticket(pool, input.ticket_id)
         if ticket:
             await escalate_ticket(
                 pool,
@@ -415,22 +587,17 @@ async def escalate_to_human(input: EscalationInput) -> str:
         # Continue anyway — the routing info is still valid
 
     # Build escalation handoff (from escalation-rules.md format)
-    escalation_id = f"ESC-{uuid.uuid4().hex[:8].upper()}"
+    escalation_id = f"ESC-{secrets.token_hex(4).upper()}"
 
-    return (
-        f"## Escalation Confirmed\n\n"
-        f"**Escalation ID:** {escalation_id}\n"
-        f"**Ticket:** {input.ticket_id}\n"
-        f"**Assigned to:** {routing['name']} ({routing['email']})\n"
-        f"**Category:** {input.category}\n"
-        f"**Urgency:** {input.urgency}\n"
-        f"**Expected response:** {response_time}\n"
-        f"**Reason:** {input.reason}\n\n"
-        f"Tell the customer:\n"
-        f"- Their case has been assigned to {routing['name']}\n"
-        f"- They can expect a response within {response_time}\n"
-        f"- Reference their ticket ID: {input.ticket_id}\n"
-        f"- Show empathy appropriate to the situation"
+    return _ESCALATION_TEMPLATE.format(
+        escalation_id=escalation_id,
+        ticket_id=input.ticket_id,
+        assignee=routing["name"],
+        assignee_email=routing["email"],
+        category=input.category,
+        urgency=input.urgency,
+        response_time=response_time,
+        reason=input.reason,
     )
 
 
@@ -454,6 +621,13 @@ class ResponseInput(BaseModel):
     )
 
 
+_RESPONSE_SENT_TEMPLATE = (
+    "**Response sent via {channel}**\n\n"
+    "---\n{formatted}\n---\n\n"
+    "Character count: {char_count}"
+)
+
+
 @function_tool
 async def send_response(input: ResponseInput) -> str:
     """Format and deliver a response to the customer on their channel.
@@ -466,7 +640,7 @@ async def send_response(input: ResponseInput) -> str:
     ALWAYS use this tool to send responses. The formatting ensures
     brand-voice compliance across all channels.
     """
-    from database.queries import add_message, get_active_conversation, get_ticket_by_ref
+    from database.queries import add_message
 
     # Format the message for the channel
     formatted = format_for_channel(
@@ -483,7 +657,7 @@ async def send_response(input: ResponseInput) -> str:
         pool = _get_pool()
 
         # Find the conversation via ticket
-        ticket = await get_ticket_by_ref(pool, input.ticket_id)
+        ticket = await _get_ticket(pool, input.ticket_id)
         if ticket:
             await add_message(
                 pool,
@@ -498,10 +672,10 @@ async def send_response(input: ResponseInput) -> str:
         logger.error(f"Failed to store response in DB: {e}")
         # Continue — delivery is more important than storage
 
-    return (
-        f"**Response sent via {input.channel}**\n\n"
-        f"---\n{formatted}\n---\n\n"
-        f"Character count: {len(formatted)}"
+    return _RESPONSE_SENT_TEMPLATE.format(
+        channel=input.channel,
+        formatted=formatted,
+        char_count=len(formatted),
     )
 
 
@@ -606,54 +780,132 @@ _INTENSIFIERS = {
 }
 
 
-def _analyze_sentiment_score(text: str) -> float:
-    """Keyword-based sentiment scoring from -1.0 to 1.0.
+# Only these words carry weight; every other token is context at most.
+_SENTIMENT_WORDS = frozenset(_POSITIVE_WORDS) | frozenset(_NEGATIVE_WORDS)
 
-    Ported from prototype.py SentimentAnalyzer.analyze() — identical logic
-    to ensure consistent behavior with incubation test results.
+
+class _LexEntry(NamedTuple):
+    """Everything the scorer needs to know about one word, in one lookup."""
+
+    pos_weight: int
+    neg_weight: int
+    multiplier: float
+    is_negation: bool
+
+
+_NO_ENTRY = _LexEntry(0, 0, 1.0, False)
+
+# The four word lists fused into a single hash table
+_LEXICON: dict[str, _LexEntry] = {
+    word: _LexEntry(
+        _POSITIVE_WORDS.get(word, 0),
+        _NEGATIVE_WORDS.get(word, 0),
+        _INTENSIFIERS.get(word, 1.0),
+        word in _NEGATION_WORDS,
+    )
+    for word in (
+        _POSITIVE_WORDS.keys()
+        | _NEGATIVE_WORDS.keys()
+        | _INTENSIFIERS.keys()
+        | _NEGATION_WORDS
+    )
+}
+
+
+class _TokenizeTable(dict):
+    """str.translate table: lowercase, keep [a-z'], map everything else to space.
+
+    ASCII is precomputed; other code points are resolved on first sight
+    (via str.lower, which can yield ASCII — e.g. KELVIN SIGN → "k") and
+    memoized, so the result matches re.findall(r"[a-z']+", text.lower()).
     """
-    if not text or len(text.strip()) < 2:
-        return 0.0
 
-    words = re.findall(r"[a-z']+", text.lower())
-    if not words:
-        return 0.0
+    def __missing__(self, codepoint: int) -> str:
+        mapped = "".join(
+            c if ("a" <= c <= "z" or c == "'") else " "
+            for c in chr(codepoint).lower()
+        )
+        self[codepoint] = mapped
+        return mapped
+
+
+_TOKENIZE_TABLE = _TokenizeTable()
+for _cp in range(128):
+    _TOKENIZE_TABLE.__missing__(_cp)
+del _cp
+
+_NON_ALPHA_RE = re.compile(r"[^a-zA-Z]")
+
+
+def _score_words(
+    words: list[str],
+    lexicon: dict = _LEXICON,
+    sentiment_words: frozenset = _SENTIMENT_WORDS,
+    no_entry: _LexEntry = _NO_ENTRY,
+) -> tuple[float, float]:
+    """Sliding-window scoring kernel: returns (pos_score, neg_score).
+
+    Each word costs one _LEXICON lookup; the two preceding words are only
+    looked up for sentiment hits. Lookup tables are bound as default
+    arguments so the hot loop reads locals instead of module globals.
+    Messages with no lexicon word at all (most how-to questions) are
+    rejected in one C-level set scan before the Python loop runs.
+    """
+    if sentiment_words.isdisjoint(words):
+        return 0.0, 0.0
 
     pos_score = 0.0
     neg_score = 0.0
-    prev_word = ""
-    prev_prev_word = ""
-
-    for word in words:
-        multiplier = 1.0
-        if prev_word in _INTENSIFIERS:
-            multiplier = _INTENSIFIERS[prev_word]
-
-        negated = False
-        if prev_word in _NEGATION_WORDS or (
-            prev_word.endswith("n't") or prev_prev_word in _NEGATION_WORDS
-        ):
-            negated = True
-
-        if word in _POSITIVE_WORDS:
-            weight = _POSITIVE_WORDS[word] * multiplier
+
+    for i, word in enumerate(words):
+        pos_weight, neg_weight, _, _ = lexicon.get(word, no_entry)
+        if not (pos_weight or neg_weight):
+            continue
+
+        prev_word = words[i - 1] if i >= 1 else ""
+        _, _, multiplier, prev_negates = lexicon.get(prev_word, no_entry)
+
+        negated = (
+            prev_negates
+            or prev_word.endswith("n't")
+            or (i >= 2 and lexicon.get(words[i - 2], no_entry).is_negation)
+        )
+
+        if pos_weight:
+            weight = pos_weight * multiplier
             if negated:
                 neg_score += weight * 0.5
             else:
                 pos_score += weight
 
-        if word in _NEGATIVE_WORDS:
-            weight = _NEGATIVE_WORDS[word] * multiplier
+        if neg_weight:
+            weight = neg_weight * multiplier
             if negated:
                 pos_score += weight * 0.3
             else:
                 neg_score += weight
 
-        prev_prev_word = prev_word
-        prev_word = word
+    return pos_score, neg_score
+
+
+def _analyze_sentiment_score(text: str) -> float:
+    """Keyword-based sentiment scoring from -1.0 to 1.0.
+
+    Ported from prototype.py SentimentAnalyzer.analyze() — identical logic
+    to ensure consistent behavior with incubation test results. Tokenizes,
+    runs _score_words, then applies the ALL-CAPS and exclamation adjustments.
+    """
+    if not text or len(text.strip()) < 2:
+        return 0.0
+
+    words = text.translate(_TOKENIZE_TABLE).split()
+    if not words:
+        return 0.0
+
+    pos_score, neg_score = _score_words(words)
 
     # ALL CAPS detection (anger signal)
-    alpha_chars = re.sub(r"[^a-zA-Z]", "", text)
+    alpha_chars = _NON_ALPHA_RE.sub("", text)
     if len(alpha_chars) > 15 and alpha_chars == alpha_chars.upper():
         neg_score += 5.0
 
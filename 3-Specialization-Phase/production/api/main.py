@@ -20,6 +20,7 @@ Environment:
   DATABASE_URL — PostgreSQL connection string
   KAFKA_BOOTSTRAP_SERVERS — Kafka broker list
   CORS_ORIGINS — Comma-separated allowed origins
+  DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE — asyncpg pool bounds (default 10 / 25)
 """
 
 from __future__ import annotations
@@ -40,7 +41,17 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 from agent.tools import set_db_pool
+from channels.web_form_handler import drain_background_publishes
 from channels.web_form_handler import router as web_form_router
+from database.queries import (
+    POOL_SERVER_SETTINGS,
+    POOL_STATEMENT_CACHE,
+    init_connection,
+    start_channel_config_listener,
+    start_timestamp_flusher,
+    stop_channel_config_listener,
+    stop_timestamp_flusher,
+)
 from kafka_client import (
     TOPICS,
     get_producer,
@@ -69,6 +80,11 @@ DATABASE_URL = os.environ.get(
 
 CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "http://localhost:3000").split(",")
 
+# One pool serves the web form endpoints and the agent tools; size it for
+# the number of queries expected in flight at once, not the worker count.
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "10"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "25"))
+
 
 # ── Lifespan ────────────────────────────────────────────────────────────
 
@@ -79,22 +95,35 @@ async def lifespan(app: FastAPI):
     # ── Startup ──────────────────────────────────────────────────────
     logger.info("Starting Customer Success Digital FTE API...")
 
-    # 1. Connect to PostgreSQL
+    # 1. Connect to PostgreSQL (create_pool opens min_size connections up
+    #    front, so the first requests do not pay connection setup)
     try:
         pool = await asyncpg.create_pool(
             DATABASE_URL,
-            min_size=2,
-            max_size=10,
-            command_timeout=30,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            max_inactive_connection_lifetime=300,
+            command_timeout=10,
+            init=init_connection,
+            server_settings=POOL_SERVER_SETTINGS,
+            **POOL_STATEMENT_CACHE,
         )
         app.state.db_pool = pool
         set_db_pool(pool)
+        start_timestamp_flusher(pool)
         logger.info("PostgreSQL pool connected")
     except Exception as e:
         logger.error(f"Failed to connect to PostgreSQL: {e}")
         raise
 
-    # 2. Start Kafka producer
+    # 2. Cache channel configs, invalidated by NOTIFY (non-fatal: without
+    #    the listener every lookup just goes to the database)
+    try:
+        await start_channel_config_listener(DATABASE_URL)
+    except Exception as e:
+        logger.warning(f"Channel config listener failed to start (non-fatal): {e}")
+
+    # 3. Start Kafka producer
     try:
         await init_producer()
         logger.info("Kafka producer started")
@@ -108,14 +137,21 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down API...")
 
     try:
+        await drain_background_publishes()
         await shutdown_producer()
         logger.info("Kafka producer stopped")
     except Exception as e:
         logger.warning(f"Error stopping Kafka producer: {e}")
 
+    try:
+        await stop_channel_config_listener()
+    except Exception as e:
+        logger.warning(f"Error closing channel config listener: {e}")
+
     try:
         pool = app.state.db_pool
         if pool:
+            await stop_timestamp_flusher(pool)
             await pool.close()
             logger.info("PostgreSQL pool closed")
     except Exception as e:
@@ -390,11 +426,21 @@ async def get_channel_metrics(
 
     Returns response latency, escalation rate, sentiment, and ticket
     counts for each channel over the specified time window.
+
+    Figures come from the agent_metrics_5m rollup, which the metrics
+    collector worker refreshes every minute. If that worker has fallen
+    behind (or isn't running), the rollup is brought up to date here
+    first. p50/p95 are approximate: count-weighted means of the
+    per-5-minute-bucket percentiles. Count, avg, min and max are exact.
     """
     try:
-        from database.queries import get_metrics_summary
+        from database.queries import get_metrics_summary, refresh_metrics_rollup_if_stale
 
         pool = request.app.state.db_pool
+        try:
+            await refresh_metrics_rollup_if_stale(pool, max_lookback_minutes=hours * 60)
+        except Exception as e:
+            logger.warning(f"Metrics rollup freshness check failed: {e}")
         channels = ["email", "whatsapp", "web_form"] if not channel else [channel]
 
         metrics = {}
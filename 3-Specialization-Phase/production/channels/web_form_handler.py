@@ -18,24 +18,44 @@ just validated HTTP requests from our own frontend.
 
 from __future__ import annotations
 
+import asyncio
 import logging
-import uuid
+import secrets
+import string
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Awaitable, Literal, Optional, get_args
 
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, EmailStr, Field, field_validator
+from pydantic import BaseModel, EmailStr, Field, model_validator
+
+from agent.tools import _get_pool
+from database.queries import (
+    create_ticket_end_to_end,
+    get_conversation_history,
+    get_ticket_by_ref,
+)
+from kafka_client import get_producer
 
 logger = logging.getLogger("channels.web_form")
 
+# No custom default_response_class: endpoints that declare a response_model
+# are serialized straight to JSON bytes by pydantic-core, which a custom class
+# (ORJSONResponse included) would switch off.
 router = APIRouter(prefix="/support", tags=["support-form"])
 
 
 # ── Request / Response Models ────────────────────────────────────────────
 
 
-VALID_CATEGORIES = ["general", "technical", "billing", "feedback", "bug_report"]
-VALID_PRIORITIES = ["low", "medium", "high", "urgent"]
+# Literal types are checked by pydantic-core itself, with no Python validator
+Category = Literal["general", "technical", "billing", "feedback", "bug_report"]
+Priority = Literal["low", "medium", "high", "urgent"]
+
+# Derived from the Literals so there is one source of truth (O(1) membership)
+VALID_CATEGORIES = frozenset(get_args(Category))
+VALID_PRIORITIES = frozenset(get_args(Priority))
+
+_STRIPPED_FIELDS = ("name", "subject", "message")
 
 
 class SupportFormSubmission(BaseModel):
@@ -43,56 +63,32 @@ class SupportFormSubmission(BaseModel):
 
     All fields are validated before processing. Invalid submissions
     return 422 with specific field errors.
+
+    Free-text fields are stripped in one pre-validation pass; length bounds,
+    email format, and the category/priority enums are then enforced by
+    pydantic-core.
     """
 
     name: str = Field(min_length=2, max_length=255, description="Customer's full name")
     email: EmailStr = Field(description="Customer's email address")
     subject: str = Field(min_length=3, max_length=500, description="Issue subject line")
-    category: str = Field(
+    category: Category = Field(
         default="general",
         description="Issue category: general, technical, billing, feedback, bug_report",
     )
     message: str = Field(min_length=10, max_length=5000, description="Detailed description of the issue")
-    priority: str = Field(default="medium", description="Priority: low, medium, high, urgent")
+    priority: Priority = Field(default="medium", description="Priority: low, medium, high, urgent")
     plan: str = Field(default="free", description="Customer plan: free, pro, enterprise")
 
-    @field_validator("name")
-    @classmethod
-    def name_must_not_be_empty(cls, v: str) -> str:
-        v = v.strip()
-        if len(v) < 2:
-            raise ValueError("Name must be at least 2 characters")
-        return v
-
-    @field_validator("subject")
-    @classmethod
-    def subject_must_have_content(cls, v: str) -> str:
-        v = v.strip()
-        if len(v) < 3:
-            raise ValueError("Subject must be at least 3 characters")
-        return v
-
-    @field_validator("message")
-    @classmethod
-    def message_must_have_content(cls, v: str) -> str:
-        v = v.strip()
-        if len(v) < 10:
-            raise ValueError("Message must be at least 10 characters")
-        return v
-
-    @field_validator("category")
+    @model_validator(mode="before")
     @classmethod
-    def category_must_be_valid(cls, v: str) -> str:
-        if v not in VALID_CATEGORIES:
-            raise ValueError(f"Category must be one of: {VALID_CATEGORIES}")
-        return v
-
-    @field_validator("priority")
-    @classmethod
-    def priority_must_be_valid(cls, v: str) -> str:
-        if v not in VALID_PRIORITIES:
-            raise ValueError(f"Priority must be one of: {VALID_PRIORITIES}")
-        return v
+    def strip_text_fields(cls, data: Any) -> Any:
+        if isinstance(data, dict):
+            data = {
+                k: v.strip() if k in _STRIPPED_FIELDS and isinstance(v, str) else v
+                for k, v in data.items()
+            }
+        return data
 
 
 class SupportFormResponse(BaseModel):
@@ -126,6 +122,76 @@ SLA_RESPONSE_TIMES = {
 }
 
 
+# ── Helpers ──────────────────────────────────────────────────────────────
+
+_TICKET_SUFFIX_CHARS = frozenset(string.ascii_uppercase + string.digits)
+
+
+def _valid_ticket_id(ticket_id: str) -> bool:
+    """Check the TF-YYYYMMDD-XXXX shape without going through the regex engine."""
+    date_part = ticket_id[3:11]
+    return (
+        len(ticket_id) == 16
+        and ticket_id.startswith("TF-")
+        and ticket_id[11] == "-"
+        and date_part.isascii()
+        and date_part.isdigit()
+        and _TICKET_SUFFIX_CHARS.issuperset(ticket_id[12:])
+    )
+
+
+def _isoformat(value: Any) -> str:
+    """ISO string for DB timestamps; anything else is passed through str()."""
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+# ── Ticket Date Cache ────────────────────────────────────────────────────
+# strftime is comparatively slow; the YYYYMMDD part of a ticket ID only
+# changes once a day, so format it at most once per second.
+
+_date_cache: dict = {"epoch": -1, "date": ""}
+
+
+def _ticket_date(now: datetime) -> str:
+    """YYYYMMDD for `now`, reformatted only when the UTC second changes."""
+    epoch = int(now.timestamp())
+    if epoch != _date_cache["epoch"]:
+        _date_cache["epoch"] = epoch
+        _date_cache["date"] = now.strftime("%Y%m%d")
+    return _date_cache["date"]
+
+
+# ── Background Publishing ────────────────────────────────────────────────
+# Kafka publishes run as tasks so the request never waits on the broker ack.
+# References are held here until each task finishes (the loop only keeps
+# weak references to tasks).
+
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def _await_publish(publish: Awaitable[None], ticket_id: str) -> None:
+    """Await a Kafka publish, logging instead of raising."""
+    try:
+        await publish
+        logger.info(f"Web form submission published to Kafka: {ticket_id}")
+    except Exception as e:
+        logger.warning(f"Kafka publish failed for {ticket_id}: {e}")
+
+
+def _publish_in_background(producer, normalized_message: dict, ticket_id: str) -> None:
+    """Start publishing a submission without awaiting the broker ack."""
+    publish = producer.publish("fte.channels.webform.inbound", normalized_message)
+    task = asyncio.create_task(_await_publish(publish, ticket_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def drain_background_publishes() -> None:
+    """Wait for in-flight publishes. Call on shutdown before stopping the producer."""
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+
+
 # ── Endpoints ────────────────────────────────────────────────────────────
 
 
@@ -135,16 +201,41 @@ async def submit_support_form(submission: SupportFormSubmission):
 
     Workflow:
       1. Validate the submission (handled by Pydantic)
-      2. Generate a ticket reference ID
+      2. Store customer, conversation and ticket in the database; the
+         ticket reference comes from next_ticket_ref()
       3. Normalize to standard message format
-      4. Publish to Kafka for agent processing
-      5. Store initial record in database
-      6. Return confirmation with ticket ID and SLA
+      4. Publish to Kafka for agent processing (in the background)
+      5. Return confirmation with ticket ID and SLA
     """
-    # Generate ticket reference
-    date_str = datetime.now(timezone.utc).strftime("%Y%m%d")
-    short_id = uuid.uuid4().hex[:4].upper()
-    ticket_id = f"TF-{date_str}-{short_id}"
+    now = datetime.now(timezone.utc)
+
+    # Direct database storage for immediate tracking (customer, conversation,
+    # and ticket in one round trip). The ticket ref is sequence-assigned so
+    # it can't collide with refs issued elsewhere.
+    ticket_id = None
+    try:
+        pool = _get_pool()
+
+        row = await create_ticket_end_to_end(
+            pool,
+            email=submission.email,
+            name=submission.name,
+            plan=submission.plan,
+            subject=submission.subject,
+            category=submission.category,
+            priority=submission.priority,
+            source_channel="web_form",
+        )
+        if row:
+            ticket_id = row["ticket_ref"]
+            logger.info(f"Web form submission stored in DB: {ticket_id}")
+
+    except Exception as e:
+        logger.warning(f"DB storage failed (Kafka will handle): {e}")
+
+    if ticket_id is None:
+        # Nothing stored: a reference for the customer and the Kafka event
+        ticket_id = f"TF-{_ticket_date(now)}-{secrets.token_hex(2).upper()}"
 
     # Build normalized message (same format as other channels)
     normalized_message = {
@@ -157,64 +248,22 @@ async def submit_support_form(submission: SupportFormSubmission):
         "category": submission.category,
         "priority": submission.priority,
         "customer_plan": submission.plan,
-        "received_at": datetime.now(timezone.utc).isoformat(),
+        "received_at": now.isoformat(),
         "metadata": {
             "form_version": "1.0",
             "source": "web_form",
         },
     }
 
-    # Publish to Kafka for async processing
+    # Publish to Kafka for async processing (fire-and-forget: the response
+    # does not wait for the broker ack)
     try:
-        from kafka_client import get_producer
-
         producer = get_producer()
         if producer:
-            await producer.publish("fte.channels.webform.inbound", normalized_message)
-            logger.info(f"Web form submission published to Kafka: {ticket_id}")
+            _publish_in_background(producer, normalized_message, ticket_id)
     except Exception as e:
         logger.warning(f"Kafka publish failed (processing synchronously): {e}")
 
-    # Also attempt direct database storage for immediate tracking
-    try:
-        from agent.tools import _get_pool
-        from database.queries import (
-            create_conversation,
-            create_ticket,
-            get_or_create_customer,
-        )
-
-        pool = _get_pool()
-
-        # Get or create customer
-        customer = await get_or_create_customer(
-            pool,
-            email=submission.email,
-            name=submission.name,
-            plan=submission.plan,
-        )
-
-        # Create conversation
-        conversation = await create_conversation(
-            pool, customer["id"], "web_form"
-        )
-
-        # Create ticket
-        await create_ticket(
-            pool,
-            conversation_id=conversation["id"],
-            customer_id=customer["id"],
-            source_channel="web_form",
-            subject=submission.subject,
-            category=submission.category,
-            priority=submission.priority,
-        )
-
-        logger.info(f"Web form submission stored in DB: {ticket_id}")
-
-    except Exception as e:
-        logger.warning(f"DB storage failed (Kafka will handle): {e}")
-
     # Determine SLA response time
     response_time = SLA_RESPONSE_TIMES.get(submission.plan, "within 24 hours")
 
@@ -223,7 +272,9 @@ async def submit_support_form(submission: SupportFormSubmission):
         f"email={submission.email}, category={submission.category}"
     )
 
-    return SupportFormResponse(
+    # Server-built fields: skip construction-time validation. FastAPI still
+    # validates once against response_model when serializing.
+    return SupportFormResponse.model_construct(
         ticket_id=ticket_id,
         message=(
             f"Thank you for contacting TaskFlow Support, {submission.name}! "
@@ -242,18 +293,13 @@ async def get_ticket_status(ticket_id: str):
     Used by the frontend to show ticket progress to customers.
     """
     # Validate ticket_id format
-    import re
-
-    if not re.match(r"^TF-\d{8}-[A-Z0-9]{4}$", ticket_id):
+    if not _valid_ticket_id(ticket_id):
         raise HTTPException(
             status_code=400,
             detail="Invalid ticket ID format. Expected: TF-YYYYMMDD-XXXX",
         )
 
     try:
-        from agent.tools import _get_pool
-        from database.queries import get_conversation_history, get_ticket_by_ref
-
         pool = _get_pool()
         ticket = await get_ticket_by_ref(pool, ticket_id)
 
@@ -271,19 +317,16 @@ async def get_ticket_status(ticket_id: str):
                     "role": m.get("role", ""),
                     "content": m.get("content", ""),
                     "channel": m.get("channel", ""),
-                    "created_at": m.get("created_at", "").isoformat()
-                    if hasattr(m.get("created_at", ""), "isoformat")
-                    else str(m.get("created_at", "")),
+                    "created_at": _isoformat(m.get("created_at", "")),
                 }
                 for m in raw_messages
             ]
 
-        return TicketStatusResponse(
+        # Built from our own DB rows — response_model validation covers it
+        return TicketStatusResponse.model_construct(
             ticket_id=ticket_id,
             status=ticket.get("status", "unknown"),
-            created_at=ticket.get("created_at", "").isoformat()
-            if hasattr(ticket.get("created_at", ""), "isoformat")
-            else str(ticket.get("created_at", "")),
+            created_at=_isoformat(ticket.get("created_at", "")),
             subject=ticket.get("subject"),
             category=ticket.get("category"),
             priority=ticket.get("priority"),
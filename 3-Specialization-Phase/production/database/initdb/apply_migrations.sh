@@ -0,0 +1,30 @@
+#!/bin/bash
+# ============================================================================
+# Fresh-Database Initialization
+# ============================================================================
+# Customer Success Digital FTE — Production Database
+#
+# docker-entrypoint-initdb.d hook: applies every database/migrations/*.sql in
+# filename order, so a new database matches database/schema.sql. Later
+# migrations are not optional extras: queries.py relies on the ticket_ref
+# default (007), halfvec embeddings (002), the metrics rollup (004), etc.
+#
+# Compose mounts database/migrations at /migrations (see docker-compose.yml).
+# Runs once, when the data volume is empty.
+#
+# The database is empty and not yet serving traffic, so index builds drop
+# CONCURRENTLY (006): there is nothing to avoid locking, and the plain form
+# can also run inside a transaction, unlike CREATE INDEX CONCURRENTLY.
+# ============================================================================
+
+set -euo pipefail
+
+MIGRATIONS_DIR="${MIGRATIONS_DIR:-/migrations}"
+
+for migration in "$MIGRATIONS_DIR"/[0-9][0-9][0-9]_*.sql; do
+    echo "Applying $(basename "$migration")"
+    sed 's/CREATE INDEX CONCURRENTLY/CREATE INDEX/' "$migration" |
+        psql -v ON_ERROR_STOP=1 \
+            --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" \
+            -f -
+done
@@ -5,10 +5,11 @@ Reads product-docs.md, splits into sections by Markdown headings,
 generates OpenAI embeddings, and inserts into the knowledge_base table.
 
 Replaces: KnowledgeBase class (TF-IDF, in-memory) from incubation prototype.
-Target:   knowledge_base table with pgvector embedding(1536)
+Target:   knowledge_base table with pgvector embedding halfvec(1536)
 
 Usage:
-    # Load all sections (first run or full refresh)
+    # Load new and changed sections (first run or incremental update;
+    # sections whose content hash is unchanged are not re-embedded)
     python load_knowledge_base.py
 
     # Force reload (drop existing, re-embed everything)
@@ -29,10 +30,13 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import hashlib
 import os
 import re
 import sys
 import time
+from collections import Counter
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional
 
@@ -43,93 +47,157 @@ import asyncpg
 EMBEDDING_MODEL = "text-embedding-3-small"
 EMBEDDING_DIMENSIONS = 1536
 BATCH_SIZE = 20  # OpenAI supports up to 2048 inputs per batch; we use small batches for reliability
+EMBEDDING_CONCURRENCY = 8  # Batches in flight at once
+EMBEDDING_MAX_RETRIES = 5  # Retries per batch on rate limiting (exponential backoff)
+INDEX_BUILD_MEMORY = "1GB"  # maintenance_work_mem for the vector index build
+INDEX_BUILD_WORKERS = 4  # max_parallel_maintenance_workers for the build
+_HEADING_RE = re.compile(r"^(#{2,3})[ \t]+(.+)$")  # ## or ### headings
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
 DEFAULT_DOCS_PATH = Path(__file__).resolve().parent.parent.parent.parent / "1-Incubation-Phase" / "context" / "product-docs.md"
 
 
 # ── Section Parser ───────────────────────────────────────────────────────
 
 
-def parse_markdown_sections(text: str, source: str = "product-docs.md") -> list[dict]:
-    """Parse a Markdown document into titled sections.
+@dataclass
+class Sections:
+    """Parsed sections as parallel lists (struct-of-arrays).
+
+    Index i of every list describes the same section:
+    - titles: The heading text (e.g., "Task Management")
+    - contents: The body text under that heading (until the next heading)
+    - categories: The parent ## heading (e.g., "Core Features")
+    - sources: File reference (e.g., "product-docs.md#task-management"),
+      unique per document: a repeated heading gets "-2", "-3", ... appended
+    - word_counts: Words in the body
+    - metadatas: word_count, heading_level, parent_section (stored as JSONB)
+    """
+
+    titles: list[str] = field(default_factory=list)
+    contents: list[str] = field(default_factory=list)
+    categories: list[str] = field(default_factory=list)
+    sources: list[str] = field(default_factory=list)
+    word_counts: list[int] = field(default_factory=list)
+    metadatas: list[dict] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def take(self, indices: list[int]) -> Sections:
+        """The subset of sections at `indices`, in that order."""
+        return Sections(
+            titles=[self.titles[i] for i in indices],
+            contents=[self.contents[i] for i in indices],
+            categories=[self.categories[i] for i in indices],
+            sources=[self.sources[i] for i in indices],
+            word_counts=[self.word_counts[i] for i in indices],
+            metadatas=[self.metadatas[i] for i in indices],
+        )
 
-    Splits on ## and ### headings. Each section includes:
-    - title: The heading text (e.g., "Task Management")
-    - content: The body text under that heading (until the next heading)
-    - category: The parent ## heading (e.g., "Core Features")
-    - source: File reference (e.g., "product-docs.md#task-management")
-    - metadata: word_count, heading_level, parent_section
 
-    Skips the Table of Contents and the top-level # heading.
+def parse_markdown_sections(text: str, source: str = "product-docs.md") -> Sections:
+    """Parse a Markdown document into titled sections.
+
+    Splits on ## and ### headings and fills a Sections (one entry per
+    heading with a non-empty body). Skips the Table of Contents and the
+    top-level # heading.
     """
-    sections = []
-    lines = text.split("\n")
+    sections = Sections()
 
     current_h2 = None  # Parent category (## level)
     current_title = None
     current_level = 0
     current_lines = []
-    start_line = 0
-
-    for i, line in enumerate(lines):
-        # Match ## or ### headings
-        heading_match = re.match(r"^(#{2,3})\s+(.+)$", line)
-
-        if heading_match:
-            # Save the previous section (if any)
-            if current_title and current_title != "Table of Contents":
-                body = "\n".join(current_lines).strip()
-                if body:  # Skip empty sections
-                    slug = re.sub(r"[^a-z0-9]+", "-", current_title.lower()).strip("-")
-                    word_count = len(body.split())
-                    sections.append({
-                        "title": current_title,
-                        "content": body,
-                        "category": current_h2 or "General",
-                        "source": f"{source}#{slug}",
-                        "metadata": {
-                            "word_count": word_count,
-                            "heading_level": current_level,
-                            "parent_section": current_h2,
-                        },
-                    })
-
-            # Start new section
-            level = len(heading_match.group(1))
-            title = heading_match.group(2).strip()
-
-            if level == 2:
-                current_h2 = title
-
-            current_title = title
-            current_level = level
-            current_lines = []
-            start_line = i + 1
-        else:
+    used_slugs: set[str] = set()
+
+    def flush() -> None:
+        """Emit the section collected so far (if non-empty and not the TOC)."""
+        if not current_title or current_title == "Table of Contents":
+            return
+        body = "\n".join(current_lines).strip()
+        if not body:  # Skip empty sections
+            return
+        slug = _SLUG_RE.sub("-", current_title.lower()).strip("-")
+        # Sources key incremental reloads, so same-named headings must not share one
+        base, n = slug, 1
+        while slug in used_slugs:
+            n += 1
+            slug = f"{base}-{n}"
+        used_slugs.add(slug)
+        word_count = len(body.split())
+        sections.titles.append(current_title)
+        sections.contents.append(body)
+        sections.categories.append(current_h2 or "General")
+        sections.sources.append(f"{source}#{slug}")
+        sections.word_counts.append(word_count)
+        sections.metadatas.append({
+            "word_count": word_count,
+            "heading_level": current_level,
+            "parent_section": current_h2,
+        })
+
+    for line in text.splitlines():
+        heading_match = _HEADING_RE.match(line)
+        if not heading_match:
             current_lines.append(line)
+            continue
+
+        # Save the previous section, then start a new one
+        flush()
+
+        level = len(heading_match.group(1))
+        title = heading_match.group(2).strip()
+
+        if level == 2:
+            current_h2 = title
+
+        current_title = title
+        current_level = level
+        current_lines = []
 
     # Don't forget the last section
-    if current_title and current_title != "Table of Contents":
-        body = "\n".join(current_lines).strip()
-        if body:
-            slug = re.sub(r"[^a-z0-9]+", "-", current_title.lower()).strip("-")
-            word_count = len(body.split())
-            sections.append({
-                "title": current_title,
-                "content": body,
-                "category": current_h2 or "General",
-                "source": f"{source}#{slug}",
-                "metadata": {
-                    "word_count": word_count,
-                    "heading_level": current_level,
-                    "parent_section": current_h2,
-                },
-            })
+    flush()
 
     return sections
 
 
+# ── Content Hashing ──────────────────────────────────────────────────────
+
+
+def embedding_texts(sections: Sections) -> list[str]:
+    """The text each section is embedded from: title + content."""
+    return [t + "\n\n" + c for t, c in zip(sections.titles, sections.contents)]
+
+
+def content_hash(text: str) -> bytes:
+    """16-byte BLAKE2b digest of an embedding text (stored as content_hash)."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
 # ── Embedding Generation ─────────────────────────────────────────────────
 
+# One client per process, so repeated generate_embeddings calls (incremental
+# loads) reuse the same connection pool. HTTP/2 lets the concurrent batches
+# multiplex over a single TLS connection.
+_openai_client = None
+
+
+def _get_openai_client():
+    """Return the shared AsyncOpenAI client, creating it on first use."""
+    global _openai_client
+    if _openai_client is None:
+        import httpx
+        from openai import AsyncOpenAI
+
+        _openai_client = AsyncOpenAI(
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            http_client=httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+            ),
+        )
+    return _openai_client
+
 
 async def generate_embeddings(texts: list[str]) -> list[list[float]]:
     """Generate embeddings for a batch of texts using OpenAI API.
@@ -137,31 +205,40 @@ async def generate_embeddings(texts: list[str]) -> list[list[float]]:
     Uses text-embedding-3-small (1536 dimensions) for cost-effective
     semantic search. Costs ~$0.02 per 1M tokens.
 
+    Batches of BATCH_SIZE run concurrently (at most EMBEDDING_CONCURRENCY in
+    flight). A rate-limited batch backs off exponentially (1s, 2s, 4s, ...)
+    and retries, instead of every batch paying a fixed delay.
+
     Args:
         texts: List of text strings to embed.
 
     Returns:
-        List of embedding vectors (each 1536 floats).
+        List of embedding vectors (each 1536 floats), in input order.
     """
-    from openai import AsyncOpenAI
+    from openai import RateLimitError
 
-    client = AsyncOpenAI()
+    client = _get_openai_client()
+    semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+    batches = [texts[i : i + BATCH_SIZE] for i in range(0, len(texts), BATCH_SIZE)]
 
-    all_embeddings = []
-    for i in range(0, len(texts), BATCH_SIZE):
-        batch = texts[i : i + BATCH_SIZE]
-        response = await client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=batch,
-        )
-        batch_embeddings = [item.embedding for item in response.data]
-        all_embeddings.extend(batch_embeddings)
+    async def embed_batch(batch: list[str]) -> list[list[float]]:
+        async with semaphore:
+            for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+                try:
+                    response = await client.embeddings.create(
+                        model=EMBEDDING_MODEL,
+                        input=batch,
+                    )
+                    return [item.embedding for item in response.data]
+                except RateLimitError:
+                    if attempt == EMBEDDING_MAX_RETRIES:
+                        raise
+                    await asyncio.sleep(2 ** attempt)
 
-        # Rate limit courtesy: small delay between batches
-        if i + BATCH_SIZE < len(texts):
-            await asyncio.sleep(0.5)
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
 
-    return all_embeddings
+    # gather preserves order, so flattening keeps embeddings aligned with texts
+    return [embedding for batch_embeddings in results for embedding in batch_embeddings]
 
 
 # ── Database Operations ──────────────────────────────────────────────────
@@ -174,69 +251,142 @@ async def clear_knowledge_base(pool: asyncpg.Pool) -> int:
     return result
 
 
+async def ensure_halfvec_column(pool: asyncpg.Pool) -> bool:
+    """Migrate knowledge_base.embedding to halfvec(1536) if it is still vector.
+
+    Same change as migrations/002 — halves storage and the bytes each ANN
+    probe reads. The vector index is dropped here and rebuilt by
+    create_vector_index. Returns True if the column was converted.
+    """
+    column_type = await pool.fetchval(
+        """
+        SELECT format_type(atttypid, atttypmod)
+        FROM pg_attribute
+        WHERE attrelid = 'knowledge_base'::regclass AND attname = 'embedding'
+        """
+    )
+    if column_type is None or column_type.startswith("halfvec"):
+        return False
+
+    await pool.execute("DROP INDEX IF EXISTS idx_kb_embedding")
+    await pool.execute(
+        f"""
+        ALTER TABLE knowledge_base
+        ALTER COLUMN embedding TYPE halfvec({EMBEDDING_DIMENSIONS})
+        USING embedding::halfvec({EMBEDDING_DIMENSIONS})
+        """
+    )
+    return True
+
+
+async def ensure_content_hash_column(pool: asyncpg.Pool) -> None:
+    """Add knowledge_base.content_hash if missing (same change as migrations/003)."""
+    await pool.execute(
+        "ALTER TABLE knowledge_base ADD COLUMN IF NOT EXISTS content_hash BYTEA"
+    )
+
+
+async def fetch_content_hashes(
+    pool: asyncpg.Pool,
+    docs_name: str,
+) -> dict[str, Optional[bytes]]:
+    """Map source → content_hash for every row loaded from `docs_name`."""
+    rows = await pool.fetch(
+        "SELECT source, content_hash FROM knowledge_base WHERE starts_with(source, $1)",
+        f"{docs_name}#",
+    )
+    return {row["source"]: row["content_hash"] for row in rows}
+
+
+async def delete_sections(pool: asyncpg.Pool, sources: list[str]) -> int:
+    """Delete rows by source reference. Returns count deleted."""
+    result = await pool.execute(
+        "DELETE FROM knowledge_base WHERE source = ANY($1::text[])",
+        sources,
+    )
+    return int(result.split()[-1])
+
+
 async def insert_sections(
     pool: asyncpg.Pool,
-    sections: list[dict],
+    sections: Sections,
     embeddings: list[list[float]],
+    content_hashes: list[bytes],
 ) -> int:
     """Insert sections with embeddings into knowledge_base table.
 
+    Rows are prepared up front and sent with a single executemany, which
+    pipelines the INSERTs over one prepared statement instead of paying a
+    round-trip per row. Embeddings are quantized to float16 client-side and
+    go over the wire in pgvector's binary halfvec format (3 KB per row)
+    rather than as text literals.
+
     Returns: Number of rows inserted.
     """
-    import json
+    import orjson
+    from pgvector import HalfVector
+    from pgvector.asyncpg import register_vector
+
+    rows = [
+        (title, content, category, HalfVector(embedding), source, orjson.dumps(metadata).decode(), digest)
+        for title, content, category, embedding, source, metadata, digest in zip(
+            sections.titles,
+            sections.contents,
+            sections.categories,
+            embeddings,
+            sections.sources,
+            sections.metadatas,
+            content_hashes,
+        )
+    ]
 
-    inserted = 0
     async with pool.acquire() as conn:
-        for section, embedding in zip(sections, embeddings):
-            embedding_str = "[" + ",".join(str(x) for x in embedding) + "]"
-            await conn.execute(
-                """
-                INSERT INTO knowledge_base (title, content, category, embedding, source, metadata)
-                VALUES ($1, $2, $3, $4::vector, $5, $6::jsonb)
-                """,
-                section["title"],
-                section["content"],
-                section["category"],
-                embedding_str,
-                section["source"],
-                json.dumps(section["metadata"]),
+        await register_vector(conn)
+        await conn.executemany(
+            """
+            INSERT INTO knowledge_base (
+                title, content, category, embedding, source, metadata, content_hash
             )
-            inserted += 1
+            VALUES ($1, $2, $3, $4::halfvec, $5, $6::jsonb, $7)
+            """,
+            rows,
+        )
 
-    return inserted
+    return len(rows)
 
 
 async def create_vector_index(pool: asyncpg.Pool) -> None:
-    """Create IVFFlat index for approximate nearest neighbor search.
+    """Create HNSW index for approximate nearest neighbor search.
 
-    Only useful when the table has data. For small datasets (< 1000 rows),
-    exact search without index is fine, but we create it anyway for
-    production readiness.
+    HNSW needs no training data (unlike IVFFlat's lists), so it can be built
+    on an empty table and stays accurate as rows are added without a
+    rebuild. m=16 / ef_construction=64 are pgvector's defaults, spelled out
+    for tuning; query-time breadth is hnsw.ef_search (see
+    database.queries.POOL_SERVER_SETTINGS).
 
-    Lists parameter: sqrt(row_count) is a good starting point.
-    For ~40 sections: lists=10 is reasonable.
+    The build runs with a raised maintenance_work_mem (so the graph is built
+    in memory) and parallel maintenance workers. Both are session settings,
+    so they are applied on the connection doing the build and reset after.
     """
-    row_count = await pool.fetchval("SELECT COUNT(*) FROM knowledge_base WHERE embedding IS NOT NULL")
-
-    if row_count == 0:
-        print("  No rows with embeddings found — skipping index creation.")
-        return
-
-    # Calculate lists parameter (sqrt of row count, minimum 1)
-    lists = max(1, min(100, int(row_count ** 0.5)))
-
-    # Drop existing index if any
-    await pool.execute("DROP INDEX IF EXISTS idx_kb_embedding")
+    async with pool.acquire() as conn:
+        await conn.execute(f"SET maintenance_work_mem = '{INDEX_BUILD_MEMORY}'")
+        await conn.execute(f"SET max_parallel_maintenance_workers = {INDEX_BUILD_WORKERS}")
+        try:
+            # Drop existing index if any
+            await conn.execute("DROP INDEX IF EXISTS idx_kb_embedding")
 
-    # Create IVFFlat index
-    await pool.execute(
-        f"""
-        CREATE INDEX idx_kb_embedding ON knowledge_base
-        USING ivfflat (embedding vector_cosine_ops)
-        WITH (lists = {lists})
-        """
-    )
-    print(f"  Created IVFFlat index with lists={lists} for {row_count} rows.")
+            # Create HNSW index over halfvec cosine distance
+            await conn.execute(
+                """
+                CREATE INDEX idx_kb_embedding ON knowledge_base
+                USING hnsw (embedding halfvec_cosine_ops)
+                WITH (m = 16, ef_construction = 64)
+                """
+            )
+        finally:
+            await conn.execute("RESET maintenance_work_mem")
+            await conn.execute("RESET max_parallel_maintenance_workers")
+    print("  Created HNSW index (m=16, ef_construction=64).")
 
 
 # ── Main ─────────────────────────────────────────────────────────────────
@@ -252,9 +402,13 @@ async def main(
 
     Steps:
         1. Read and parse product-docs.md into sections
-        2. Generate OpenAI embeddings for each section
-        3. Insert sections + embeddings into knowledge_base table
-        4. Create IVFFlat vector index
+        2. Generate OpenAI embeddings for new or changed sections
+        3. Replace those rows (and drop sections removed from the docs)
+        4. Create HNSW vector index (full loads only)
+
+    Without --force, sections are matched to existing rows by source and
+    skipped when their content_hash is unchanged, so a doc edit re-embeds
+    only the edited sections.
     """
     print("=" * 60)
     print("Knowledge Base Loader")
@@ -271,20 +425,19 @@ async def main(
     sections = parse_markdown_sections(text, source=docs_path.name)
 
     print(f"  Parsed {len(sections)} sections:")
-    categories = {}
-    for s in sections:
-        cat = s["category"]
-        categories[cat] = categories.get(cat, 0) + 1
+    categories = Counter(sections.categories)
     for cat, count in categories.items():
         print(f"    {cat}: {count} sections")
 
-    total_words = sum(s["metadata"]["word_count"] for s in sections)
+    total_words = sum(sections.word_counts)
     print(f"  Total words: {total_words:,}")
 
     if dry_run:
         print("\n[DRY RUN] Sections that would be loaded:")
-        for i, s in enumerate(sections, 1):
-            print(f"  {i:2}. [{s['category']}] {s['title']} ({s['metadata']['word_count']} words)")
+        for i, (category, title, word_count) in enumerate(
+            zip(sections.categories, sections.titles, sections.word_counts), 1
+        ):
+            print(f"  {i:2}. [{category}] {title} ({word_count} words)")
         print("\nDry run complete. No data was modified.")
         return
 
@@ -293,29 +446,47 @@ async def main(
     pool = await asyncpg.create_pool(dsn=database_url, min_size=2, max_size=5)
 
     try:
+        if await ensure_halfvec_column(pool):
+            print("  Converted embedding column to halfvec(1536).")
+        await ensure_content_hash_column(pool)
+
         # Check if knowledge_base already has data
         existing_count = await pool.fetchval("SELECT COUNT(*) FROM knowledge_base")
         print(f"  Existing rows: {existing_count}")
 
-        if existing_count > 0 and not force:
-            print("  Knowledge base already populated. Use --force to reload.")
-            print("  Exiting without changes.")
-            return
-
         if existing_count > 0 and force:
             deleted = await clear_knowledge_base(pool)
             print(f"  Cleared {deleted} existing rows (--force).")
+        full_load = force or existing_count == 0
+
+        # Only sections whose title + content changed need new embeddings
+        texts_to_embed = embedding_texts(sections)
+        hashes = [content_hash(t) for t in texts_to_embed]
+        existing_hashes = {} if full_load else await fetch_content_hashes(pool, docs_path.name)
+
+        changed = [
+            i for i, (src, digest) in enumerate(zip(sections.sources, hashes))
+            if existing_hashes.get(src) != digest
+        ]
+        parsed_sources = set(sections.sources)
+        stale_sources = [src for src in existing_hashes if src not in parsed_sources]
+
+        if not changed and not stale_sources:
+            print("  Knowledge base is up to date (no sections changed).")
+            return
+        if not full_load:
+            print(
+                f"  {len(changed)} new or changed sections, "
+                f"{len(sections) - len(changed)} unchanged, "
+                f"{len(stale_sources)} removed."
+            )
 
         # ── Step 3: Generate embeddings ──────────────────────────────
         print(f"\n[3/4] Generating embeddings with {EMBEDDING_MODEL}...")
         start_time = time.time()
 
         # Combine title + content for richer embeddings
-        texts_to_embed = [
-            f"{s['title']}\n\n{s['content']}" for s in sections
-        ]
-
-        embeddings = await generate_embeddings(texts_to_embed)
+        embeddings = await generate_embeddings([texts_to_embed[i] for i in changed])
 
         elapsed = time.time() - start_time
         print(f"  Generated {len(embeddings)} embeddings in {elapsed:.1f}s")
@@ -323,12 +494,21 @@ async def main(
 
         # ── Step 4: Insert into database ─────────────────────────────
         print(f"\n[4/4] Inserting into knowledge_base table...")
-        inserted = await insert_sections(pool, sections, embeddings)
+        to_insert = sections.take(changed)
+        replaced_sources = [src for src in to_insert.sources if src in existing_hashes]
+        if replaced_sources or stale_sources:
+            deleted = await delete_sections(pool, replaced_sources + stale_sources)
+            print(f"  Deleted {deleted} outdated rows.")
+
+        inserted = await insert_sections(
+            pool, to_insert, embeddings, [hashes[i] for i in changed]
+        )
         print(f"  Inserted {inserted} rows.")
 
-        # Create vector index
-        print("  Creating vector index...")
-        await create_vector_index(pool)
+        # Create vector index (HNSW absorbs incremental inserts without a rebuild)
+        if full_load:
+            print("  Creating vector index...")
+            await create_vector_index(pool)
 
         # Summary
         final_count = await pool.fetchval("SELECT COUNT(*) FROM knowledge_base")
@@ -362,7 +542,7 @@ if __name__ == "__main__":
     parser.add_argument(
         "--force",
         action="store_true",
-        help="Force reload: clear existing data and re-embed everything",
+        help="Force reload: clear existing data and re-embed everything (default: only new or changed sections)",
     )
     parser.add_argument(
         "--dry-run",
@@ -0,0 +1,46 @@
+-- ============================================================================
+-- Migration 002: Knowledge Base halfvec Embeddings + HNSW Index
+-- ============================================================================
+-- Customer Success Digital FTE — Production Database
+--
+-- Stores knowledge_base.embedding as halfvec(1536) (float16) instead of
+-- vector(1536) (float32): half the heap and index size, half the bytes read
+-- per distance computation. Cosine ranking is unaffected at this precision.
+-- Replaces the IVFFlat index with HNSW over halfvec_cosine_ops.
+--
+-- Requires: pgvector >= 0.7 (halfvec type)
+-- Query side: database.queries.search_knowledge_base casts $1::halfvec and
+--             load_knowledge_base.py inserts $4::halfvec, so both fail on a
+--             vector(1536) column: this migration is required, not optional
+--             (fresh databases get it from database/initdb/apply_migrations.sh).
+--             hnsw.ef_search is a pool startup parameter
+--             (database.queries.POOL_SERVER_SETTINGS).
+--
+-- Run: psql -d customer_success -f 002_knowledge_base_halfvec_hnsw.sql
+-- Rollback: See statements at bottom (commented out)
+-- ============================================================================
+
+BEGIN;
+
+DROP INDEX IF EXISTS idx_kb_embedding;
+
+ALTER TABLE knowledge_base
+    ALTER COLUMN embedding TYPE halfvec(1536)
+    USING embedding::halfvec(1536);
+
+COMMENT ON COLUMN knowledge_base.embedding IS 'OpenAI text-embedding-3-small vector (1536 dimensions) stored as float16 halfvec. Used for cosine similarity search.';
+
+CREATE INDEX IF NOT EXISTS idx_kb_embedding ON knowledge_base
+    USING hnsw (embedding halfvec_cosine_ops);
+
+COMMIT;
+
+-- ============================================================================
+-- ROLLBACK (uncomment to restore float32 vectors)
+-- ============================================================================
+-- BEGIN;
+-- DROP INDEX IF EXISTS idx_kb_embedding;
+-- ALTER TABLE knowledge_base
+--     ALTER COLUMN embedding TYPE vector(1536)
+--     USING embedding::vector(1536);
+-- COMMIT;
@@ -0,0 +1,30 @@
+-- ============================================================================
+-- Migration 003: Knowledge Base Content Hash
+-- ============================================================================
+-- Customer Success Digital FTE — Production Database
+--
+-- Adds knowledge_base.content_hash: a BLAKE2b (16-byte) digest of the text
+-- each row was embedded from (title + "\n\n" + content). load_knowledge_base.py
+-- compares it against the parsed docs and only re-embeds sections that
+-- changed. Existing rows start as NULL and are re-embedded once on the next
+-- load.
+--
+-- Run: psql -d customer_success -f 003_knowledge_base_content_hash.sql
+-- Rollback: See statements at bottom (commented out)
+-- ============================================================================
+
+BEGIN;
+
+ALTER TABLE knowledge_base
+    ADD COLUMN IF NOT EXISTS content_hash BYTEA;
+
+COMMENT ON COLUMN knowledge_base.content_hash IS 'BLAKE2b (16-byte) digest of the embedded text (title + content). The loader re-embeds a section only when this changes.';
+
+COMMIT;
+
+-- ============================================================================
+-- ROLLBACK (uncomment to drop the column)
+-- ============================================================================
+-- BEGIN;
+-- ALTER TABLE knowledge_base DROP COLUMN IF EXISTS content_hash;
+-- COMMIT;
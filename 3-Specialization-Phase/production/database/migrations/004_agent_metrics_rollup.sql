@@ -0,0 +1,63 @@
+-- ============================================================================
+-- Migration 004: Agent Metrics 5-Minute Rollup
+-- ============================================================================
+-- Customer Success Digital FTE — Production Database
+--
+-- Adds agent_metrics_5m: count/sum/min/max and exact per-bucket p50/p95 for
+-- each (metric_name, channel, 5-minute bucket). The metrics collector upserts
+-- the trailing buckets every minute (database.queries.refresh_metrics_rollup),
+-- so get_metrics_summary reads at most 12 rows per hour of window instead of
+-- sorting every raw metric for PERCENTILE_CONT on each dashboard refresh.
+--
+-- Window percentiles are count-weighted means of bucket percentiles — an
+-- approximation, like any mergeable sketch. Count, avg, min and max are exact.
+--
+-- Requires: PostgreSQL 15+ (UNIQUE NULLS NOT DISTINCT — channel is nullable)
+--
+-- Run: psql -d customer_success -f 004_agent_metrics_rollup.sql
+-- Rollback: See statements at bottom (commented out)
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS agent_metrics_5m (
+    metric_name         VARCHAR(100) NOT NULL,
+    channel             VARCHAR(20),
+    bucket              TIMESTAMPTZ NOT NULL,
+    count               INTEGER NOT NULL,
+    sum                 NUMERIC NOT NULL,
+    min                 DECIMAL(12,4) NOT NULL,
+    max                 DECIMAL(12,4) NOT NULL,
+    p50                 DOUBLE PRECISION NOT NULL,
+    p95                 DOUBLE PRECISION NOT NULL,
+    UNIQUE NULLS NOT DISTINCT (metric_name, channel, bucket)
+);
+
+COMMENT ON TABLE agent_metrics_5m IS 'agent_metrics rolled up into 5-minute buckets. Window percentiles are count-weighted means of bucket percentiles (approximate).';
+
+CREATE INDEX IF NOT EXISTS idx_metrics_5m_name_bucket ON agent_metrics_5m(metric_name, bucket DESC);
+
+-- Backfill existing history (later buckets are maintained by the collector)
+INSERT INTO agent_metrics_5m (metric_name, channel, bucket, count, sum, min, max, p50, p95)
+SELECT
+    metric_name,
+    channel,
+    date_bin('5 minutes', recorded_at, TIMESTAMPTZ '2000-01-01'),
+    COUNT(*),
+    SUM(metric_value),
+    MIN(metric_value),
+    MAX(metric_value),
+    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY metric_value),
+    PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY metric_value)
+FROM agent_metrics
+GROUP BY 1, 2, 3
+ON CONFLICT DO NOTHING;
+
+COMMIT;
+
+-- ============================================================================
+-- ROLLBACK (uncomment to drop the rollup)
+-- ============================================================================
+-- BEGIN;
+-- DROP TABLE IF EXISTS agent_metrics_5m;
+-- COMMIT;
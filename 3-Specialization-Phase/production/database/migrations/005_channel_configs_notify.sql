@@ -0,0 +1,39 @@
+-- ============================================================================
+-- Migration 005: Channel Config Change Notifications
+-- ============================================================================
+-- Customer Success Digital FTE — Production Database
+--
+-- Sends NOTIFY channel_configs_changed after any write to channel_configs.
+-- The API caches channel configs in-process and a dedicated LISTEN
+-- connection clears that cache on this notification
+-- (database.queries.start_channel_config_listener).
+--
+-- Run: psql -d customer_success -f 005_channel_configs_notify.sql
+-- Rollback: See statements at bottom (commented out)
+-- ============================================================================
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION notify_channel_configs_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('channel_configs_changed', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_channel_configs_notify ON channel_configs;
+
+CREATE TRIGGER trg_channel_configs_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON channel_configs
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_channel_configs_changed();
+
+COMMIT;
+
+-- ============================================================================
+-- ROLLBACK (uncomment to remove the trigger)
+-- ============================================================================
+-- BEGIN;
+-- DROP TRIGGER IF EXISTS trg_channel_configs_notify ON channel_configs;
+-- DROP FUNCTION IF EXISTS notify_channel_configs_changed();
+-- COMMIT;
@@ -0,0 +1,27 @@
+-- ============================================================================
+-- Migration 006: Open-Conversation Lookup Index
+-- ============================================================================
+-- Customer Success Digital FTE — Production Database
+--
+-- get_active_conversation runs on every inbound message. It probes for the
+-- customer's latest 'active' conversation, then the latest 'escalated' one.
+-- This partial index serves each probe as an ordered index read (no sort),
+-- however many closed conversations the customer has accumulated.
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so this
+-- file has no BEGIN/COMMIT. Fresh databases built by
+-- database/initdb/apply_migrations.sh get the same index without
+-- CONCURRENTLY (nothing to lock against on an empty database).
+--
+-- Run: psql -d customer_success -f 006_conversations_open_index.sql
+-- Rollback: See statements at bottom (commented out)
+-- ============================================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conv_customer_open
+    ON conversations(customer_id, status, last_message_at DESC)
+    WHERE status IN ('active', 'escalated');
+
+-- ============================================================================
+-- ROLLBACK (uncomment to drop the index)
+-- ============================================================================
+-- DROP INDEX CONCURRENTLY IF EXISTS idx_conv_customer_open;
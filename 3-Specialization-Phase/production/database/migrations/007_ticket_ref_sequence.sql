@@ -0,0 +1,38 @@
+-- ============================================================================
+-- Migration 007: Sequence-Generated Ticket Refs
+-- ============================================================================
+-- Customer Success Digital FTE — Production Database
+--
+-- Ticket refs were TF-YYYYMMDD-XXXX with XXXX sliced from a random UUID, so
+-- two tickets on the same day could collide (birthday odds pass 50% at ~300
+-- tickets/day). XXXX now comes from a cycling 16-bit sequence, assigned by
+-- the tickets.ticket_ref column default, and no insert path supplies its
+-- own ref: refs never collide unless one day sees more than 65,536 tickets.
+-- The ref format is unchanged.
+--
+-- Run: psql -d customer_success -f 007_ticket_ref_sequence.sql
+-- Rollback: See statements at bottom (commented out)
+-- ============================================================================
+
+BEGIN;
+
+CREATE SEQUENCE IF NOT EXISTS ticket_ref_seq MINVALUE 0 MAXVALUE 65535 START 0 CYCLE;
+
+CREATE OR REPLACE FUNCTION next_ticket_ref()
+RETURNS TEXT AS $$
+    SELECT 'TF-' || to_char(NOW() AT TIME ZONE 'UTC', 'YYYYMMDD') || '-'
+        || upper(lpad(to_hex(nextval('ticket_ref_seq')), 4, '0'));
+$$ LANGUAGE sql VOLATILE;
+
+ALTER TABLE tickets ALTER COLUMN ticket_ref SET DEFAULT next_ticket_ref();
+
+COMMIT;
+
+-- ============================================================================
+-- ROLLBACK (uncomment to restore client-generated refs)
+-- ============================================================================
+-- BEGIN;
+-- ALTER TABLE tickets ALTER COLUMN ticket_ref DROP DEFAULT;
+-- DROP FUNCTION IF EXISTS next_ticket_ref();
+-- DROP SEQUENCE IF EXISTS ticket_ref_seq;
+-- COMMIT;
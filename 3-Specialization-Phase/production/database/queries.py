@@ -21,35 +21,150 @@ Schema: database/schema.sql
 
 from __future__ import annotations
 
+import asyncio
+import copy
+import logging
+import os
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime
 from decimal import Decimal
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
 
 import asyncpg
 
+logger = logging.getLogger("database.queries")
+
+# HNSW search breadth: candidates examined per query (pgvector default is 40)
+HNSW_EF_SEARCH = int(os.environ.get("HNSW_EF_SEARCH", "100"))
+
+# Prepared-statement caching for every pool that runs these queries. asyncpg
+# prepares each distinct SQL string once per connection and reuses it from a
+# per-connection LRU, so repeat calls skip the Parse/Describe round-trip.
+# (Explicit conn.prepare() statements cannot be held instead: asyncpg
+# invalidates them when the connection is released back to the pool.)
+# The module has well under 1024 distinct statements, so none are evicted,
+# and lifetime 0 stops asyncpg re-preparing them every 5 minutes (its default).
+POOL_STATEMENT_CACHE = {
+    "statement_cache_size": 1024,
+    "max_cached_statement_lifetime": 0,
+}
+
+# Session settings for every pool connection: create_pool(server_settings=...).
+# Sent as startup parameters, not SET in init_connection, because asyncpg
+# runs RESET ALL whenever a connection goes back to the pool; that reverts a
+# SET but restores startup values. ef_search raises HNSW recall; iterative
+# scans (pgvector >= 0.8) let category-filtered searches still return top_k
+# rows. Older pgvector discards the unknown setting with a warning.
+POOL_SERVER_SETTINGS = {
+    "hnsw.ef_search": str(HNSW_EF_SEARCH),
+    "hnsw.iterative_scan": "strict_order",
+}
+
+# SQL texts this process has run through the query helpers, in first-use
+# order. init_connection prepares them on every new pool connection, so a
+# connection opened by pool growth or recycling starts with a warm statement
+# cache instead of paying Parse/Describe on its first requests.
+_hot_statements: dict[str, None] = {}
+
+
+# Write-behind interval for conversation/customer activity timestamps (see
+# start_timestamp_flusher)
+TIMESTAMP_FLUSH_INTERVAL = float(os.environ.get("TIMESTAMP_FLUSH_INTERVAL_MS", "500")) / 1000
+
+# Message columns that history readers use. Leaves out tool_calls (JSONB),
+# intent, token/latency accounting and the dedup id, which only the write
+# path and analytics need, so history pages carry only what gets rendered.
+_MESSAGE_HISTORY_COLUMNS = (
+    "id, conversation_id, channel, direction, role, content, sentiment_score, created_at"
+)
+
 
 # ── Helpers ────────────────────────────────────────────────────────────────
 
 
+async def init_connection(conn: asyncpg.Connection) -> None:
+    """Per-connection setup. Pass as create_pool(init=init_connection).
+
+    Registers pgvector's binary codecs, so query embeddings are sent as
+    packed float16 (halfvec) instead of a ~20 KB decimal text literal, and
+    binary json/jsonb codecs backed by orjson: JSON parameters are passed as
+    plain dicts/lists and JSON columns (including json_agg results) come back
+    decoded in C rather than by the stdlib json module.
+
+    Then prepares every statement this process has already used (after the
+    codecs, since registering a codec clears the statement cache).
+    """
+    import orjson
+    from pgvector.asyncpg import register_vector
+
+    await register_vector(conn)
+    # jsonb binary format is a version byte (1) followed by the JSON text
+    await conn.set_type_codec(
+        "jsonb",
+        schema="pg_catalog",
+        encoder=lambda value: b"\x01" + orjson.dumps(value),
+        decoder=lambda data: orjson.loads(data[1:]),
+        format="binary",
+    )
+    # json binary format is the JSON text itself
+    await conn.set_type_codec(
+        "json",
+        schema="pg_catalog",
+        encoder=orjson.dumps,
+        decoder=orjson.loads,
+        format="binary",
+    )
+    await _warm_statement_cache(conn)
+
+
+async def _warm_statement_cache(conn: asyncpg.Connection) -> None:
+    """Prepare the process's known statements into conn's statement cache.
+
+    Public conn.prepare() always builds a fresh statement and never touches
+    the cache (it calls _prepare with use_cache=False), so it cannot warm
+    it. This calls the private _prepare(use_cache=True) instead; its
+    signature is stable across the asyncpg range pinned in requirements.txt
+    (0.30-0.32). Warming is best-effort: on any failure, including a changed
+    private API, the connection is still usable and simply prepares lazily.
+    """
+    for query in list(_hot_statements):
+        try:
+            await conn._prepare(query, use_cache=True)
+        except Exception as e:
+            logger.warning(f"Statement cache warm-up stopped: {e}")
+            return
+
+
+def _remember_statement(query: str) -> None:
+    """Track a statement for warm-up (bounded by the statement cache size)."""
+    if query not in _hot_statements and (
+        len(_hot_statements) < POOL_STATEMENT_CACHE["statement_cache_size"]
+    ):
+        _hot_statements[query] = None
+
+
 async def _fetchrow(pool: asyncpg.Pool, query: str, *args) -> Optional[dict]:
     """Execute a query and return a single row as a dict (or None)."""
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(query, *args)
-        return dict(row) if row else None
+    _remember_statement(query)
+    row = await pool.fetchrow(query, *args)
+    return dict(row) if row else None
 
 
-async def _fetch(pool: asyncpg.Pool, query: str, *args) -> list[dict]:
-    """Execute a query and return all rows as a list of dicts."""
-    async with pool.acquire() as conn:
-        rows = await conn.fetch(query, *args)
-        return [dict(r) for r in rows]
+async def _fetch(pool: asyncpg.Pool, query: str, *args) -> list[asyncpg.Record]:
+    """Execute a query and return all rows as asyncpg Records.
+
+    Records support row["col"] and row.get("col") like dicts, and every list
+    caller only reads them, so the per-row dict copy is skipped. Convert with
+    dict(row) before mutating.
+    """
+    _remember_statement(query)
+    return await pool.fetch(query, *args)
 
 
 async def _execute(pool: asyncpg.Pool, query: str, *args) -> str:
     """Execute a query and return the status string."""
-    async with pool.acquire() as conn:
-        return await conn.execute(query, *args)
+    _remember_statement(query)
+    return await pool.execute(query, *args)
 
 
 # ── 1. Customer Management ────────────────────────────────────────────────
@@ -68,90 +183,62 @@ async def get_or_create_customer(
       1. Exact email match on customers.email
       2. Exact phone match on customers.phone
       3. Lookup via customer_identifiers (email or phone)
-      4. Create new customer
+      4. Create new customer (and link its email/phone identifiers)
+
+    All four steps run as one CTE-chained statement: a hit bumps
+    last_contact_at, a miss inserts — one round trip either way. The UNION
+    ALL ... LIMIT 1 lookup stops at the first branch that matches, so the
+    resolution order above is preserved.
 
     Returns: dict with customer row (id, email, phone, name, plan, ...)
     """
-    # Try email lookup first (most common)
-    if email:
-        row = await _fetchrow(
-            pool,
-            "SELECT * FROM customers WHERE email = $1",
-            email,
-        )
-        if row:
-            # Update last_contact_at
-            await _execute(
-                pool,
-                "UPDATE customers SET last_contact_at = NOW() WHERE id = $1",
-                row["id"],
-            )
-            return row
-
-    # Try phone lookup
-    if phone:
-        row = await _fetchrow(
-            pool,
-            "SELECT * FROM customers WHERE phone = $1",
-            phone,
-        )
-        if row:
-            await _execute(
-                pool,
-                "UPDATE customers SET last_contact_at = NOW() WHERE id = $1",
-                row["id"],
-            )
-            return row
-
-    # Try customer_identifiers table (cross-channel resolution)
-    identifier = email or phone
     identifier_type = "email" if email else "phone"
-    if identifier:
-        row = await _fetchrow(
-            pool,
-            """
-            SELECT c.* FROM customers c
-            JOIN customer_identifiers ci ON ci.customer_id = c.id
-            WHERE ci.identifier_type = $1 AND ci.identifier_value = $2
-            """,
-            identifier_type,
-            identifier,
-        )
-        if row:
-            await _execute(
-                pool,
-                "UPDATE customers SET last_contact_at = NOW() WHERE id = $1",
-                row["id"],
-            )
-            return row
 
-    # Create new customer
-    row = await _fetchrow(
+    return await _fetchrow(
         pool,
         """
-        INSERT INTO customers (email, phone, name, plan, last_contact_at)
-        VALUES ($1, $2, $3, $4, NOW())
-        RETURNING *
+        WITH existing AS (
+            SELECT id FROM customers WHERE email = $1
+            UNION ALL
+            (SELECT id FROM customers WHERE phone = $2 LIMIT 1)
+            UNION ALL
+            SELECT customer_id FROM customer_identifiers
+            WHERE identifier_type = $5 AND identifier_value = COALESCE($1, $2)
+            LIMIT 1
+        ),
+        touched AS (
+            UPDATE customers SET last_contact_at = NOW()
+            WHERE id IN (SELECT id FROM existing)
+            RETURNING *
+        ),
+        inserted AS (
+            INSERT INTO customers (email, phone, name, plan, last_contact_at)
+            SELECT $1, $2, $3, $4, NOW()
+            WHERE NOT EXISTS (SELECT 1 FROM existing)
+            ON CONFLICT (email) DO UPDATE SET last_contact_at = NOW()
+            RETURNING *
+        ),
+        ident AS (
+            INSERT INTO customer_identifiers (customer_id, identifier_type, identifier_value, verified)
+            SELECT i.id, t.identifier_type, t.identifier_value, true
+            FROM inserted i
+            CROSS JOIN (VALUES ('email', $1::text), ('phone', $2::text))
+                AS t(identifier_type, identifier_value)
+            WHERE t.identifier_value IS NOT NULL
+            ON CONFLICT (identifier_type, identifier_value)
+            DO UPDATE SET verified = GREATEST(customer_identifiers.verified, EXCLUDED.verified)
+        )
+        SELECT * FROM touched
+        UNION ALL
+        SELECT * FROM inserted
         """,
         email,
         phone,
         name,
         plan,
+        identifier_type,
     )
 
-    # Also create identity records
-    if row:
-        if email:
-            await link_customer_identifier(
-                pool, row["id"], "email", email, verified=True
-            )
-        if phone:
-            await link_customer_identifier(
-                pool, row["id"], "phone", phone, verified=True
-            )
-
-    return row
-
 
 # ── 2. Identity Linking ──────────────────────────────────────────────────
 
@@ -249,44 +336,60 @@ async def get_active_conversation(
     learning — see discovery-log.md Entry 3). Active conversations are preferred
     over escalated.
 
+    Each status is probed separately (UNION ALL ... LIMIT 1), so both probes
+    are ordered reads of idx_conv_customer_open with no sort, and the
+    escalated probe only runs when no active conversation exists.
+
     Args:
         customer_id: The customer's UUID
         channel: If provided, also updates the current_channel and channels_used
 
     Returns: Conversation dict or None if no active/escalated conversation.
     """
-    row = await _fetchrow(
-        pool,
-        """
-        SELECT * FROM conversations
-        WHERE customer_id = $1 AND status IN ('active', 'escalated')
-        ORDER BY
-            CASE status WHEN 'active' THEN 0 ELSE 1 END,
-            last_message_at DESC
-        LIMIT 1
-        """,
-        customer_id,
-    )
-
-    # Update channel tracking if conversation found and channel provided
-    if row and channel:
-        await _execute(
+    if not channel:
+        return await _fetchrow(
             pool,
             """
-            UPDATE conversations
-            SET current_channel = $2::text,
-                channels_used = CASE
-                    WHEN NOT ($2::text = ANY(channels_used)) THEN array_append(channels_used, $2::text)
-                    ELSE channels_used
-                END,
-                last_message_at = NOW()
-            WHERE id = $1
+            (SELECT * FROM conversations
+             WHERE customer_id = $1 AND status = 'active'
+             ORDER BY last_message_at DESC LIMIT 1)
+            UNION ALL
+            (SELECT * FROM conversations
+             WHERE customer_id = $1 AND status = 'escalated'
+             ORDER BY last_message_at DESC LIMIT 1)
+            LIMIT 1
             """,
-            row["id"],
-            channel,
+            customer_id,
         )
 
-    return row
+    # Find and update channel tracking in one statement
+    return await _fetchrow(
+        pool,
+        """
+        WITH target AS (
+            (SELECT id FROM conversations
+             WHERE customer_id = $1 AND status = 'active'
+             ORDER BY last_message_at DESC LIMIT 1)
+            UNION ALL
+            (SELECT id FROM conversations
+             WHERE customer_id = $1 AND status = 'escalated'
+             ORDER BY last_message_at DESC LIMIT 1)
+            LIMIT 1
+        )
+        UPDATE conversations c
+        SET current_channel = $2::text,
+            channels_used = CASE
+                WHEN NOT ($2::text = ANY(c.channels_used)) THEN array_append(c.channels_used, $2::text)
+                ELSE c.channels_used
+            END,
+            last_message_at = NOW()
+        FROM target
+        WHERE c.id = target.id
+        RETURNING c.*
+        """,
+        customer_id,
+        channel,
+    )
 
 
 async def update_conversation_sentiment(
@@ -345,15 +448,22 @@ async def update_conversation_topics(
     conversation_id: uuid.UUID,
     topics: list[str],
 ) -> None:
-    """Add topics to a conversation's topic list (deduplicates)."""
+    """Add topics to a conversation's topic list (deduplicates).
+
+    Only topics not already present are appended (existing order is kept,
+    nothing is re-sorted), and the row is not rewritten at all when every
+    topic is already there.
+    """
     await _execute(
         pool,
         """
         UPDATE conversations
-        SET topics = (
-            SELECT ARRAY(SELECT DISTINCT unnest(topics || $2::text[]))
+        SET topics = COALESCE(topics, '{}') || ARRAY(
+            SELECT DISTINCT t FROM unnest($2::text[]) AS t
+            WHERE NOT (t = ANY(COALESCE(topics, '{}')))
         )
         WHERE id = $1
+          AND NOT ($2::text[] <@ COALESCE(topics, '{}'))
         """,
         conversation_id,
         topics,
@@ -380,7 +490,7 @@ async def add_message(
     """Add a message to a conversation.
 
     Also updates the conversation's last_message_at and the customer's
-    last_contact_at and total_conversations counter.
+    last_contact_at, inline or via the write-behind flusher when it runs.
 
     Args:
         conversation_id: Parent conversation UUID
@@ -397,35 +507,17 @@ async def add_message(
 
     Returns: dict with the new message row.
     """
-    import json
-
     # Check for duplicate by channel_message_id
     if channel_message_id:
         existing = await _fetchrow(
             pool,
-            "SELECT id FROM messages WHERE channel_message_id = $1",
+            "SELECT * FROM messages WHERE channel_message_id = $1 LIMIT 1",
             channel_message_id,
         )
         if existing:
-            return await _fetchrow(
-                pool,
-                "SELECT * FROM messages WHERE id = $1",
-                existing["id"],
-            )
+            return existing
 
-    tool_calls_json = json.dumps(tool_calls) if tool_calls else None
-
-    row = await _fetchrow(
-        pool,
-        """
-        INSERT INTO messages (
-            conversation_id, channel, direction, role, content,
-            sentiment_score, intent, tokens_used, latency_ms,
-            tool_calls, channel_message_id
-        )
-        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10::jsonb, $11)
-        RETURNING *
-        """,
+    args = (
         conversation_id,
         channel,
         direction,
@@ -435,28 +527,152 @@ async def add_message(
         intent,
         tokens_used,
         latency_ms,
-        tool_calls_json,
+        tool_calls or None,
         channel_message_id,
     )
 
-    # Update conversation timestamp
-    await _execute(
-        pool,
-        "UPDATE conversations SET last_message_at = NOW() WHERE id = $1",
-        conversation_id,
-    )
+    # With the flusher running, the timestamp bumps are queued and written
+    # in batches; otherwise they ride along with the INSERT
+    if _timestamp_flusher is not None:
+        row = await _fetchrow(
+            pool,
+            """
+            INSERT INTO messages (
+                conversation_id, channel, direction, role, content,
+                sentiment_score, intent, tokens_used, latency_ms,
+                tool_calls, channel_message_id
+            )
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10::jsonb, $11)
+            RETURNING *
+            """,
+            *args,
+        )
+        if row:
+            _queue_message_timestamp(conversation_id, row["created_at"])
+        return row
 
-    # Update customer's last_contact_at
-    await _execute(
+    # Insert and bump the conversation/customer timestamps in one statement
+    return await _fetchrow(
         pool,
         """
-        UPDATE customers SET last_contact_at = NOW()
-        WHERE id = (SELECT customer_id FROM conversations WHERE id = $1)
+        WITH ins AS (
+            INSERT INTO messages (
+                conversation_id, channel, direction, role, content,
+                sentiment_score, intent, tokens_used, latency_ms,
+                tool_calls, channel_message_id
+            )
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10::jsonb, $11)
+            RETURNING *
+        ),
+        conv AS (
+            UPDATE conversations SET last_message_at = NOW()
+            WHERE id = $1
+            RETURNING customer_id
+        ),
+        cust AS (
+            UPDATE customers SET last_contact_at = NOW()
+            WHERE id = (SELECT customer_id FROM conv)
+        )
+        SELECT * FROM ins
         """,
-        conversation_id,
+        *args,
     )
 
-    return row
+
+# ── Activity Timestamp Write-Behind ──────────────────────────────────────
+# conversations.last_message_at and customers.last_contact_at are
+# bookkeeping: nothing needs them to the millisecond. While the flusher task
+# runs, add_message only records the newest message time per conversation in
+# memory, and every TIMESTAMP_FLUSH_INTERVAL one statement applies all of
+# them. A chatty conversation costs one row update per interval instead of
+# two per message. Without the flusher, add_message writes them inline.
+
+_pending_message_times: dict[uuid.UUID, datetime] = {}
+_timestamp_flusher: Optional[asyncio.Task] = None
+
+
+def _queue_message_timestamp(conversation_id: uuid.UUID, at: datetime) -> None:
+    """Record a message time, keeping the newest per conversation."""
+    current = _pending_message_times.get(conversation_id)
+    if current is None or at > current:
+        _pending_message_times[conversation_id] = at
+
+
+async def flush_message_timestamps(pool: asyncpg.Pool) -> int:
+    """Write queued last_message_at / last_contact_at bumps in one statement.
+
+    GREATEST keeps a timestamp from moving backwards if a later inline write
+    already landed. On failure the batch is re-queued and the error raised.
+
+    Returns: Number of conversations updated.
+    """
+    global _pending_message_times
+    if not _pending_message_times:
+        return 0
+
+    pending, _pending_message_times = _pending_message_times, {}
+    try:
+        await _execute(
+            pool,
+            """
+            WITH d AS (
+                SELECT * FROM unnest($1::uuid[], $2::timestamptz[]) AS d(id, ts)
+            ),
+            conv AS (
+                UPDATE conversations c
+                SET last_message_at = GREATEST(c.last_message_at, d.ts)
+                FROM d
+                WHERE c.id = d.id
+                RETURNING c.customer_id, d.ts
+            )
+            UPDATE customers cu
+            SET last_contact_at = GREATEST(cu.last_contact_at, x.ts)
+            FROM (SELECT customer_id, MAX(ts) AS ts FROM conv GROUP BY customer_id) x
+            WHERE cu.id = x.customer_id
+            """,
+            list(pending),
+            list(pending.values()),
+        )
+    except Exception:
+        for conversation_id, at in pending.items():
+            _queue_message_timestamp(conversation_id, at)
+        raise
+
+    return len(pending)
+
+
+async def _run_timestamp_flusher(pool: asyncpg.Pool, interval: float) -> None:
+    """Flush queued timestamps every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await flush_message_timestamps(pool)
+        except Exception as e:
+            logger.warning(f"Activity timestamp flush failed: {e}")
+
+
+def start_timestamp_flusher(
+    pool: asyncpg.Pool, interval: float = TIMESTAMP_FLUSH_INTERVAL
+) -> None:
+    """Switch add_message to write-behind timestamps (call once at startup)."""
+    global _timestamp_flusher
+    if _timestamp_flusher is None:
+        _timestamp_flusher = asyncio.create_task(_run_timestamp_flusher(pool, interval))
+
+
+async def stop_timestamp_flusher(pool: asyncpg.Pool) -> None:
+    """Stop the flusher and write whatever is still queued (call before pool.close)."""
+    global _timestamp_flusher
+    task, _timestamp_flusher = _timestamp_flusher, None
+    if task is None:
+        return
+
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    await flush_message_timestamps(pool)
 
 
 async def get_conversation_history(
@@ -464,7 +680,7 @@ async def get_conversation_history(
     conversation_id: uuid.UUID,
     limit: int = 50,
     before: Optional[datetime] = None,
-) -> list[dict]:
+) -> list[asyncpg.Record]:
     """Retrieve message history for a conversation, ordered by time.
 
     Supports cursor-based pagination using the 'before' timestamp.
@@ -474,15 +690,15 @@ async def get_conversation_history(
         limit: Max messages to return (default 50, max 200)
         before: Only return messages created before this timestamp
 
-    Returns: List of message dicts, oldest first.
+    Returns: List of message Records (_MESSAGE_HISTORY_COLUMNS), oldest first.
     """
     limit = max(1, min(200, limit))
 
     if before:
         return await _fetch(
             pool,
-            """
-            SELECT * FROM messages
+            f"""
+            SELECT {_MESSAGE_HISTORY_COLUMNS} FROM messages
             WHERE conversation_id = $1 AND created_at < $2
             ORDER BY created_at ASC
             LIMIT $3
@@ -494,8 +710,8 @@ async def get_conversation_history(
 
     return await _fetch(
         pool,
-        """
-        SELECT * FROM messages
+        f"""
+        SELECT {_MESSAGE_HISTORY_COLUMNS} FROM messages
         WHERE conversation_id = $1
         ORDER BY created_at ASC
         LIMIT $2
@@ -505,6 +721,39 @@ async def get_conversation_history(
     )
 
 
+async def iter_conversation_history(
+    pool: asyncpg.Pool,
+    conversation_id: uuid.UUID,
+    before: Optional[datetime] = None,
+    prefetch: int = 50,
+) -> AsyncIterator[asyncpg.Record]:
+    """Stream a conversation's entire message history, oldest first.
+
+    Unlike get_conversation_history there is no row cap: rows come from a
+    server-side cursor `prefetch` at a time, so memory stays bounded however
+    long the conversation is. Holds one pool connection (inside a read
+    transaction, which cursors require) until the iteration finishes.
+
+    Usage:
+        async for message in iter_conversation_history(pool, conversation_id):
+            ...
+    """
+    async with pool.acquire() as conn:
+        async with conn.transaction(readonly=True):
+            async for record in conn.cursor(
+                f"""
+                SELECT {_MESSAGE_HISTORY_COLUMNS} FROM messages
+                WHERE conversation_id = $1
+                  AND ($2::timestamptz IS NULL OR created_at < $2)
+                ORDER BY created_at ASC
+                """,
+                conversation_id,
+                before,
+                prefetch=prefetch,
+            ):
+                yield record
+
+
 # ── 5. Tickets ────────────────────────────────────────────────────────────
 
 
@@ -519,25 +768,21 @@ async def create_ticket(
 ) -> dict:
     """Create a new support ticket linked to a conversation.
 
-    Generates a human-readable ticket_ref in format TF-YYYYMMDD-XXXX.
+    The human-readable ticket_ref (TF-YYYYMMDD-XXXX) comes from the column
+    default, next_ticket_ref(): a sequence, so refs never collide.
 
     Returns: dict with the new ticket row.
     """
-    date_str = datetime.now(timezone.utc).strftime("%Y%m%d")
-    short_id = uuid.uuid4().hex[:4].upper()
-    ticket_ref = f"TF-{date_str}-{short_id}"
-
     return await _fetchrow(
         pool,
         """
         INSERT INTO tickets (
-            ticket_ref, conversation_id, customer_id,
+            conversation_id, customer_id,
             source_channel, subject, category, priority
         )
-        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        VALUES ($1, $2, $3, $4, $5, $6)
         RETURNING *
         """,
-        ticket_ref,
         conversation_id,
         customer_id,
         source_channel,
@@ -614,26 +859,133 @@ async def get_ticket_by_ref(
     )
 
 
+async def create_ticket_end_to_end(
+    pool: asyncpg.Pool,
+    email: str,
+    name: Optional[str],
+    plan: str,
+    subject: Optional[str],
+    category: Optional[str],
+    priority: str,
+    source_channel: str,
+) -> Optional[dict]:
+    """Resolve the customer, open a conversation, and create a ticket in one statement.
+
+    Same outcome as get_or_create_customer → create_conversation →
+    create_ticket for an email-identified customer, but as one CTE-chained
+    INSERT: one round trip instead of three or more, and atomic, so a failure
+    never leaves a customer with an orphaned conversation.
+
+    Customer resolution matches get_or_create_customer: customers.email,
+    then a linked email identifier, else a new customer is created (and its
+    email identifier linked). ON CONFLICT covers a concurrent first submit.
+    The ticket_ref comes from the column default, next_ticket_ref().
+
+    Returns: dict with ticket_id, ticket_ref, customer_id, conversation_id.
+    """
+    return await _fetchrow(
+        pool,
+        """
+        WITH existing AS (
+            SELECT id FROM customers WHERE email = $1
+            UNION ALL
+            SELECT customer_id FROM customer_identifiers
+            WHERE identifier_type = 'email' AND identifier_value = $1
+            LIMIT 1
+        ),
+        touched AS (
+            UPDATE customers SET last_contact_at = NOW()
+            WHERE id IN (SELECT id FROM existing)
+            RETURNING id
+        ),
+        inserted AS (
+            INSERT INTO customers (email, name, plan, last_contact_at)
+            SELECT $1, $2, $3, NOW()
+            WHERE NOT EXISTS (SELECT 1 FROM existing)
+            ON CONFLICT (email) DO UPDATE SET last_contact_at = NOW()
+            RETURNING id
+        ),
+        cust AS (
+            SELECT id FROM touched
+            UNION ALL
+            SELECT id FROM inserted
+        ),
+        ident AS (
+            INSERT INTO customer_identifiers (customer_id, identifier_type, identifier_value, verified)
+            SELECT id, 'email', $1, true FROM inserted
+            ON CONFLICT (identifier_type, identifier_value) DO NOTHING
+        ),
+        conv AS (
+            INSERT INTO conversations (customer_id, initial_channel, current_channel, channels_used)
+            SELECT id, $4::text, $4::text, ARRAY[$4::text] FROM cust
+            RETURNING id, customer_id
+        )
+        INSERT INTO tickets (
+            conversation_id, customer_id,
+            source_channel, subject, category, priority
+        )
+        SELECT conv.id, conv.customer_id, $4, $5, $6, $7
+        FROM conv
+        RETURNING id AS ticket_id, ticket_ref, customer_id, conversation_id
+        """,
+        email,
+        name,
+        plan,
+        source_channel,
+        subject,
+        category,
+        priority,
+    )
+
+
 # ── 6. Knowledge Base Search ─────────────────────────────────────────────
 
 
+# Two fixed statement texts rather than a "$4 IS NULL OR ..." predicate: the
+# unfiltered search is a bare ORDER BY ... LIMIT over the HNSW index, and
+# each text keeps its own cached plan.
+_KB_SEARCH_TEMPLATE = """
+    SELECT id, title, content, category, source, 1 - distance AS similarity_score
+    FROM (
+        SELECT id, title, content, category, source,
+               embedding <=> $1::halfvec AS distance
+        FROM knowledge_base
+        {category_filter}
+        ORDER BY embedding <=> $1::halfvec
+        LIMIT $2
+    ) nearest
+    WHERE distance <= $3
+    ORDER BY distance
+"""
+_KB_SEARCH_SQL = _KB_SEARCH_TEMPLATE.format(category_filter="")
+_KB_SEARCH_CATEGORY_SQL = _KB_SEARCH_TEMPLATE.format(
+    category_filter="WHERE category ILIKE $4"
+)
+
+
 async def search_knowledge_base(
     pool: asyncpg.Pool,
     query_embedding: list[float],
     top_k: int = 5,
     similarity_threshold: float = 0.3,
-) -> list[dict]:
+    category: Optional[str] = None,
+) -> list[asyncpg.Record]:
     """Semantic search over product documentation using cosine similarity.
 
     Uses pgvector's <=> operator (cosine distance). Lower distance = more similar.
-    Cosine similarity = 1 - cosine distance.
+    Cosine similarity = 1 - cosine distance. The ORDER BY ... LIMIT is served
+    by the HNSW index (idx_kb_embedding); hnsw.ef_search is set per
+    connection via POOL_SERVER_SETTINGS. Rows without an embedding are not in the
+    index and never match the distance threshold.
 
     Args:
         query_embedding: 1536-dimension embedding vector from OpenAI text-embedding-3-small
+            (encoded to binary halfvec by the codec from init_connection)
         top_k: Maximum number of results (default 5, max 20)
         similarity_threshold: Minimum cosine similarity to include (0.0 to 1.0)
+        category: Optional ILIKE pattern on category (e.g. "integrations" or "%faq%")
 
-    Returns: List of dicts with title, content, category, similarity_score.
+    Returns: List of Records with title, content, category, similarity_score.
     """
     top_k = max(1, min(20, top_k))
 
@@ -641,117 +993,117 @@ async def search_knowledge_base(
     # Convert threshold to distance: distance = 1 - similarity
     max_distance = 1.0 - similarity_threshold
 
-    # Cast the embedding list to a string pgvector can parse
-    embedding_str = "[" + ",".join(str(x) for x in query_embedding) + "]"
-
+    # The HNSW scan yields the top_k nearest rows and the threshold is
+    # applied to those afterwards (same result: the threshold is monotone in
+    # distance). Filtering inside the scan would make an iterative scan keep
+    # walking the graph for rows that can never pass.
+    if category is None:
+        return await _fetch(pool, _KB_SEARCH_SQL, query_embedding, top_k, max_distance)
     return await _fetch(
-        pool,
-        """
-        SELECT
-            id,
-            title,
-            content,
-            category,
-            source,
-            1 - (embedding <=> $1::vector) AS similarity_score
-        FROM knowledge_base
-        WHERE embedding IS NOT NULL
-          AND (embedding <=> $1::vector) <= $3
-        ORDER BY embedding <=> $1::vector
-        LIMIT $2
-        """,
-        embedding_str,
-        top_k,
-        max_distance,
+        pool, _KB_SEARCH_CATEGORY_SQL, query_embedding, top_k, max_distance, category
     )
 
 
 # ── 7. Customer Full History ─────────────────────────────────────────────
 
 
+_CUSTOMER_HISTORY_SQL = f"""
+    WITH convs AS (
+        SELECT * FROM conversations WHERE customer_id = $1
+    ),
+    recent AS (
+        SELECT {_MESSAGE_HISTORY_COLUMNS} FROM messages
+        WHERE conversation_id IN (SELECT id FROM convs)
+        ORDER BY created_at DESC
+        LIMIT $2
+    )
+    SELECT
+        c.*,
+        COALESCE((
+            SELECT json_agg(cv ORDER BY cv.last_message_at DESC)
+            FROM (
+                SELECT * FROM convs ORDER BY last_message_at DESC LIMIT $3
+            ) cv
+        ), '[]') AS history_conversations,
+        COALESCE((
+            SELECT json_agg(t ORDER BY t.created_at DESC)
+            FROM (
+                SELECT * FROM tickets WHERE customer_id = c.id
+                ORDER BY created_at DESC LIMIT $3
+            ) t
+        ), '[]') AS history_tickets,
+        COALESCE((
+            SELECT json_agg(rm ORDER BY rm.created_at) FROM recent rm
+        ), '[]') AS history_recent_messages,
+        (SELECT COUNT(*) FROM convs)::int AS history_conversation_count,
+        (
+            SELECT array_agg(DISTINCT ch ORDER BY ch)
+            FROM convs cv, unnest(cv.channels_used) ch
+        ) AS history_channels,
+        (
+            SELECT array_agg(DISTINCT tp ORDER BY tp)
+            FROM convs cv, unnest(cv.topics) tp
+        ) AS history_topics,
+        (SELECT AVG(sentiment_score) FROM recent) AS history_avg_sentiment
+    FROM customers c
+    WHERE c.id = $1
+"""
+
+
 async def get_customer_full_history(
     pool: asyncpg.Pool,
     customer_id: uuid.UUID,
+    recent_message_limit: int = 20,
+    timeout: float = 2.0,
+    row_limit: int = 50,
 ) -> dict:
     """Retrieve complete interaction history for a customer.
 
     Aggregates conversations, messages, tickets, and sentiment data
-    for the agent's context window.
+    for the agent's context window. Everything comes back in one round trip:
+    the customer row plus conversations, tickets, and recent messages as
+    JSON arrays built by Postgres (json_agg), decoded by the orjson codec
+    from init_connection. The stats (conversation count, distinct channels
+    and topics, average sentiment of the recent messages) are reduced in SQL
+    too. A query slower than `timeout` seconds raises asyncio.TimeoutError.
+
+    Conversations and tickets are capped at the newest `row_limit` each; the
+    conversations_truncated / tickets_truncated flags say whether more exist
+    (one extra row is fetched to tell). The stats still cover everything.
 
     Returns: dict with customer profile, conversations, recent messages, and stats.
     """
-    # Customer profile
-    customer = await _fetchrow(
-        pool,
-        "SELECT * FROM customers WHERE id = $1",
+    _remember_statement(_CUSTOMER_HISTORY_SQL)
+    row = await pool.fetchrow(
+        _CUSTOMER_HISTORY_SQL,
         customer_id,
+        recent_message_limit,
+        row_limit + 1,
+        timeout=timeout,
     )
-    if not customer:
+    if not row:
         return {"found": False, "customer_id": str(customer_id)}
 
-    # All conversations (most recent first)
-    conversations = await _fetch(
-        pool,
-        """
-        SELECT * FROM conversations
-        WHERE customer_id = $1
-        ORDER BY last_message_at DESC
-        """,
-        customer_id,
-    )
-
-    # All tickets
-    tickets = await _fetch(
-        pool,
-        """
-        SELECT * FROM tickets
-        WHERE customer_id = $1
-        ORDER BY created_at DESC
-        """,
-        customer_id,
-    )
-
-    # Recent messages across all conversations (last 20)
-    recent_messages = await _fetch(
-        pool,
-        """
-        SELECT m.* FROM messages m
-        JOIN conversations c ON c.id = m.conversation_id
-        WHERE c.customer_id = $1
-        ORDER BY m.created_at DESC
-        LIMIT 20
-        """,
-        customer_id,
-    )
-
-    # Aggregate stats
-    all_channels = set()
-    all_topics = set()
-    for conv in conversations:
-        for ch in (conv.get("channels_used") or []):
-            all_channels.add(ch)
-        for t in (conv.get("topics") or []):
-            all_topics.add(t)
-
-    # Sentiment trend from recent messages
-    sentiment_scores = [
-        m["sentiment_score"]
-        for m in recent_messages
-        if m.get("sentiment_score") is not None
-    ]
-    avg_sentiment = (
-        sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0.0
-    )
+    customer = dict(row)
+    conversations = customer.pop("history_conversations")
+    tickets = customer.pop("history_tickets")
+    recent_messages = customer.pop("history_recent_messages")
+    conversation_count = customer.pop("history_conversation_count")
+    all_channels = customer.pop("history_channels") or []
+    all_topics = customer.pop("history_topics") or []
+    avg_sentiment = customer.pop("history_avg_sentiment") or 0.0
 
     return {
         "found": True,
         "customer": customer,
-        "conversation_count": len(conversations),
-        "conversations": conversations,
-        "tickets": tickets,
-        "recent_messages": list(reversed(recent_messages)),  # oldest first
-        "all_channels": sorted(all_channels),
-        "all_topics": sorted(all_topics),
+        "conversation_count": conversation_count,
+        "conversations": conversations[:row_limit],
+        "conversations_truncated": len(conversations) > row_limit,
+        "tickets": tickets[:row_limit],
+        "tickets_truncated": len(tickets) > row_limit,
+        "recent_messages": recent_messages,  # oldest first (json_agg order)
+        "all_channels": all_channels,
+        "all_topics": all_topics,
         "average_sentiment": round(float(avg_sentiment), 2),
         "last_contact": customer.get("last_contact_at"),
     }
@@ -779,10 +1131,6 @@ async def record_metric(
 
     Returns: dict with the new metric row.
     """
-    import json
-
-    dimensions_json = json.dumps(dimensions) if dimensions else "{}"
-
     return await _fetchrow(
         pool,
         """
@@ -793,10 +1141,136 @@ async def record_metric(
         metric_name,
         metric_value,
         channel,
-        dimensions_json,
+        dimensions or {},
     )
 
 
+# agent_metrics_5m is created by migration 004. Until it exists, summaries are
+# computed from raw agent_metrics and rollup refreshes are skipped. Only a
+# positive answer is cached, so applying 004 takes effect without a restart.
+_metrics_rollup_ready = False
+
+
+async def _metrics_rollup_exists(pool: asyncpg.Pool) -> bool:
+    """Whether the agent_metrics_5m rollup table exists."""
+    global _metrics_rollup_ready
+    if not _metrics_rollup_ready:
+        row = await _fetchrow(
+            pool, "SELECT to_regclass('agent_metrics_5m') IS NOT NULL AS ready"
+        )
+        _metrics_rollup_ready = bool(row and row["ready"])
+    return _metrics_rollup_ready
+
+
+async def refresh_metrics_rollup(pool: asyncpg.Pool, lookback_minutes: int = 15) -> str:
+    """Recompute the trailing 5-minute buckets of agent_metrics_5m.
+
+    Only buckets starting within the last `lookback_minutes` are rebuilt, so
+    each refresh scans a few minutes of raw metrics regardless of table size.
+    Run it more often than lookback_minutes (the metrics collector runs it
+    every minute). Older buckets are closed and never change. Returns ""
+    without touching the database when the rollup table doesn't exist.
+    """
+    if not await _metrics_rollup_exists(pool):
+        return ""
+    return await _execute(
+        pool,
+        """
+        INSERT INTO agent_metrics_5m (metric_name, channel, bucket, count, sum, min, max, p50, p95)
+        SELECT
+            metric_name,
+            channel,
+            date_bin('5 minutes', recorded_at, TIMESTAMPTZ '2000-01-01'),
+            COUNT(*),
+            SUM(metric_value),
+            MIN(metric_value),
+            MAX(metric_value),
+            PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY metric_value),
+            PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY metric_value)
+        FROM agent_metrics
+        WHERE recorded_at >= date_bin(
+            '5 minutes', NOW() - make_interval(mins => $1), TIMESTAMPTZ '2000-01-01'
+        )
+        GROUP BY 1, 2, 3
+        ON CONFLICT (metric_name, channel, bucket) DO UPDATE SET
+            count = EXCLUDED.count,
+            sum = EXCLUDED.sum,
+            min = EXCLUDED.min,
+            max = EXCLUDED.max,
+            p50 = EXCLUDED.p50,
+            p95 = EXCLUDED.p95
+        """,
+        lookback_minutes,
+    )
+
+
+async def refresh_metrics_rollup_if_stale(
+    pool: asyncpg.Pool, max_lookback_minutes: int
+) -> bool:
+    """Catch agent_metrics_5m up when the metrics collector has fallen behind.
+
+    The rollup is stale when raw metrics exist past the end of its newest
+    bucket, e.g. when the metrics collector isn't running. The refresh then
+    rebuilds every bucket since the newest one, at most
+    `max_lookback_minutes` back. Returns True if a refresh ran.
+    """
+    if not await _metrics_rollup_exists(pool):
+        return False
+    row = await _fetchrow(
+        pool,
+        """
+        SELECT
+            EXTRACT(EPOCH FROM NOW() - r.newest) / 60 AS lag_minutes,
+            EXISTS (
+                SELECT 1 FROM agent_metrics
+                WHERE r.newest IS NULL OR recorded_at >= r.newest + INTERVAL '5 minutes'
+            ) AS stale
+        FROM (SELECT MAX(bucket) AS newest FROM agent_metrics_5m) r
+        """,
+    )
+    if not row or not row["stale"]:
+        return False
+
+    lookback = max_lookback_minutes
+    if row["lag_minutes"] is not None:
+        lookback = min(int(row["lag_minutes"]) + 5, max_lookback_minutes)
+    await refresh_metrics_rollup(pool, lookback_minutes=lookback)
+    logger.warning(f"Metrics rollup was stale; refreshed the last {lookback} minutes")
+    return True
+
+
+# Summary statements share parameters ($1 metric, $2 hours, $3 channel or
+# NULL): one text each whether or not channel is set, so both call patterns
+# share a cached prepared statement.
+_METRICS_SUMMARY_ROLLUP_SQL = """
+    SELECT
+        COALESCE(SUM(count), 0)::int AS count,
+        ROUND(SUM(sum) / NULLIF(SUM(count), 0), 4) AS avg,
+        ROUND(MIN(min), 4) AS min,
+        ROUND(MAX(max), 4) AS max,
+        ROUND((SUM(p50 * count) / NULLIF(SUM(count), 0))::numeric, 4) AS p50,
+        ROUND((SUM(p95 * count) / NULLIF(SUM(count), 0))::numeric, 4) AS p95
+    FROM agent_metrics_5m
+    WHERE metric_name = $1
+      AND bucket >= NOW() - make_interval(hours => $2)
+      AND ($3::text IS NULL OR channel = $3)
+"""
+
+_METRICS_SUMMARY_RAW_SQL = """
+    SELECT
+        COUNT(*)::int AS count,
+        ROUND(AVG(metric_value), 4) AS avg,
+        ROUND(MIN(metric_value), 4) AS min,
+        ROUND(MAX(metric_value), 4) AS max,
+        ROUND(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY metric_value)::numeric, 4) AS p50,
+        ROUND(PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY metric_value)::numeric, 4) AS p95
+    FROM agent_metrics
+    WHERE metric_name = $1
+      AND recorded_at >= NOW() - make_interval(hours => $2)
+      AND ($3::text IS NULL OR channel = $3)
+"""
+
+
 async def get_metrics_summary(
     pool: asyncpg.Pool,
     metric_name: str,
@@ -805,30 +1279,22 @@ async def get_metrics_summary(
 ) -> dict:
     """Get aggregated metrics for monitoring dashboards.
 
+    Reads the agent_metrics_5m rollup (at most 12 rows per hour of window),
+    so the cost does not grow with ingest rate. count, avg, min and max are
+    exact; p50/p95 are count-weighted means of the per-bucket percentiles.
+    Data lags by up to one rollup refresh (about a minute) while the metrics
+    collector runs; call refresh_metrics_rollup_if_stale first otherwise.
+    Without the rollup table (migration 004 not applied) the summary is
+    computed from raw agent_metrics, with exact percentiles.
+
     Returns: dict with count, avg, min, max, p50, p95 over the time window.
     """
-    channel_filter = "AND channel = $3" if channel else ""
-    args = [metric_name, hours]
-    if channel:
-        args.append(channel)
-
-    row = await _fetchrow(
-        pool,
-        f"""
-        SELECT
-            COUNT(*)::int AS count,
-            ROUND(AVG(metric_value), 4) AS avg,
-            ROUND(MIN(metric_value), 4) AS min,
-            ROUND(MAX(metric_value), 4) AS max,
-            ROUND(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY metric_value)::numeric, 4) AS p50,
-            ROUND(PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY metric_value)::numeric, 4) AS p95
-        FROM agent_metrics
-        WHERE metric_name = $1
-          AND recorded_at >= NOW() - INTERVAL '1 hour' * $2
-          {channel_filter}
-        """,
-        *args,
+    sql = (
+        _METRICS_SUMMARY_ROLLUP_SQL
+        if await _metrics_rollup_exists(pool)
+        else _METRICS_SUMMARY_RAW_SQL
     )
+    row = await _fetchrow(pool, sql, metric_name, hours, channel)
 
     return {
         "metric_name": metric_name,
@@ -841,21 +1307,120 @@ async def get_metrics_summary(
 # ── 9. Channel Config ────────────────────────────────────────────────────
 
 
+# Channel configs change rarely but are read per request, so they are cached
+# in-process. A trigger on channel_configs NOTIFYs CHANNEL_CONFIG_CHANNEL on
+# every write and a dedicated LISTEN connection clears the cache. The cache is
+# only consulted while that listener is connected; without it every call goes
+# to the database, so a lost connection can never serve stale config. The
+# listener is only started once the trigger (migration 005) is confirmed to
+# exist; otherwise writes would never clear the cache.
+
+CHANNEL_CONFIG_CHANNEL = "channel_configs_changed"
+
+_channel_config_cache: dict[str, Optional[dict]] = {}
+_all_channel_configs: Optional[list[asyncpg.Record]] = None
+_channel_config_listener: Optional[asyncpg.Connection] = None
+# Bumped on every clear; a fetch that raced a NOTIFY is not cached
+_channel_config_generation = 0
+
+
+def _clear_channel_config_cache(*_args) -> None:
+    """Drop every cached channel config (NOTIFY / connection-loss callback)."""
+    global _all_channel_configs, _channel_config_generation
+    _channel_config_cache.clear()
+    _all_channel_configs = None
+    _channel_config_generation += 1
+
+
+def _on_listener_terminated(_conn: asyncpg.Connection) -> None:
+    """The LISTEN connection dropped: stop serving from the cache."""
+    global _channel_config_listener
+    _channel_config_listener = None
+    _clear_channel_config_cache()
+    logger.warning("Channel config listener disconnected; caching disabled")
+
+
+async def _channel_config_trigger_installed(conn: asyncpg.Connection) -> bool:
+    """Whether the enabled NOTIFY trigger on channel_configs exists."""
+    return await conn.fetchval(
+        """
+        SELECT EXISTS (
+            SELECT 1 FROM pg_trigger
+            WHERE tgrelid = to_regclass('channel_configs')
+              AND tgname = 'trg_channel_configs_notify'
+              AND tgenabled <> 'D'
+        )
+        """
+    )
+
+
+async def start_channel_config_listener(dsn: str) -> None:
+    """Open the LISTEN connection that enables channel config caching.
+
+    Caching stays off if the NOTIFY trigger is missing or disabled.
+    """
+    global _channel_config_listener
+    if _channel_config_listener is not None:
+        return
+
+    conn = await asyncpg.connect(dsn)
+    if not await _channel_config_trigger_installed(conn):
+        await conn.close()
+        logger.warning(
+            "channel_configs NOTIFY trigger missing (migration 005); "
+            "channel config caching disabled"
+        )
+        return
+    await conn.add_listener(CHANNEL_CONFIG_CHANNEL, _clear_channel_config_cache)
+    conn.add_termination_listener(_on_listener_terminated)
+    _clear_channel_config_cache()
+    _channel_config_listener = conn
+
+
+async def stop_channel_config_listener() -> None:
+    """Close the LISTEN connection (caching is disabled afterwards)."""
+    global _channel_config_listener
+    conn, _channel_config_listener = _channel_config_listener, None
+    _clear_channel_config_cache()
+    if conn is not None:
+        conn.remove_termination_listener(_on_listener_terminated)
+        await conn.close()
+
+
 async def get_channel_config(
     pool: asyncpg.Pool,
     channel: str,
 ) -> Optional[dict]:
-    """Get configuration for a specific channel."""
-    return await _fetchrow(
+    """Get configuration for a specific channel (cached while listening).
+
+    Cache hits return a deep copy, so a caller that edits the dict (or its
+    JSONB config) cannot change what later callers see.
+    """
+    if _channel_config_listener is not None and channel in _channel_config_cache:
+        return copy.deepcopy(_channel_config_cache[channel])
+
+    generation = _channel_config_generation
+    row = await _fetchrow(
         pool,
         "SELECT * FROM channel_configs WHERE channel = $1 AND enabled = true",
         channel,
     )
+    if _channel_config_listener is not None and generation == _channel_config_generation:
+        _channel_config_cache[channel] = copy.deepcopy(row)
+    return row
 
 
-async def get_all_channel_configs(pool: asyncpg.Pool) -> list[dict]:
-    """Get all enabled channel configurations."""
-    return await _fetch(
+async def get_all_channel_configs(pool: asyncpg.Pool) -> list[asyncpg.Record]:
+    """Get all enabled channel configurations (cached while listening)."""
+    global _all_channel_configs
+    if _channel_config_listener is not None and _all_channel_configs is not None:
+        return _all_channel_configs
+
+    generation = _channel_config_generation
+    rows = await _fetch(
         pool,
         "SELECT * FROM channel_configs WHERE enabled = true ORDER BY channel",
     )
+    if _channel_config_listener is not None and generation == _channel_config_generation:
+        _all_channel_configs = rows
+    return rows
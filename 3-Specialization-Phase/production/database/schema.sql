@@ -13,6 +13,7 @@
 --   6. knowledge_base      — Product documentation with vector embeddings
 --   7. channel_configs     — Per-channel settings (API keys, templates, limits)
 --   8. agent_metrics       — Observability metrics for monitoring & alerting
+--      agent_metrics_5m    — 5-minute rollup of agent_metrics for dashboards
 --
 -- Designed from: 2-Transition-to-Production/specs/code-mapping.md
 -- Migrates from: 1-Incubation-Phase/src/agent/conversation_manager.py (in-memory)
@@ -151,9 +152,20 @@ COMMENT ON COLUMN messages.tool_calls IS 'JSON array of tool calls made by the a
 -- Support tickets linked to conversations. A conversation may have multiple
 -- tickets if it spans multiple issues (future: multi-issue decomposition).
 
+-- Ticket refs: UTC date + 4 uppercase hex digits from a cycling sequence, so
+-- refs never collide unless one day sees more than 65,536 tickets.
+CREATE SEQUENCE IF NOT EXISTS ticket_ref_seq MINVALUE 0 MAXVALUE 65535 START 0 CYCLE;
+
+CREATE OR REPLACE FUNCTION next_ticket_ref()
+RETURNS TEXT AS $$
+    SELECT 'TF-' || to_char(NOW() AT TIME ZONE 'UTC', 'YYYYMMDD') || '-'
+        || upper(lpad(to_hex(nextval('ticket_ref_seq')), 4, '0'));
+$$ LANGUAGE sql VOLATILE;
+
 CREATE TABLE IF NOT EXISTS tickets (
     id                  UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    ticket_ref          VARCHAR(50) NOT NULL UNIQUE,   -- human-readable: TF-YYYYMMDD-XXXX
+    ticket_ref          VARCHAR(50) NOT NULL UNIQUE    -- human-readable: TF-YYYYMMDD-XXXX
+                        DEFAULT next_ticket_ref(),
     conversation_id     UUID NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
     customer_id         UUID NOT NULL REFERENCES customers(id) ON DELETE CASCADE,
     source_channel      VARCHAR(20) NOT NULL
@@ -184,15 +196,17 @@ CREATE TABLE IF NOT EXISTS knowledge_base (
     title               VARCHAR(500) NOT NULL,         -- section heading from product-docs.md
     content             TEXT NOT NULL,                  -- section body text
     category            VARCHAR(100),                  -- top-level category (getting_started, etc.)
-    embedding           vector(1536),                  -- OpenAI text-embedding-3-small dimension
+    embedding           halfvec(1536),                 -- OpenAI text-embedding-3-small dimension, float16
     source              VARCHAR(255),                  -- source file and section reference
+    content_hash        BYTEA,                         -- BLAKE2b-128 of title + content (loader skips unchanged)
     created_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     metadata            JSONB DEFAULT '{}'::jsonb       -- word_count, parent_section, etc.
 );
 
 COMMENT ON TABLE knowledge_base IS 'Product documentation sections with vector embeddings. Replaces TF-IDF KnowledgeBase from incubation. Loaded from product-docs.md.';
-COMMENT ON COLUMN knowledge_base.embedding IS 'OpenAI text-embedding-3-small vector (1536 dimensions). Used for cosine similarity search.';
+COMMENT ON COLUMN knowledge_base.embedding IS 'OpenAI text-embedding-3-small vector (1536 dimensions) stored as float16 halfvec. Used for cosine similarity search.';
+COMMENT ON COLUMN knowledge_base.content_hash IS 'BLAKE2b (16-byte) digest of the embedded text (title + content). The loader re-embeds a section only when this changes.';
 
 -- ── 7. Channel Configs ──────────────────────────────────────────────────────
 -- Per-channel configuration including API credentials, templates, and limits.
@@ -227,6 +241,25 @@ CREATE TABLE IF NOT EXISTS agent_metrics (
 
 COMMENT ON TABLE agent_metrics IS 'Observability metrics. Query with time-series aggregations for Grafana dashboards.';
 
+-- Rollup: 5-minute buckets per (metric_name, channel), upserted every minute
+-- by the metrics collector (database.queries.refresh_metrics_rollup) for the
+-- trailing few buckets only. get_metrics_summary reads these bounded rows
+-- instead of sorting every raw metric in the window.
+CREATE TABLE IF NOT EXISTS agent_metrics_5m (
+    metric_name         VARCHAR(100) NOT NULL,
+    channel             VARCHAR(20),
+    bucket              TIMESTAMPTZ NOT NULL,           -- start of the 5-minute bucket
+    count               INTEGER NOT NULL,
+    sum                 NUMERIC NOT NULL,
+    min                 DECIMAL(12,4) NOT NULL,
+    max                 DECIMAL(12,4) NOT NULL,
+    p50                 DOUBLE PRECISION NOT NULL,      -- exact within the bucket
+    p95                 DOUBLE PRECISION NOT NULL,
+    UNIQUE NULLS NOT DISTINCT (metric_name, channel, bucket)
+);
+
+COMMENT ON TABLE agent_metrics_5m IS 'agent_metrics rolled up into 5-minute buckets. Window percentiles are count-weighted means of bucket percentiles (approximate).';
+
 -- ── Indexes ─────────────────────────────────────────────────────────────────
 -- Performance-critical indexes based on expected query patterns.
 
@@ -240,6 +273,8 @@ CREATE INDEX IF NOT EXISTS idx_cust_ident_customer ON customer_identifiers(custo
 
 -- Conversations: find active conversations for a customer (the hot path)
 CREATE INDEX IF NOT EXISTS idx_conv_customer_status ON conversations(customer_id, status);
+CREATE INDEX IF NOT EXISTS idx_conv_customer_open ON conversations(customer_id, status, last_message_at DESC)
+    WHERE status IN ('active', 'escalated');
 CREATE INDEX IF NOT EXISTS idx_conv_status ON conversations(status);
 CREATE INDEX IF NOT EXISTS idx_conv_last_message ON conversations(last_message_at DESC);
 
@@ -253,16 +288,16 @@ CREATE INDEX IF NOT EXISTS idx_tickets_customer ON tickets(customer_id);
 CREATE INDEX IF NOT EXISTS idx_tickets_conversation ON tickets(conversation_id);
 CREATE INDEX IF NOT EXISTS idx_tickets_ref ON tickets(ticket_ref);
 
--- Knowledge base: vector similarity search (IVFFlat for approximate nearest neighbor)
--- NOTE: IVFFlat requires the table to have data before creating the index.
--- Run this AFTER load_knowledge_base.py populates the table:
---   CREATE INDEX idx_kb_embedding ON knowledge_base
---     USING ivfflat (embedding vector_cosine_ops) WITH (lists = 10);
--- For small datasets (< 1000 rows), exact search without index is fine.
+-- Knowledge base: vector similarity search (HNSW over halfvec, cosine distance)
+-- HNSW needs no training data, so the index can exist before the table is loaded.
+-- Query breadth is set per connection: hnsw.ef_search = 100 (database.queries.POOL_SERVER_SETTINGS).
+CREATE INDEX IF NOT EXISTS idx_kb_embedding ON knowledge_base
+    USING hnsw (embedding halfvec_cosine_ops);
 
 -- Agent metrics: time-series queries
 CREATE INDEX IF NOT EXISTS idx_metrics_name_time ON agent_metrics(metric_name, recorded_at DESC);
 CREATE INDEX IF NOT EXISTS idx_metrics_recorded ON agent_metrics(recorded_at DESC);
+CREATE INDEX IF NOT EXISTS idx_metrics_5m_name_bucket ON agent_metrics_5m(metric_name, bucket DESC);
 
 -- ── Trigger: auto-update updated_at ─────────────────────────────────────────
 
@@ -285,3 +320,19 @@ CREATE TRIGGER trg_channel_configs_updated_at
 CREATE TRIGGER trg_knowledge_base_updated_at
     BEFORE UPDATE ON knowledge_base
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- ── Trigger: notify channel config changes ──────────────────────────────────
+-- The API caches channel configs in-process and clears the cache on this
+-- NOTIFY (database.queries.start_channel_config_listener).
+
+CREATE OR REPLACE FUNCTION notify_channel_configs_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('channel_configs_changed', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_channel_configs_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON channel_configs
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_channel_configs_changed();
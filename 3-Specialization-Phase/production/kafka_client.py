@@ -20,25 +20,55 @@ Setup:
   Environment variables:
     KAFKA_BOOTSTRAP_SERVERS — Comma-separated broker list (default: kafka:9092)
     KAFKA_CONSUMER_GROUP   — Consumer group ID (default: fte-agent-group)
+    KAFKA_CONSUMER_CONCURRENCY — Max in-flight handler calls per consumer (default: 16)
+    KAFKA_WIRE_FORMAT      — Produced event encoding: json | msgpack (default: json)
+    KAFKA_COMPRESSION      — Ticket/escalation/DLQ compression codec (default: zstd,
+                             needs brokers >= 2.1); metrics always use lz4
+
+Event contracts: fte_events.proto (field names match the event dict keys)
 
 Dependencies:
-  aiokafka
+  aiokafka[lz4,zstd], orjson
+  msgspec (optional, KAFKA_WIRE_FORMAT=msgpack)
 """
 
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
 import os
+import random
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timezone
+from functools import cache, lru_cache, partial
+from operator import itemgetter
 from typing import Any, Callable, Coroutine, Optional
 
+import orjson
+
 logger = logging.getLogger("kafka")
 
 # ── Configuration ────────────────────────────────────────────────────────
 
 KAFKA_BOOTSTRAP_SERVERS = os.environ.get("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
 KAFKA_CONSUMER_GROUP = os.environ.get("KAFKA_CONSUMER_GROUP", "fte-agent-group")
+KAFKA_CONSUMER_CONCURRENCY = int(os.environ.get("KAFKA_CONSUMER_CONCURRENCY", "16"))
+
+# Consumers decode both formats, so switch producers to msgpack only after
+# every consumer is running a version that understands it.
+KAFKA_WIRE_FORMAT = os.environ.get("KAFKA_WIRE_FORMAT", "json")
+
+KAFKA_COMPRESSION = os.environ.get("KAFKA_COMPRESSION", "zstd")
+
+# Batching settings shared by both producers. Records sent to the same
+# partition within linger_ms go out as one compressed produce request.
+PRODUCER_BATCHING = {
+    "max_batch_size": 65536,
+    "max_request_size": 1_048_576,
+    "request_timeout_ms": 30_000,
+}
 
 # Topic definitions — centralized so all modules reference the same names
 TOPICS = {
@@ -51,6 +81,14 @@ TOPICS = {
     "dlq": "fte.dlq",
 }
 
+# Failed events waiting for the consumer's background DLQ publisher
+DLQ_QUEUE_MAXSIZE = 10_000
+DLQ_BATCH_SIZE = 100
+
+# Best-effort topics go through a separate acks=1 producer with a longer
+# linger, so they never wait on full replication or hold up ticket publishes.
+BEST_EFFORT_TOPICS = frozenset({TOPICS["metrics"]})
+
 # All inbound channel topics (for the unified consumer)
 INBOUND_TOPICS = [
     TOPICS["email_inbound"],
@@ -58,6 +96,81 @@ INBOUND_TOPICS = [
     TOPICS["webform_inbound"],
 ]
 
+# Naive datetimes are treated as UTC and all datetimes end in "Z", so event
+# payloads carry datetime objects and orjson formats them in C. default=str
+# is only called for types orjson doesn't know (e.g. Decimal), never for
+# ordinary events.
+_JSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+@cache
+def _msgpack_codec() -> tuple[Any, Any]:
+    """Shared msgspec MessagePack encoder/decoder, built on first use."""
+    import msgspec
+
+    return msgspec.msgpack.Encoder(enc_hook=str), msgspec.msgpack.Decoder(dict)
+
+
+def _iso_utc(value: datetime) -> str:
+    """A datetime as the string orjson writes under _JSON_OPTIONS."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def _msgpack_encode(event: dict) -> bytes:
+    """MessagePack-encode an event, with top-level datetimes as ISO strings.
+
+    msgspec would write them as the msgpack timestamp extension, which
+    decodes back to datetime; as strings, both wire formats decode the same.
+    """
+    if any(isinstance(v, datetime) for v in event.values()):
+        event = {k: _iso_utc(v) if isinstance(v, datetime) else v for k, v in event.items()}
+    return _msgpack_codec()[0].encode(event)
+
+
+def _value_serializer(wire_format: str) -> Callable[[Any], bytes]:
+    """Kafka value serializer for a wire format: event dict → bytes.
+
+    JSON is a C-level partial, so no Python frame runs per message.
+    """
+    if wire_format == "msgpack":
+        return _msgpack_encode
+    if wire_format == "json":
+        return partial(orjson.dumps, default=str, option=_JSON_OPTIONS)
+    raise ValueError(f"Unknown KAFKA_WIRE_FORMAT: {wire_format!r}")
+
+
+def _deserialize_event(data: bytes) -> dict:
+    """Kafka value deserializer for either wire format.
+
+    Events are always objects, so a JSON payload starts with '{' while a
+    MessagePack map never does.
+    """
+    if data[:1] == b"{":
+        return orjson.loads(data)
+    return _msgpack_codec()[1].decode(data)
+
+
+# Random bytes for event ids, read from the OS 256 ids at a time. Event ids
+# only need uniqueness, not per-call freshness; publish() runs on the event
+# loop thread, so the buffer needs no lock.
+_EVENT_ID_RANDOM_BYTES = 4096
+_random_buf = b""
+_random_pos = 0
+
+
+def _new_event_id() -> str:
+    """Random (version 4) UUID string for an event_id, from the pooled bytes."""
+    global _random_buf, _random_pos
+    if _random_pos >= len(_random_buf):
+        _random_buf = os.urandom(_EVENT_ID_RANDOM_BYTES)
+        _random_pos = 0
+    chunk = _random_buf[_random_pos:_random_pos + 16]
+    _random_pos += 16
+    return str(uuid.UUID(bytes=chunk, version=4))
+
 
 # ── Singleton Access ─────────────────────────────────────────────────────
 # Used by channel handlers to publish without managing lifecycle.
@@ -91,10 +204,41 @@ async def shutdown_producer() -> None:
 # ── Producer ─────────────────────────────────────────────────────────────
 
 
+@lru_cache(maxsize=10_000)
+def _key_hash(key: bytes) -> int:
+    """Kafka's murmur2 partition hash, memoized per key.
+
+    aiokafka's murmur2 is pure Python; customer keys repeat, so each
+    sender's hash is computed once.
+    """
+    from aiokafka.partitioner import murmur2
+
+    return murmur2(key) & 0x7FFFFFFF
+
+
+def _partition_for_key(key: Optional[bytes], all_partitions: list, available: list) -> int:
+    """Producer partitioner: same mapping as aiokafka's DefaultPartitioner.
+
+    Keyed events land on the partition the Java client would pick, so
+    per-customer ordering is unchanged; unkeyed events go to a random
+    available partition.
+    """
+    if key is None:
+        return random.choice(available or all_partitions)
+    return all_partitions[_key_hash(key) % len(all_partitions)]
+
+
+def _log_delivery_failure(delivery) -> None:
+    """Done-callback for un-awaited sends: surface broker errors in the log."""
+    if not delivery.cancelled() and delivery.exception():
+        logger.warning(f"Kafka delivery failed: {delivery.exception()}")
+
+
 class FTEKafkaProducer:
     """Kafka producer for publishing events to the FTE pipeline.
 
-    Serializes events as JSON with automatic timestamp injection.
+    Serializes events as JSON (or MessagePack, see KAFKA_WIRE_FORMAT) with
+    automatic timestamp injection.
 
     Usage:
         producer = FTEKafkaProducer()
@@ -103,27 +247,55 @@ class FTEKafkaProducer:
         await producer.stop()
     """
 
-    def __init__(self, bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS):
+    def __init__(
+        self,
+        bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS,
+        wire_format: str = KAFKA_WIRE_FORMAT,
+    ):
         self._bootstrap_servers = bootstrap_servers
+        self._serialize = _value_serializer(wire_format)
         self._producer = None
+        self._best_effort_producer = None
 
-    async def start(self) -> None:
-        """Start the Kafka producer connection."""
+    def _create_producer(self, **settings: Any):
+        """Build an AIOKafkaProducer with the shared serializers and batching."""
         from aiokafka import AIOKafkaProducer
 
-        self._producer = AIOKafkaProducer(
+        return AIOKafkaProducer(
             bootstrap_servers=self._bootstrap_servers,
-            value_serializer=lambda v: json.dumps(v, default=str).encode("utf-8"),
-            key_serializer=lambda k: k.encode("utf-8") if k else None,
-            # Reliability settings
-            acks="all",  # Wait for all replicas
+            value_serializer=self._serialize,
+            partitioner=_partition_for_key,
+            # Keys arrive as bytes (publish() encodes them), no serializer
             retry_backoff_ms=100,
+            **PRODUCER_BATCHING,
+            **settings,
+        )
+
+    async def start(self) -> None:
+        """Start the Kafka producer connections.
+
+        Tickets, escalations and the DLQ use acks=all and a brief linger.
+        Ticket and escalation publishers await that ack. DLQ sends are
+        fire-and-forget (publish_to_dlq uses wait=False, failures are only
+        logged). Their free-text content compresses best with zstd. Metrics
+        are small, repetitive events: acks=1, a longer linger, and the
+        cheaper lz4.
+        """
+        self._producer = self._create_producer(
+            acks="all", linger_ms=10, compression_type=KAFKA_COMPRESSION
+        )
+        self._best_effort_producer = self._create_producer(
+            acks=1, linger_ms=50, compression_type="lz4"
         )
         await self._producer.start()
+        await self._best_effort_producer.start()
         logger.info(f"Kafka producer started: {self._bootstrap_servers}")
 
     async def stop(self) -> None:
-        """Flush pending messages and close the producer."""
+        """Flush pending messages and close the producers."""
+        if self._best_effort_producer:
+            await self._best_effort_producer.stop()
+            self._best_effort_producer = None
         if self._producer:
             await self._producer.stop()
             self._producer = None
@@ -133,7 +305,8 @@ class FTEKafkaProducer:
         self,
         topic: str,
         event: dict,
-        key: Optional[str] = None,
+        key: bytes | str | None = None,
+        wait: bool = True,
     ) -> None:
         """Publish an event to a Kafka topic.
 
@@ -142,20 +315,35 @@ class FTEKafkaProducer:
         Args:
             topic: Kafka topic name
             event: Event payload dict
-            key: Optional partition key (e.g., customer_email for ordering)
+            key: Optional partition key (e.g., customer_email for ordering);
+                str keys are UTF-8 encoded, empty keys mean no key
+            wait: Await the broker ack. With wait=False the event is only
+                queued in the producer's batch; delivery failures are logged.
         """
         if not self._producer:
             raise RuntimeError("Producer not started. Call start() first.")
 
         # Inject metadata
         if "timestamp" not in event:
-            event["timestamp"] = datetime.now(timezone.utc).isoformat()
+            event["timestamp"] = datetime.now(timezone.utc)  # formatted by the serializer
         if "event_id" not in event:
-            import uuid
-            event["event_id"] = str(uuid.uuid4())
+            event["event_id"] = _new_event_id()
 
-        await self._producer.send_and_wait(topic, value=event, key=key)
-        logger.debug(f"Published to {topic}: event_id={event.get('event_id')}")
+        if isinstance(key, str):
+            key = key.encode("utf-8")
+        key = key or None
+
+        producer = (
+            self._best_effort_producer
+            if topic in BEST_EFFORT_TOPICS
+            else self._producer
+        )
+        if wait:
+            await producer.send_and_wait(topic, value=event, key=key)
+        else:
+            delivery = await producer.send(topic, value=event, key=key)
+            delivery.add_done_callback(_log_delivery_failure)
+        logger.debug("Published to %s: event_id=%s", topic, event["event_id"])
 
     async def publish_ticket(self, normalized_message: dict) -> None:
         """Convenience: publish a normalized channel message as a ticket event.
@@ -163,9 +351,11 @@ class FTEKafkaProducer:
         Uses the customer_email as the partition key so all messages from
         the same customer go to the same partition (ordering guarantee).
         """
-        key = normalized_message.get("customer_email") or normalized_message.get(
-            "customer_phone", ""
-        )
+        key = (
+            normalized_message.get("customer_email")
+            or normalized_message.get("customer_phone")
+            or ""
+        ).encode("utf-8")
         await self.publish(TOPICS["tickets_incoming"], normalized_message, key=key)
 
     async def publish_escalation(self, escalation: dict) -> None:
@@ -175,7 +365,7 @@ class FTEKafkaProducer:
 
     async def publish_metric(self, metric: dict) -> None:
         """Convenience: publish a metrics event."""
-        await self.publish(TOPICS["metrics"], metric)
+        await self.publish(TOPICS["metrics"], metric, wait=False)
 
     async def publish_to_dlq(self, failed_event: dict, error: str) -> None:
         """Publish a failed event to the dead letter queue.
@@ -185,9 +375,9 @@ class FTEKafkaProducer:
         dlq_event = {
             "original_event": failed_event,
             "error": error,
-            "failed_at": datetime.now(timezone.utc).isoformat(),
+            "failed_at": datetime.now(timezone.utc),
         }
-        await self.publish(TOPICS["dlq"], dlq_event)
+        await self.publish(TOPICS["dlq"], dlq_event, wait=False)
 
 
 # ── Consumer ─────────────────────────────────────────────────────────────
@@ -197,7 +387,11 @@ class FTEKafkaConsumer:
     """Kafka consumer for processing incoming ticket events.
 
     Subscribes to one or more topics and calls a handler function
-    for each message received.
+    for each message received. A fetch loop feeds a bounded queue drained
+    by `concurrency` worker tasks, so polling never waits on a slow
+    handler. Messages sharing a partition key — the same customer — are
+    still handled in order. Each partition's committed offset only advances
+    past messages that have finished (at-least-once).
 
     Usage:
         consumer = FTEKafkaConsumer(
@@ -214,30 +408,59 @@ class FTEKafkaConsumer:
         topics: list[str],
         group_id: str = KAFKA_CONSUMER_GROUP,
         bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS,
+        concurrency: int = KAFKA_CONSUMER_CONCURRENCY,
+        max_records: int = 100,
     ):
         self._topics = topics
         self._group_id = group_id
         self._bootstrap_servers = bootstrap_servers
+        self._concurrency = concurrency
+        self._max_records = max_records
         self._consumer = None
         self._running = False
+        # Per-partition progress for commits, and the last queued message of
+        # each (partition, key) lane so the next one can wait for it
+        self._in_flight: dict[Any, set[int]] = {}
+        self._next_offset: dict[Any, int] = {}
+        self._committed: dict[Any, int] = {}
+        self._lane_tails: dict[tuple, asyncio.Future] = {}
+        # Failed events, published to the DLQ off the handler path
+        self._dlq_queue: asyncio.Queue = asyncio.Queue(maxsize=DLQ_QUEUE_MAXSIZE)
+        self._dlq_task: Optional[asyncio.Task] = None
 
     async def start(self) -> None:
         """Start the Kafka consumer and subscribe to topics."""
         from aiokafka import AIOKafkaConsumer
+        from aiokafka.coordinator.assignors.roundrobin import (
+            RoundRobinPartitionAssignor,
+        )
+        from aiokafka.coordinator.assignors.sticky.sticky_assignor import (
+            StickyPartitionAssignor,
+        )
 
         self._consumer = AIOKafkaConsumer(
             *self._topics,
             bootstrap_servers=self._bootstrap_servers,
             group_id=self._group_id,
-            value_deserializer=lambda v: json.loads(v.decode("utf-8")),
+            value_deserializer=_deserialize_event,
             # Consumer settings
             auto_offset_reset="earliest",  # Process from beginning on first run
-            enable_auto_commit=True,
-            auto_commit_interval_ms=5000,
-            max_poll_records=10,  # Process in small batches
+            enable_auto_commit=False,  # Committed as messages finish
+            max_poll_records=self._max_records,
+            # Group membership: sticky assignment moves only the partitions
+            # that must move on a rebalance. Round-robin stays listed so the
+            # group can still agree on a protocol with older members mid-rollout.
+            partition_assignment_strategy=(
+                StickyPartitionAssignor,
+                RoundRobinPartitionAssignor,
+            ),
+            session_timeout_ms=10_000,
+            heartbeat_interval_ms=3_000,
+            max_poll_interval_ms=300_000,  # Headroom while the work queue is full
         )
         await self._consumer.start()
         self._running = True
+        self._dlq_task = asyncio.create_task(self._drain_dlq())
         logger.info(
             f"Kafka consumer started: topics={self._topics}, group={self._group_id}"
         )
@@ -245,6 +468,13 @@ class FTEKafkaConsumer:
     async def stop(self) -> None:
         """Stop consuming and close the connection."""
         self._running = False
+        if self._dlq_task:
+            self._dlq_task.cancel()
+            await asyncio.gather(self._dlq_task, return_exceptions=True)
+            self._dlq_task = None
+            # Hand anything still queued to the producer before it is flushed
+            while not self._dlq_queue.empty():
+                await self._publish_dlq_batch()
         if self._consumer:
             await self._consumer.stop()
             self._consumer = None
@@ -263,40 +493,203 @@ class FTEKafkaConsumer:
         Args:
             handler: Async function(topic, event) to process each message.
         """
-        if not self._consumer:
+        consumer = self._consumer
+        if not consumer:
             raise RuntimeError("Consumer not started. Call start() first.")
 
         logger.info("Starting message consumption loop")
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._concurrency * 2)
+        workers = [
+            asyncio.create_task(self._worker(queue, handler))
+            for _ in range(self._concurrency)
+        ]
 
-        async for msg in self._consumer:
-            if not self._running:
-                break
+        try:
+            while self._running:
+                batches = await consumer.getmany(
+                    timeout_ms=200, max_records=self._max_records
+                )
+                for tp, messages in batches.items():
+                    in_flight = self._in_flight.setdefault(tp, set())
+                    for msg in messages:
+                        lane = (tp, msg.key)
+                        previous = self._lane_tails.get(lane)
+                        done = loop.create_future()
+                        self._lane_tails[lane] = done
+                        in_flight.add(msg.offset)
+                        self._next_offset[tp] = msg.offset + 1
+                        # Blocks while the workers are saturated (backpressure)
+                        await queue.put((tp, lane, msg, previous, done))
+
+                await self._commit_progress(consumer)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _worker(
+        self,
+        queue: asyncio.Queue,
+        handler: Callable[[str, dict], Coroutine[Any, Any, None]],
+    ) -> None:
+        """Handle queued messages until cancelled."""
+        while True:
+            tp, lane, msg, previous, done = await queue.get()
+            if previous is not None:
+                # Same customer: wait for the earlier message to finish
+                await asyncio.wait([previous])
+            await self._dispatch(msg.topic, msg.value, handler)
+
+            done.set_result(None)
+            in_flight = self._in_flight.get(tp)
+            if in_flight is not None:
+                in_flight.discard(msg.offset)
+            if self._lane_tails.get(lane) is done:
+                del self._lane_tails[lane]
+
+    async def _commit_progress(self, consumer) -> None:
+        """Commit each partition up to its oldest unfinished message."""
+        assigned = consumer.assignment()
+        for tp in [tp for tp in self._in_flight if tp not in assigned]:
+            # Revoked in a rebalance: the new owner resumes from our last commit
+            del self._in_flight[tp]
+            self._next_offset.pop(tp, None)
+            self._committed.pop(tp, None)
+
+        offsets = {}
+        for tp, in_flight in self._in_flight.items():
+            position = min(in_flight) if in_flight else self._next_offset[tp]
+            if position > self._committed.get(tp, -1):
+                offsets[tp] = position
+        if not offsets:
+            return
+
+        try:
+            await consumer.commit(offsets)
+            self._committed.update(offsets)
+        except Exception as e:
+            # Uncommitted messages are redelivered after a rebalance/restart
+            logger.warning(f"Kafka offset commit failed: {e}")
+
+    async def _dispatch(
+        self,
+        topic: str,
+        event: dict,
+        handler: Callable[[str, dict], Coroutine[Any, Any, None]],
+    ) -> None:
+        """Run the handler for one event, routing failures to the DLQ."""
+        try:
+            await handler(topic, event)
+            logger.debug(
+                "Processed message from %s: event_id=%s", topic, event.get("event_id", "?")
+            )
+        except Exception as e:
+            logger.error(
+                f"Failed to process message from {topic}: {e}",
+                exc_info=True,
+            )
+            # Send to dead letter queue (in the background)
+            try:
+                self._dlq_queue.put_nowait((event, str(e)))
+            except asyncio.QueueFull:
+                logger.error(f"DLQ backlog full, dropping failed event from {topic}")
+
+    async def _drain_dlq(self) -> None:
+        """Publish queued failed events to the DLQ until cancelled."""
+        while True:
+            await self._publish_dlq_batch(await self._dlq_queue.get())
 
-            topic = msg.topic
-            event = msg.value
+    async def _publish_dlq_batch(self, first: Optional[tuple] = None) -> None:
+        """Publish one item (if given) plus up to DLQ_BATCH_SIZE queued behind it.
 
+        Sends aren't awaited for an ack; the producer batches them.
+        """
+        batch = [first] if first else []
+        while len(batch) < DLQ_BATCH_SIZE and not self._dlq_queue.empty():
+            batch.append(self._dlq_queue.get_nowait())
+
+        producer = get_producer()
+        if not producer:
+            return
+        for event, error in batch:
             try:
-                await handler(topic, event)
-                logger.debug(
-                    f"Processed message from {topic}: event_id={event.get('event_id', '?')}"
-                )
-            except Exception as e:
-                logger.error(
-                    f"Failed to process message from {topic}: {e}",
-                    exc_info=True,
-                )
-                # Send to dead letter queue
-                try:
-                    producer = get_producer()
-                    if producer:
-                        await producer.publish_to_dlq(event, str(e))
-                except Exception as dlq_error:
-                    logger.error(f"Failed to publish to DLQ: {dlq_error}")
+                await producer.publish_to_dlq(event, error)
+            except Exception as dlq_error:
+                logger.error(f"Failed to publish to DLQ: {dlq_error}")
 
 
 # ── Unified Ticket Handler ──────────────────────────────────────────────
 # Default handler that routes inbound messages to the agent.
 
+# Bound on the first ticket rather than at import: the API and metrics
+# collector import this module only for the producer and shouldn't pull in
+# the agent stack.
+_run_agent = None
+_get_or_create_customer = None
+_get_pool = None
+
+
+def _bind_handler_deps() -> None:
+    """Resolve the agent/database callables used by default_ticket_handler."""
+    global _run_agent, _get_or_create_customer, _get_pool
+    from agent.customer_success_agent import run_agent
+    from agent.tools import _get_pool as get_pool
+    from database.queries import get_or_create_customer
+
+    _get_or_create_customer = get_or_create_customer
+    _get_pool = get_pool
+    _run_agent = run_agent
+
+
+# email/phone → customer_id for recent senders. Customer ids never change,
+# so the TTL only bounds how long a skipped get_or_create_customer can
+# leave last_contact_at behind.
+CUSTOMER_CACHE_TTL_SECONDS = 300
+CUSTOMER_CACHE_MAXSIZE = 10_000
+
+_customer_ids: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+
+def _cached_customer_id(key: str) -> Optional[str]:
+    """Return the cached customer_id for an email/phone, if still fresh."""
+    entry = _customer_ids.get(key) if key else None
+    if entry is None:
+        return None
+    customer_id, expires_at = entry
+    if expires_at < time.monotonic():
+        del _customer_ids[key]
+        return None
+    _customer_ids.move_to_end(key)
+    return customer_id
+
+
+def _cache_customer_id(key: str, customer_id: str) -> None:
+    """Remember a resolved customer_id, evicting the least recently used."""
+    if not key:
+        return
+    _customer_ids[key] = (customer_id, time.monotonic() + CUSTOMER_CACHE_TTL_SECONDS)
+    _customer_ids.move_to_end(key)
+    if len(_customer_ids) > CUSTOMER_CACHE_MAXSIZE:
+        _customer_ids.popitem(last=False)
+
+
+# Inbound ticket fields and their defaults. Channel handlers normally send
+# every field, so those events are read with one itemgetter call; events
+# missing any field fall back to a .get() per field. Neither path copies the
+# event.
+_TICKET_DEFAULTS = {
+    "channel": "web_form",
+    "customer_email": "",
+    "customer_phone": "",
+    "customer_name": "Customer",
+    "customer_plan": "free",
+    "subject": "Support Request",
+    "content": "",
+}
+_ticket_fields = itemgetter(*_TICKET_DEFAULTS)
+_TICKET_KEYS = _TICKET_DEFAULTS.keys()
+
 
 async def default_ticket_handler(topic: str, event: dict) -> None:
     """Default handler for incoming ticket events.
@@ -308,44 +701,48 @@ async def default_ticket_handler(topic: str, event: dict) -> None:
         topic: Source Kafka topic
         event: Normalized message dict from a channel handler
     """
-    from agent.customer_success_agent import run_agent
-    from database.queries import get_or_create_customer
-    from agent.tools import _get_pool
-
-    channel = event.get("channel", "web_form")
-    customer_email = event.get("customer_email", "")
-    customer_phone = event.get("customer_phone", "")
-    customer_name = event.get("customer_name", "Customer")
-    customer_plan = event.get("customer_plan", "free")
-    subject = event.get("subject", "Support Request")
-    content = event.get("content", "")
+    if _run_agent is None:
+        _bind_handler_deps()
+
+    if event.keys() >= _TICKET_KEYS:
+        fields = _ticket_fields(event)
+    else:
+        fields = [event.get(k, default) for k, default in _TICKET_DEFAULTS.items()]
+    (
+        channel, customer_email, customer_phone, customer_name,
+        customer_plan, subject, content,
+    ) = fields
 
     if not content:
         logger.warning(f"Skipping empty message from {topic}")
         return
 
-    logger.info(
-        f"Processing ticket from {topic}: channel={channel}, "
-        f"customer={customer_email or customer_phone}"
-    )
-
-    # Resolve customer
-    customer_id = None
-    try:
-        pool = _get_pool()
-        customer = await get_or_create_customer(
-            pool,
-            email=customer_email or None,
-            phone=customer_phone or None,
-            name=customer_name,
-            plan=customer_plan,
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Processing ticket from %s: channel=%s, customer=%s",
+            topic, channel, customer_email or customer_phone,
         )
-        customer_id = str(customer["id"])
-    except Exception as e:
-        logger.warning(f"Customer resolution failed: {e}")
+
+    # Resolve customer (repeat senders are served from the in-process cache)
+    cache_key = customer_email or customer_phone
+    customer_id = _cached_customer_id(cache_key)
+    if customer_id is None:
+        try:
+            pool = _get_pool()
+            customer = await _get_or_create_customer(
+                pool,
+                email=customer_email or None,
+                phone=customer_phone or None,
+                name=customer_name,
+                plan=customer_plan,
+            )
+            customer_id = str(customer["id"])
+            _cache_customer_id(cache_key, customer_id)
+        except Exception as e:
+            logger.warning(f"Customer resolution failed: {e}")
 
     # Run the agent
-    result = await run_agent(
+    result = await _run_agent(
         customer_message=content,
         customer_email=customer_email or customer_phone,
         channel=channel,
@@ -354,40 +751,37 @@ async def default_ticket_handler(topic: str, event: dict) -> None:
         customer_id=customer_id,
         ticket_subject=subject,
     )
-
-    # If escalated, publish to escalation topic
-    if result.get("escalated"):
-        try:
-            producer = get_producer()
-            if producer:
-                await producer.publish_escalation({
-                    "ticket_id": result.get("ticket_id"),
-                    "channel": channel,
-                    "customer_email": customer_email,
-                    "customer_name": customer_name,
-                    "escalation_details": result.get("escalation_details"),
-                    "sentiment_score": result.get("sentiment_score"),
-                })
-        except Exception as e:
-            logger.error(f"Failed to publish escalation: {e}")
-
-    # Publish metrics
-    try:
-        producer = get_producer()
-        if producer:
-            await producer.publish_metric({
-                "metric_name": "ticket_processed",
+    producer = get_producer()
+
+    # Escalation (if any) and metrics are independent — publish concurrently
+    if producer:
+        publishes = {}
+        if result.get("escalated"):
+            publishes["escalation"] = producer.publish_escalation({
+                "ticket_id": result.get("ticket_id"),
                 "channel": channel,
-                "latency_ms": result.get("latency_ms", 0),
-                "escalated": result.get("escalated", False),
-                "sentiment_score": result.get("sentiment_score", 0.0),
-                "tools_used": result.get("tools_used", []),
+                "customer_email": customer_email,
+                "customer_name": customer_name,
+                "escalation_details": result.get("escalation_details"),
+                "sentiment_score": result.get("sentiment_score"),
             })
-    except Exception:
-        pass  # Metrics are best-effort
-
-    logger.info(
-        f"Ticket processed: ticket_id={result.get('ticket_id')}, "
-        f"escalated={result.get('escalated')}, "
-        f"latency={result.get('latency_ms')}ms"
-    )
+        publishes["metrics"] = producer.publish_metric({
+            "metric_name": "ticket_processed",
+            "channel": channel,
+            "latency_ms": result.get("latency_ms", 0),
+            "escalated": result.get("escalated", False),
+            "sentiment_score": result.get("sentiment_score", 0.0),
+            "tools_used": result.get("tools_used", []),
+        })
+
+        outcomes = await asyncio.gather(*publishes.values(), return_exceptions=True)
+        for kind, outcome in zip(publishes, outcomes):
+            # Metrics are best-effort; a lost escalation needs attention
+            if isinstance(outcome, Exception) and kind == "escalation":
+                logger.error(f"Failed to publish escalation: {outcome}")
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Ticket processed: ticket_id=%s, escalated=%s, latency=%sms",
+            result.get("ticket_id"), result.get("escalated"), result.get("latency_ms"),
+        )
@@ -9,11 +9,13 @@ Usage:
 
 from __future__ import annotations
 
+import json
 import os
 import sys
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from pydantic import BaseModel
 
 # Ensure the production package is importable
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -38,10 +40,72 @@ def test_client():
         mock_asyncpg.create_pool = AsyncMock(return_value=mock_pool)
 
         from api.main import app
+        # TestClient outside a `with` block skips lifespan; attach the pool here
+        app.state.db_pool = mock_pool
         client = TestClient(app)
         yield client
 
 
+# ── Embedding Mocks ─────────────────────────────────────────────────────
+
+
+class EmbeddingStack:
+    """Prebuilt OpenAI embeddings mock, installed per test with monkeypatch."""
+
+    def __init__(self):
+        self.client = MagicMock()
+        self.client.embeddings.create = AsyncMock(
+            return_value=MagicMock(data=[MagicMock(embedding=[0.1] * 1536)])
+        )
+
+    def install(self, monkeypatch, db_search_return):
+        """Patch the shared embeddings client, the KB query and the pool.
+
+        The tool imports database.queries.search_knowledge_base at call time,
+        so the query is patched on database.queries, not agent.tools.
+        """
+        self.client.embeddings.create.reset_mock()
+        monkeypatch.setattr("agent.tools.AsyncOpenAI", lambda *a, **k: self.client)
+        monkeypatch.setattr(
+            "database.queries.search_knowledge_base",
+            AsyncMock(return_value=db_search_return),
+        )
+        monkeypatch.setattr("agent.tools._get_pool", lambda: None)
+        return self.client
+
+
+@pytest.fixture(scope="module")
+def mock_embedding_stack():
+    """One embeddings mock stack per test module (see EmbeddingStack.install)."""
+    return EmbeddingStack()
+
+
+# ── Tool Invocation ─────────────────────────────────────────────────────
+
+
+async def _invoke_tool(tool, input: BaseModel) -> str:
+    """Run a @function_tool the way the agent runner does: JSON arguments in."""
+    from agents.tool_context import ToolContext
+
+    args = json.dumps({"input": input.model_dump(mode="json")})
+    ctx = ToolContext(
+        context=None,
+        tool_name=tool.name,
+        tool_call_id="test-call",
+        tool_arguments=args,
+    )
+    return await tool.on_invoke_tool(ctx, args)
+
+
+@pytest.fixture
+def call_tool():
+    """Invoke an agent tool: `await call_tool(create_ticket, TicketInput(...))`.
+
+    @function_tool returns a FunctionTool, which is not directly callable.
+    """
+    return _invoke_tool
+
+
 # ── Sample Ticket Fixtures ──────────────────────────────────────────────
 
 
@@ -12,14 +12,33 @@ from __future__ import annotations
 
 import asyncio
 import re
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
-# ── Sentiment Analyzer (direct import, no DB needed) ────────────────────
-
-from agent.tools import _analyze_sentiment_score
+from agent import tools
 from agent.formatters import format_for_channel, _whatsapp_truncate
+from agent.tools import (
+    EscalationInput,
+    KnowledgeSearchInput,
+    TicketInput,
+    _analyze_sentiment_score,
+    _category_pattern,
+    create_ticket,
+    escalate_to_human,
+    search_knowledge_base,
+)
+
+# Shared, never mutated: AsyncMock only hands the response back to be read.
+_FAKE_EMBEDDING = [0.1] * 1536
+_FAKE_EMBED_RESP = MagicMock(data=[MagicMock(embedding=_FAKE_EMBEDDING)])
+
+
+def _raiser(exc: Exception):
+    """Stand-in callable that raises `exc` (for monkeypatch.setattr)."""
+    def _raise(*args, **kwargs):
+        raise exc
+    return _raise
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -30,81 +49,122 @@ from agent.formatters import format_for_channel, _whatsapp_truncate
 class TestKnowledgeSearch:
     """Tests for the search_knowledge_base tool."""
 
+    @pytest.fixture(autouse=True)
+    def fresh_openai_client(self):
+        """Tests patch AsyncOpenAI — drop the shared client around each one."""
+        tools._openai_client = None
+        yield
+        tools._openai_client = None
+
     @pytest.mark.asyncio
-    async def test_search_returns_results(self):
+    async def test_search_returns_results(self, call_tool, mock_embedding_stack, monkeypatch):
         """search 'password reset' → should return results."""
         mock_results = [
             {"title": "Password Reset Guide", "content": "Go to Settings > Security > Reset Password...", "category": "Troubleshooting", "similarity_score": 0.85},
             {"title": "Account Security", "content": "Two-factor authentication...", "category": "Getting Started", "similarity_score": 0.72},
         ]
+        mock_embedding_stack.install(monkeypatch, mock_results)
 
-        with patch("agent.tools._get_pool") as mock_pool, \
-             patch("agent.tools.AsyncOpenAI") as mock_openai:
-            # Mock embedding
-            mock_client = MagicMock()
-            mock_embed_resp = MagicMock()
-            mock_embed_resp.data = [MagicMock(embedding=[0.1] * 1536)]
-            mock_client.embeddings.create = AsyncMock(return_value=mock_embed_resp)
-            mock_openai.return_value = mock_client
-
-            # Mock DB search
-            with patch("agent.tools.db_search", new_callable=AsyncMock, return_value=mock_results):
-                from agent.tools import search_knowledge_base, KnowledgeSearchInput
-                result = await search_knowledge_base(KnowledgeSearchInput(query="password reset"))
+        result = await call_tool(search_knowledge_base, KnowledgeSearchInput(query="password reset"))
 
-                assert "Password Reset Guide" in result
-                assert "relevance:" in result
+        assert "Password Reset Guide" in result
+        assert "relevance:" in result
 
     @pytest.mark.asyncio
-    async def test_search_handles_no_results(self):
+    async def test_search_handles_no_results(self, call_tool, mock_embedding_stack, monkeypatch):
         """search 'xyznonexistent123' → should return helpful message not crash."""
-        with patch("agent.tools._get_pool"), \
-             patch("agent.tools.AsyncOpenAI") as mock_openai:
-            mock_client = MagicMock()
-            mock_embed_resp = MagicMock()
-            mock_embed_resp.data = [MagicMock(embedding=[0.1] * 1536)]
-            mock_client.embeddings.create = AsyncMock(return_value=mock_embed_resp)
-            mock_openai.return_value = mock_client
+        mock_embedding_stack.install(monkeypatch, [])
 
-            with patch("agent.tools.db_search", new_callable=AsyncMock, return_value=[]):
-                from agent.tools import search_knowledge_base, KnowledgeSearchInput
-                result = await search_knowledge_base(KnowledgeSearchInput(query="xyznonexistent123"))
+        result = await call_tool(search_knowledge_base, KnowledgeSearchInput(query="xyznonexistent123"))
 
-                assert "no relevant" in result.lower() or "not found" in result.lower() or "app.taskflow.io" in result
+        assert "no relevant" in result.lower() or "not found" in result.lower() or "app.taskflow.io" in result
 
     @pytest.mark.asyncio
-    async def test_search_db_unavailable(self):
+    async def test_search_db_unavailable(self, call_tool, monkeypatch):
         """When DB pool is not initialized → returns fallback message."""
-        with patch("agent.tools._get_pool", side_effect=RuntimeError("not initialized")):
-            from agent.tools import search_knowledge_base, KnowledgeSearchInput
-            result = await search_knowledge_base(KnowledgeSearchInput(query="password reset"))
+        monkeypatch.setattr("agent.tools._get_pool", _raiser(RuntimeError("not initialized")))
 
-            assert "unavailable" in result.lower() or "app.taskflow.io" in result
+        result = await call_tool(search_knowledge_base, KnowledgeSearchInput(query="password reset"))
+
+        assert "unavailable" in result.lower() or "app.taskflow.io" in result
 
     @pytest.mark.asyncio
-    async def test_search_max_results(self):
+    async def test_search_max_results(self, call_tool, mock_embedding_stack, monkeypatch):
         """request 3 results → get max 3 back."""
         mock_results = [
             {"title": f"Doc {i}", "content": f"Content {i}", "category": "General", "similarity_score": 0.8 - i * 0.1}
             for i in range(5)
         ]
+        # Return only 3 results (DB respects top_k)
+        mock_embedding_stack.install(monkeypatch, mock_results[:3])
+
+        result = await call_tool(search_knowledge_base, KnowledgeSearchInput(query="test", max_results=3))
+
+        assert "Result 1" in result
+        assert "Result 3" in result
+        assert "Result 4" not in result
 
-        with patch("agent.tools._get_pool"), \
-             patch("agent.tools.AsyncOpenAI") as mock_openai:
-            mock_client = MagicMock()
-            mock_embed_resp = MagicMock()
-            mock_embed_resp.data = [MagicMock(embedding=[0.1] * 1536)]
-            mock_client.embeddings.create = AsyncMock(return_value=mock_embed_resp)
-            mock_openai.return_value = mock_client
 
-            # Return only 3 results (DB respects top_k)
-            with patch("agent.tools.db_search", new_callable=AsyncMock, return_value=mock_results[:3]):
-                from agent.tools import search_knowledge_base, KnowledgeSearchInput
-                result = await search_knowledge_base(KnowledgeSearchInput(query="test", max_results=3))
+    def test_category_pattern_for_sql_filter(self):
+        """known category/alias → exact heading; unknown → escaped substring pattern."""
+        assert _category_pattern("FAQ") == "frequently asked questions"
+        assert _category_pattern(" Integrations ") == "integrations"
+        assert _category_pattern("billing_50%") == "%billing\\_50\\%%"
+
+    @pytest.mark.asyncio
+    async def test_repeated_query_embedding_is_cached(self, monkeypatch):
+        """same query twice (case/punctuation/whitespace differ) → one embeddings API call."""
+        tools._embedding_cache.clear()
+        mock_client = MagicMock()
+        mock_client.embeddings.create = AsyncMock(return_value=_FAKE_EMBED_RESP)
+        monkeypatch.setattr(tools, "AsyncOpenAI", lambda *a, **k: mock_client)
 
-                assert "Result 1" in result
-                assert "Result 3" in result
-                assert "Result 4" not in result
+        first = await tools._embed_query("How do I reset my password?")
+        second = await tools._embed_query("  how do i  reset my password  ")
+
+        assert first == second
+        assert mock_client.embeddings.create.await_count == 1
+        tools._embedding_cache.clear()
+
+
+    @pytest.mark.asyncio
+    async def test_concurrent_queries_share_one_embedding_request(self, monkeypatch):
+        """two concurrent searches → one batched embeddings API call."""
+        tools._embedding_cache.clear()
+        mock_client = MagicMock()
+        mock_embed_resp = MagicMock()
+        mock_embed_resp.data = [
+            MagicMock(embedding=[0.1] * 1536),
+            MagicMock(embedding=[0.2] * 1536),
+        ]
+        mock_client.embeddings.create = AsyncMock(return_value=mock_embed_resp)
+        monkeypatch.setattr(tools, "AsyncOpenAI", lambda *a, **k: mock_client)
+
+        first, second = await asyncio.gather(
+            tools._embed_query("reset password"),
+            tools._embed_query("slack integration"),
+        )
+
+        assert first[0] == 0.1 and second[0] == 0.2
+        mock_client.embeddings.create.assert_awaited_once()
+        sent = mock_client.embeddings.create.call_args.kwargs["input"]
+        assert sent == ["reset password", "slack integration"]
+        tools._embedding_cache.clear()
+
+
+    @pytest.mark.asyncio
+    async def test_openai_client_reused_across_searches(self, monkeypatch):
+        """two sequential embedding calls → one AsyncOpenAI client."""
+        mock_client = MagicMock()
+        mock_client.embeddings.create = AsyncMock(return_value=_FAKE_EMBED_RESP)
+        mock_openai = MagicMock(return_value=mock_client)
+        monkeypatch.setattr(tools, "AsyncOpenAI", mock_openai)
+
+        await tools._embed_texts(["reset password"])
+        await tools._embed_texts(["slack integration"])
+
+        mock_openai.assert_called_once()
+        assert mock_client.embeddings.create.await_count == 2
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -115,79 +175,67 @@ class TestKnowledgeSearch:
 class TestTicketCreation:
     """Tests for the create_ticket tool."""
 
+    @pytest.mark.parametrize(
+        "channel,customer_id,issue,ticket_ref",
+        [
+            ("email", "00000000-0000-0000-0000-000000000001", "Cannot connect Slack integration", "TF-20250115-ABCD"),
+            ("whatsapp", "00000000-0000-0000-0000-000000000002", "Password reset", "TF-20250115-WXYZ"),
+            ("web_form", "00000000-0000-0000-0000-000000000003", "Dashboard slow", "TF-20250115-1234"),
+        ],
+        ids=["email", "whatsapp", "web_form"],
+    )
     @pytest.mark.asyncio
-    async def test_create_ticket_email(self):
-        """create ticket with channel=email → returns ticket ID."""
+    async def test_create_ticket(self, call_tool, channel, customer_id, issue, ticket_ref, monkeypatch):
+        """create ticket on each supported channel → returns its ticket ID."""
         mock_conv = {"id": "conv-uuid-001"}
-        mock_ticket = {"ticket_ref": "TF-20250115-ABCD", "id": "ticket-uuid-001"}
-
-        with patch("agent.tools._get_pool"), \
-             patch("agent.tools.get_active_conversation", new_callable=AsyncMock, return_value=None), \
-             patch("agent.tools.create_conversation", new_callable=AsyncMock, return_value=mock_conv), \
-             patch("agent.tools.db_create_ticket", new_callable=AsyncMock, return_value=mock_ticket):
-            from agent.tools import create_ticket, TicketInput
-            result = await create_ticket(TicketInput(
-                customer_id="00000000-0000-0000-0000-000000000001",
-                issue="Cannot connect Slack integration",
-                channel="email",
-            ))
-
-            assert "TF-20250115-ABCD" in result
-            assert "email" not in result or "Ticket" in result  # Contains ticket ref
+        mock_ticket = {"ticket_ref": ticket_ref, "id": "ticket-uuid-001"}
 
-    @pytest.mark.asyncio
-    async def test_create_ticket_whatsapp(self):
-        """create ticket with channel=whatsapp → returns ticket ID."""
-        mock_conv = {"id": "conv-uuid-002"}
-        mock_ticket = {"ticket_ref": "TF-20250115-WXYZ", "id": "ticket-uuid-002"}
-
-        with patch("agent.tools._get_pool"), \
-             patch("agent.tools.get_active_conversation", new_callable=AsyncMock, return_value=None), \
-             patch("agent.tools.create_conversation", new_callable=AsyncMock, return_value=mock_conv), \
-             patch("agent.tools.db_create_ticket", new_callable=AsyncMock, return_value=mock_ticket):
-            from agent.tools import create_ticket, TicketInput
-            result = await create_ticket(TicketInput(
-                customer_id="00000000-0000-0000-0000-000000000002",
-                issue="Password reset",
-                channel="whatsapp",
-            ))
-
-            assert "TF-" in result
+        monkeypatch.setattr("agent.tools._get_pool", MagicMock())
+        monkeypatch.setattr("database.queries.get_active_conversation", AsyncMock(return_value=None))
+        monkeypatch.setattr("database.queries.create_conversation", AsyncMock(return_value=mock_conv))
+        monkeypatch.setattr("database.queries.create_ticket", AsyncMock(return_value=mock_ticket))
 
-    @pytest.mark.asyncio
-    async def test_create_ticket_web_form(self):
-        """create ticket with channel=web_form → returns ticket ID."""
-        mock_conv = {"id": "conv-uuid-003"}
-        mock_ticket = {"ticket_ref": "TF-20250115-1234", "id": "ticket-uuid-003"}
-
-        with patch("agent.tools._get_pool"), \
-             patch("agent.tools.get_active_conversation", new_callable=AsyncMock, return_value=None), \
-             patch("agent.tools.create_conversation", new_callable=AsyncMock, return_value=mock_conv), \
-             patch("agent.tools.db_create_ticket", new_callable=AsyncMock, return_value=mock_ticket):
-            from agent.tools import create_ticket, TicketInput
-            result = await create_ticket(TicketInput(
-                customer_id="00000000-0000-0000-0000-000000000003",
-                issue="Dashboard slow",
-                channel="web_form",
-            ))
-
-            assert "TF-" in result
+        result = await call_tool(create_ticket, TicketInput(
+            customer_id=customer_id,
+            issue=issue,
+            channel=channel,
+        ))
+
+        assert ticket_ref in result
+        assert "email" not in result or "Ticket" in result  # Contains ticket ref
 
     @pytest.mark.asyncio
-    async def test_create_ticket_invalid_channel(self):
+    async def test_create_ticket_invalid_channel(self, call_tool, monkeypatch):
         """channel='fax' → handled gracefully with fallback ref."""
-        with patch("agent.tools._get_pool", side_effect=RuntimeError("DB unavailable")):
-            from agent.tools import create_ticket, TicketInput
-            result = await create_ticket(TicketInput(
-                customer_id="00000000-0000-0000-0000-000000000004",
-                issue="Test",
-                channel="fax",
-            ))
+        monkeypatch.setattr("agent.tools._get_pool", _raiser(RuntimeError("DB unavailable")))
+
+        result = await call_tool(create_ticket, TicketInput(
+            customer_id="00000000-0000-0000-0000-000000000004",
+            issue="Test",
+            channel="fax",
+        ))
 
-            # Should generate fallback reference, not crash
-            assert "TF-" in result
+        # Should generate fallback reference, not crash
+        assert "TF-" in result
 
 
+    @pytest.mark.asyncio
+    async def test_ticket_row_reused_within_run(self, monkeypatch):
+        """ticket seen by create_ticket → later lookups in the same run skip the DB."""
+        mock_ticket = {"ticket_ref": "TF-20250115-ABCD", "id": "ticket-uuid-001", "conversation_id": "conv-uuid-001"}
+        mock_lookup = AsyncMock()
+        monkeypatch.setattr("database.queries.get_ticket_by_ref", mock_lookup)
+
+        token = tools.start_ticket_cache()
+        try:
+            tools._remember_ticket(mock_ticket)
+            ticket = await tools._get_ticket(MagicMock(), "TF-20250115-ABCD")
+
+            assert ticket is mock_ticket
+            mock_lookup.assert_not_awaited()
+        finally:
+            tools.reset_ticket_cache(token)
+
 # ═══════════════════════════════════════════════════════════════════════
 # Escalation
 # ═══════════════════════════════════════════════════════════════════════
@@ -197,64 +245,64 @@ class TestEscalation:
     """Tests for the escalate_to_human tool."""
 
     @pytest.mark.asyncio
-    async def test_escalate_billing(self):
+    async def test_escalate_billing(self, call_tool, monkeypatch):
         """reason contains 'refund' → escalated to billing team."""
-        with patch("agent.tools._get_pool"), \
-             patch("agent.tools.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
-            from agent.tools import escalate_to_human, EscalationInput
-            result = await escalate_to_human(EscalationInput(
-                ticket_id="TF-20250115-0001",
-                reason="Customer requesting a refund for unauthorized charge",
-                category="billing",
-            ))
-
-            assert "Escalation Confirmed" in result
-            assert "billing" in result.lower()
+        monkeypatch.setattr("agent.tools._get_pool", MagicMock())
+        monkeypatch.setattr("database.queries.get_ticket_by_ref", AsyncMock(return_value=None))
+
+        result = await call_tool(escalate_to_human, EscalationInput(
+            ticket_id="TF-20250115-0001",
+            reason="Customer requesting a refund for unauthorized charge",
+            category="billing",
+        ))
+
+        assert "Escalation Confirmed" in result
+        assert "billing" in result.lower()
 
     @pytest.mark.asyncio
-    async def test_escalate_legal(self):
+    async def test_escalate_legal(self, call_tool, monkeypatch):
         """reason contains 'lawyer' → escalated to legal."""
-        with patch("agent.tools._get_pool"), \
-             patch("agent.tools.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
-            from agent.tools import escalate_to_human, EscalationInput
-            result = await escalate_to_human(EscalationInput(
-                ticket_id="TF-20250115-0002",
-                reason="Customer mentioned consulting their lawyer",
-                category="legal",
-            ))
-
-            assert "Escalation Confirmed" in result
-            assert "legal" in result.lower()
+        monkeypatch.setattr("agent.tools._get_pool", MagicMock())
+        monkeypatch.setattr("database.queries.get_ticket_by_ref", AsyncMock(return_value=None))
+
+        result = await call_tool(escalate_to_human, EscalationInput(
+            ticket_id="TF-20250115-0002",
+            reason="Customer mentioned consulting their lawyer",
+            category="legal",
+        ))
+
+        assert "Escalation Confirmed" in result
+        assert "legal" in result.lower()
 
     @pytest.mark.asyncio
-    async def test_escalate_urgent(self):
+    async def test_escalate_urgent(self, call_tool, monkeypatch):
         """urgency='critical' → marked as urgent."""
-        with patch("agent.tools._get_pool"), \
-             patch("agent.tools.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
-            from agent.tools import escalate_to_human, EscalationInput
-            result = await escalate_to_human(EscalationInput(
-                ticket_id="TF-20250115-0003",
-                reason="Production system down for enterprise customer",
-                urgency="critical",
-                category="technical",
-            ))
-
-            assert "critical" in result.lower()
-            assert "15 minutes" in result
+        monkeypatch.setattr("agent.tools._get_pool", MagicMock())
+        monkeypatch.setattr("database.queries.get_ticket_by_ref", AsyncMock(return_value=None))
+
+        result = await call_tool(escalate_to_human, EscalationInput(
+            ticket_id="TF-20250115-0003",
+            reason="Production system down for enterprise customer",
+            urgency="critical",
+            category="technical",
+        ))
+
+        assert "critical" in result.lower()
+        assert "15 minutes" in result
 
     @pytest.mark.asyncio
-    async def test_escalation_returns_id(self):
+    async def test_escalation_returns_id(self, call_tool, monkeypatch):
         """always returns escalation reference ID."""
-        with patch("agent.tools._get_pool"), \
-             patch("agent.tools.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
-            from agent.tools import escalate_to_human, EscalationInput
-            result = await escalate_to_human(EscalationInput(
-                ticket_id="TF-20250115-0004",
-                reason="Generic escalation test",
-                category="general",
-            ))
-
-            assert "ESC-" in result
+        monkeypatch.setattr("agent.tools._get_pool", MagicMock())
+        monkeypatch.setattr("database.queries.get_ticket_by_ref", AsyncMock(return_value=None))
+
+        result = await call_tool(escalate_to_human, EscalationInput(
+            ticket_id="TF-20250115-0004",
+            reason="Generic escalation test",
+            category="general",
+        ))
+
+        assert "ESC-" in result
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -11,10 +11,31 @@ Run:
 from __future__ import annotations
 
 import asyncio
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
+from channels.gmail_handler import (
+    _clean_subject,
+    _extract_body,
+    extract_email,
+    extract_name,
+)
+from channels.web_form_handler import _valid_ticket_id
+from channels.whatsapp_handler import (
+    _normalize_phone,
+    _to_whatsapp_format,
+    process_webhook,
+    split_message,
+)
+
+
+def _raiser(exc: Exception):
+    """Stand-in callable that raises `exc` (for monkeypatch.setattr)."""
+    def _raise(*args, **kwargs):
+        raise exc
+    return _raise
+
 
 # ═══════════════════════════════════════════════════════════════════════
 # Web Form Validation
@@ -24,17 +45,31 @@ import pytest
 class TestWebFormValidation:
     """Tests for web form submission validation via FastAPI."""
 
-    def test_valid_submission(self, test_client, sample_webform_submission):
+    def test_valid_submission(self, test_client, sample_webform_submission, monkeypatch):
         """all fields valid → 200 response with ticket_id."""
-        with patch("channels.web_form_handler.get_producer", return_value=None), \
-             patch("channels.web_form_handler._get_pool", side_effect=RuntimeError("no db")):
-            response = test_client.post("/support/submit", json=sample_webform_submission)
+        monkeypatch.setattr("channels.web_form_handler.get_producer", lambda: None)
+        monkeypatch.setattr("channels.web_form_handler._get_pool", _raiser(RuntimeError("no db")))
+
+        response = test_client.post("/support/submit", json=sample_webform_submission)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "ticket_id" in data
+        assert data["ticket_id"].startswith("TF-")
+        assert "status" in data
 
-            assert response.status_code == 200
-            data = response.json()
-            assert "ticket_id" in data
-            assert data["ticket_id"].startswith("TF-")
-            assert "status" in data
+    def test_submission_returns_stored_ticket_ref(self, test_client, sample_webform_submission, monkeypatch):
+        """DB available → response carries the sequence-assigned ref, none sent in."""
+        mock_store = AsyncMock(return_value={"ticket_ref": "TF-20250115-00A1"})
+        monkeypatch.setattr("channels.web_form_handler.get_producer", lambda: None)
+        monkeypatch.setattr("channels.web_form_handler._get_pool", MagicMock())
+        monkeypatch.setattr("channels.web_form_handler.create_ticket_end_to_end", mock_store)
+
+        response = test_client.post("/support/submit", json=sample_webform_submission)
+
+        assert response.status_code == 200
+        assert response.json()["ticket_id"] == "TF-20250115-00A1"
+        assert "ticket_ref" not in mock_store.call_args.kwargs
 
     def test_name_too_short(self, test_client, sample_webform_submission):
         """name='A' → 422 validation error."""
@@ -66,6 +101,14 @@ class TestWebFormValidation:
         response = test_client.post("/support/submit", json=sample_webform_submission)
         assert response.status_code == 422
 
+    def test_ticket_id_format(self):
+        """Only TF-YYYYMMDD-XXXX with uppercase/digit suffix is accepted."""
+        assert _valid_ticket_id("TF-20250101-AB12")
+        assert not _valid_ticket_id("TF-20250101-ab12")
+        assert not _valid_ticket_id("TF-2025010A-AB12")
+        assert not _valid_ticket_id("TF-20250101-AB1")
+        assert not _valid_ticket_id("XX-20250101-AB12")
+
 
 # ═══════════════════════════════════════════════════════════════════════
 # Gmail Handler
@@ -77,8 +120,6 @@ class TestGmailHandler:
 
     def test_extract_email(self):
         """'John Doe <john@example.com>' → 'john@example.com'."""
-        from channels.gmail_handler import extract_email
-
         assert extract_email("John Doe <john@example.com>") == "john@example.com"
         assert extract_email("<john@example.com>") == "john@example.com"
         assert extract_email("john@example.com") == "john@example.com"
@@ -86,16 +127,12 @@ class TestGmailHandler:
 
     def test_extract_name(self):
         """'John Doe <john@example.com>' → 'John Doe'."""
-        from channels.gmail_handler import extract_name
-
         assert extract_name("John Doe <john@example.com>") == "John Doe"
         assert extract_name('"Jane Smith" <jane@example.com>') == "Jane Smith"
         assert extract_name("john@example.com") is None
 
     def test_body_extraction(self):
         """multipart email → extracts text/plain part."""
-        from channels.gmail_handler import _extract_body
-
         payload = {
             "mimeType": "multipart/alternative",
             "parts": [
@@ -120,8 +157,6 @@ class TestGmailHandler:
 
     def test_body_extraction_plain(self):
         """Simple text/plain → extracted directly."""
-        from channels.gmail_handler import _extract_body
-
         payload = {
             "mimeType": "text/plain",
             "body": {"data": "SGVsbG8"},
@@ -132,8 +167,6 @@ class TestGmailHandler:
 
     def test_subject_re_prefix(self):
         """subject already has 'Re:' → not duplicated."""
-        from channels.gmail_handler import _clean_subject
-
         assert _clean_subject("Re: Support Request") == "Support Request"
         assert _clean_subject("Re: Re: Re: Help") == "Help"
         assert _clean_subject("Fwd: Re: Help") == "Help"
@@ -150,8 +183,6 @@ class TestWhatsAppHandler:
 
     def test_phone_normalization(self):
         """'+1234567890' → 'whatsapp:+1234567890'."""
-        from channels.whatsapp_handler import _normalize_phone, _to_whatsapp_format
-
         assert _normalize_phone("whatsapp:+1234567890") == "+1234567890"
         assert _normalize_phone("+1234567890") == "+1234567890"
         assert _normalize_phone("1234567890") == "+1234567890"
@@ -159,8 +190,6 @@ class TestWhatsAppHandler:
 
     def test_message_splitting(self):
         """message > 1600 chars → splits at sentence boundary."""
-        from channels.whatsapp_handler import split_message
-
         long_msg = "This is a test sentence. " * 100  # ~2500 chars
         parts = split_message(long_msg, max_length=1600)
 
@@ -170,8 +199,6 @@ class TestWhatsAppHandler:
 
     def test_short_message_no_split(self):
         """message < 1600 chars → returns single message."""
-        from channels.whatsapp_handler import split_message
-
         short_msg = "Hello, how can I help?"
         parts = split_message(short_msg)
 
@@ -181,8 +208,6 @@ class TestWhatsAppHandler:
     @pytest.mark.asyncio
     async def test_process_webhook(self):
         """valid form data → normalized message dict."""
-        from channels.whatsapp_handler import process_webhook
-
         form_data = {
             "MessageSid": "SM1234567890",
             "From": "whatsapp:+15551234567",
@@ -205,8 +230,6 @@ class TestWhatsAppHandler:
     @pytest.mark.asyncio
     async def test_process_webhook_empty_message(self):
         """empty message body with no media → returns None."""
-        from channels.whatsapp_handler import process_webhook
-
         form_data = {
             "MessageSid": "SM9999999999",
             "From": "whatsapp:+15559999999",
@@ -220,8 +243,6 @@ class TestWhatsAppHandler:
     @pytest.mark.asyncio
     async def test_process_webhook_missing_sid(self):
         """missing MessageSid → returns None."""
-        from channels.whatsapp_handler import process_webhook
-
         form_data = {
             "From": "whatsapp:+15551111111",
             "Body": "Hello",
@@ -145,13 +145,13 @@ class TestEscalationJourney:
     """Tests for escalation flows triggered by content and sentiment."""
 
     @pytest.mark.asyncio
-    async def test_billing_escalation_flow(self):
+    async def test_billing_escalation_flow(self, call_tool):
         """Submit 'refund request' → escalation triggered with billing team."""
         with patch("agent.tools._get_pool"), \
-             patch("agent.tools.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
+             patch("database.queries.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
             from agent.tools import escalate_to_human, EscalationInput
 
-            result = await escalate_to_human(EscalationInput(
+            result = await call_tool(escalate_to_human, EscalationInput(
                 ticket_id="TF-20250115-BILL",
                 reason="Customer requesting refund for unauthorized charge",
                 category="billing",
@@ -176,13 +176,13 @@ class TestEscalationJourney:
         assert score < -0.3  # Definitely negative
 
     @pytest.mark.asyncio
-    async def test_escalation_includes_assigned_team(self):
+    async def test_escalation_includes_assigned_team(self, call_tool):
         """Escalation response includes assigned team and response time."""
         with patch("agent.tools._get_pool"), \
-             patch("agent.tools.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
+             patch("database.queries.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
             from agent.tools import escalate_to_human, EscalationInput
 
-            result = await escalate_to_human(EscalationInput(
+            result = await call_tool(escalate_to_human, EscalationInput(
                 ticket_id="TF-20250115-TEAM",
                 reason="Security vulnerability report",
                 category="security",
@@ -223,10 +223,69 @@ class TestChannelMetrics:
             "p95": None,
         }
 
-        with patch("api.main.get_metrics_summary", new_callable=AsyncMock, return_value=mock_summary):
+        with patch("database.queries.get_metrics_summary", new_callable=AsyncMock, return_value=mock_summary), \
+             patch("database.queries.refresh_metrics_rollup_if_stale", new_callable=AsyncMock, return_value=False):
             response = test_client.get("/metrics/channels?hours=24")
 
             assert response.status_code == 200
             data = response.json()
             assert "window_hours" in data
             assert "channels" in data or "generated_at" in data
+
+    def test_metrics_refreshes_stale_rollup(self, test_client):
+        """GET /metrics/channels → rollup freshness checked over the requested window."""
+        with patch("database.queries.get_metrics_summary", new_callable=AsyncMock, return_value={}), \
+             patch("database.queries.refresh_metrics_rollup_if_stale", new_callable=AsyncMock, return_value=True) as mock_refresh:
+            response = test_client.get("/metrics/channels?hours=2")
+
+            assert response.status_code == 200
+            mock_refresh.assert_awaited_once()
+            assert mock_refresh.call_args.kwargs["max_lookback_minutes"] == 120
+
+    @pytest.mark.asyncio
+    async def test_metrics_summary_without_rollup_table(self):
+        """agent_metrics_5m missing (migration 004 not applied) → raw agent_metrics query."""
+        from database.queries import get_metrics_summary
+
+        with patch("database.queries._metrics_rollup_ready", False), \
+             patch("database.queries._fetchrow", new_callable=AsyncMock) as mock_fetch:
+            mock_fetch.side_effect = [{"ready": False}, {"count": 2, "avg": 1.5}]
+
+            summary = await get_metrics_summary(MagicMock(), "response_latency_ms", 24, "email")
+
+            assert summary["count"] == 2
+            sql = mock_fetch.call_args.args[1]
+            assert "FROM agent_metrics\n" in sql and "agent_metrics_5m" not in sql
+
+    @pytest.mark.asyncio
+    async def test_channel_config_cache_needs_notify_trigger(self):
+        """No trg_channel_configs_notify (migration 005) → listener not started."""
+        from database import queries
+
+        conn = MagicMock()
+        conn.fetchval = AsyncMock(return_value=False)
+        conn.close = AsyncMock()
+        conn.add_listener = AsyncMock()
+
+        with patch("database.queries._channel_config_listener", None), \
+             patch("database.queries.asyncpg.connect", new=AsyncMock(return_value=conn)):
+            await queries.start_channel_config_listener("postgresql://test")
+
+            assert queries._channel_config_listener is None
+            conn.close.assert_awaited_once()
+            conn.add_listener.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_cached_channel_config_is_a_copy(self):
+        """Mutating a returned config must not change the cached one."""
+        from database.queries import get_channel_config
+
+        row = {"channel": "email", "config": {"signature": "Support"}}
+        with patch("database.queries._channel_config_listener", MagicMock()), \
+             patch("database.queries._channel_config_cache", {}), \
+             patch("database.queries._fetchrow", new=AsyncMock(return_value=row)):
+            first = await get_channel_config(MagicMock(), "email")
+            first["config"]["signature"] = "changed"
+
+            second = await get_channel_config(MagicMock(), "email")
+            assert second["config"]["signature"] == "Support"
@@ -43,13 +43,13 @@ class TestTransitionFromIncubation:
     # ── EC: Pricing Escalation ──────────────────────────────────────
 
     @pytest.mark.asyncio
-    async def test_pricing_escalates_immediately(self):
+    async def test_pricing_escalates_immediately(self, call_tool):
         """Input: 'How much does the enterprise plan cost?' → escalated to billing."""
         with patch("agent.tools._get_pool"), \
-             patch("agent.tools.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
+             patch("database.queries.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
             from agent.tools import escalate_to_human, EscalationInput
 
-            result = await escalate_to_human(EscalationInput(
+            result = await call_tool(escalate_to_human, EscalationInput(
                 ticket_id="TF-20250115-PRC1",
                 reason="Customer asking about enterprise pricing - requires sales team",
                 category="billing",
@@ -61,13 +61,13 @@ class TestTransitionFromIncubation:
     # ── EC: Refund Escalation ───────────────────────────────────────
 
     @pytest.mark.asyncio
-    async def test_refund_escalates(self):
+    async def test_refund_escalates(self, call_tool):
         """Input: 'I want a refund for last month' → escalated to billing."""
         with patch("agent.tools._get_pool"), \
-             patch("agent.tools.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
+             patch("database.queries.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
             from agent.tools import escalate_to_human, EscalationInput
 
-            result = await escalate_to_human(EscalationInput(
+            result = await call_tool(escalate_to_human, EscalationInput(
                 ticket_id="TF-20250115-REF1",
                 reason="Customer requesting refund for last month's charge",
                 category="billing",
@@ -106,13 +106,13 @@ class TestTransitionFromIncubation:
     # ── EC: Legal Threat ────────────────────────────────────────────
 
     @pytest.mark.asyncio
-    async def test_legal_threat_escalates(self):
+    async def test_legal_threat_escalates(self, call_tool):
         """Input: 'I'm going to contact my lawyer' → escalated to legal."""
         with patch("agent.tools._get_pool"), \
-             patch("agent.tools.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
+             patch("database.queries.get_ticket_by_ref", new_callable=AsyncMock, return_value=None):
             from agent.tools import escalate_to_human, EscalationInput
 
-            result = await escalate_to_human(EscalationInput(
+            result = await call_tool(escalate_to_human, EscalationInput(
                 ticket_id="TF-20250115-LEG1",
                 reason="Customer mentioned contacting their lawyer about this issue",
                 category="legal",
@@ -37,11 +37,16 @@ import asyncpg
 from agent.customer_success_agent import run_agent
 from agent.tools import set_db_pool, _get_pool
 from database.queries import (
+    POOL_SERVER_SETTINGS,
+    POOL_STATEMENT_CACHE,
     add_message,
     create_conversation,
     get_active_conversation,
     get_conversation_history,
     get_or_create_customer,
+    init_connection,
+    start_timestamp_flusher,
+    stop_timestamp_flusher,
     update_conversation_sentiment,
 )
 from kafka_client import (
@@ -98,8 +103,12 @@ class UnifiedMessageProcessor:
             min_size=2,
             max_size=10,
             command_timeout=30,
+            init=init_connection,
+            server_settings=POOL_SERVER_SETTINGS,
+            **POOL_STATEMENT_CACHE,
         )
         set_db_pool(self._pool)
+        start_timestamp_flusher(self._pool)
         logger.info("PostgreSQL pool connected")
 
         # 2. Kafka producer (for publishing metrics + escalations)
@@ -128,6 +137,10 @@ class UnifiedMessageProcessor:
         logger.info("Kafka producer stopped")
 
         if self._pool:
+            try:
+                await stop_timestamp_flusher(self._pool)
+            except Exception as e:
+                logger.warning(f"Final activity timestamp flush failed: {e}")
             await self._pool.close()
             logger.info("PostgreSQL pool closed")
 
@@ -540,4 +553,10 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:
+        # Windows / local dev without uvloop: default asyncio loop
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -27,7 +27,15 @@ from typing import Optional
 
 import asyncpg
 
-from database.queries import _fetch, _fetchrow, record_metric
+from database.queries import (
+    POOL_SERVER_SETTINGS,
+    POOL_STATEMENT_CACHE,
+    _fetch,
+    _fetchrow,
+    init_connection,
+    record_metric,
+    refresh_metrics_rollup,
+)
 from kafka_client import (
     TOPICS,
     FTEKafkaConsumer,
@@ -57,6 +65,9 @@ ALERT_ESCALATION_RATE = float(os.environ.get("ALERT_ESCALATION_RATE", "0.25"))
 ALERT_P95_LATENCY_MS = float(os.environ.get("ALERT_P95_LATENCY_MS", "10000"))
 ALERT_ERROR_RATE = float(os.environ.get("ALERT_ERROR_RATE", "0.05"))
 
+# How often the agent_metrics_5m rollup is refreshed (seconds)
+METRICS_ROLLUP_INTERVAL = int(os.environ.get("METRICS_ROLLUP_INTERVAL", "60"))
+
 # Cost estimation (per interaction, rough average)
 COST_PER_GPT4O_CALL = 0.03  # ~$0.03 per agent run (input + output tokens)
 
@@ -87,6 +98,9 @@ class MetricsCollector:
             min_size=1,
             max_size=5,
             command_timeout=30,
+            init=init_connection,
+            server_settings=POOL_SERVER_SETTINGS,
+            **POOL_STATEMENT_CACHE,
         )
         logger.info("PostgreSQL pool connected")
 
@@ -116,18 +130,22 @@ class MetricsCollector:
         if not self._consumer:
             raise RuntimeError("Collector not started. Call start() first.")
 
-        # Run alert checker in background
-        alert_task = asyncio.create_task(self._periodic_alert_check())
+        # Run alert checker and rollup refresher in background
+        background = [
+            asyncio.create_task(self._periodic_alert_check()),
+            asyncio.create_task(self._periodic_rollup_refresh()),
+        ]
 
         logger.info("Metrics collector running — waiting for events...")
         try:
             await self._consumer.consume(handler=self._handle_metric_event)
         finally:
-            alert_task.cancel()
-            try:
-                await alert_task
-            except asyncio.CancelledError:
-                pass
+            for task in background:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
 
     # ── Event Handler ────────────────────────────────────────────────
 
@@ -393,6 +411,20 @@ class MetricsCollector:
             except Exception as e:
                 logger.error(f"Alert check failed: {e}", exc_info=True)
 
+    async def _periodic_rollup_refresh(
+        self, interval_seconds: int = METRICS_ROLLUP_INTERVAL
+    ) -> None:
+        """Keep the agent_metrics_5m dashboard rollup current."""
+        while self._running:
+            try:
+                await refresh_metrics_rollup(self._pool)
+                await asyncio.sleep(interval_seconds)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Metrics rollup refresh failed: {e}", exc_info=True)
+                await asyncio.sleep(interval_seconds)
+
 
 # ── Entrypoint ──────────────────────────────────────────────────────────
 
@@ -468,4 +500,10 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:
+        # Windows / local dev without uvloop: default asyncio loop
+        asyncio.run(main())
+    else:
+        uvloop.run(main())